@@ -2,6 +2,8 @@
 Archivo de configuración para conexión a MySQL
 """
 
+import os
+
 # Configuración de MySQL
 MYSQL_CONFIG = {
     'host': 'localhost',        # Cambiar si tu MySQL está en otro servidor
@@ -11,9 +13,151 @@ MYSQL_CONFIG = {
     'raise_on_warnings': True
 }
 
-# Rutas de archivos
-CSV_RAW_PATH = 'data/raw/mental_health.csv'
-CSV_CLEAN_PATH = 'data/processed/mental_health_clean.csv'
+# Motor del Data Warehouse: 'mysql' (servidor) o 'duckdb' (embebido, columnar,
+# sin servidor; esquema en sql/02_crear_tablas_duckdb.sql)
+DW_BACKEND = os.environ.get('ETL_BACKEND', 'mysql')
+# DuckDB nombra el catálogo como el archivo: no puede llamarse como la base
+# (dw_salud_mental.duckdb haría ambiguo "dw_salud_mental")
+DUCKDB_PATH = os.environ.get('ETL_DUCKDB_PATH', 'data/dw.duckdb')
+DUCKDB_THREADS = None   # Hilos de ejecución de DuckDB (None = todos los núcleos)
+
+# Pool de conexiones compartido (scripts y tareas paralelas del orquestador)
+MYSQL_POOL_SIZE = 6
+
+# Perfiles de sesión: variables SET SESSION aplicadas al tomar una conexión del pool
+PERFILES_SESION = {
+    'default': {},
+
+    # Cargas masivas (staging, dimensiones): sin verificación de unicidad ni FK
+    'carga_masiva': {
+        'unique_checks': 0,
+        'foreign_key_checks': 0
+    },
+
+    # Agregación de la tabla de hechos: tablas temporales y buffers más grandes
+    'agregacion': {
+        'tmp_table_size': 256 * 1024 * 1024,
+        'max_heap_table_size': 256 * 1024 * 1024,
+        'sort_buffer_size': 8 * 1024 * 1024,
+        'join_buffer_size': 8 * 1024 * 1024
+    },
+
+    # Validación y exportación: solo lectura
+    'lectura': {
+        'transaction_isolation': 'READ-COMMITTED',
+        'transaction_read_only': 1
+    }
+}
+
+# Rutas de archivos (las variables de entorno ETL_* permiten apuntar a otros
+# archivos sin editar este módulo, p. ej. el benchmark de escala)
+CSV_RAW_PATH = os.environ.get('ETL_CSV_RAW_PATH', 'data/raw/mental_health.csv')
+CSV_CLEAN_PATH = os.environ.get('ETL_CSV_CLEAN_PATH', 'data/processed/mental_health_clean.csv')
+CSV_EXPORT_PATH = os.environ.get('ETL_CSV_EXPORT_PATH', 'data/export/dw_salud_mental_powerbi.csv')
+PARQUET_EXPORT_DIR = os.environ.get('ETL_PARQUET_EXPORT_DIR', 'data/export/parquet')
+ESTRELLA_EXPORT_DIR = os.environ.get('ETL_ESTRELLA_EXPORT_DIR', 'data/export/estrella')
+
+# Tabla versionada de códigos de las respuestas categóricas (python/codigos.py):
+# staging guarda enteros TINYINT en lugar de texto
+CODIGOS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'codigos.json')
+
+# Exportación: filas leídas por lote del cursor (acota la memoria del cliente)
+EXPORT_CHUNK_SIZE = 10000
+
+# Exportación: 'csv' (archivo plano) o 'parquet' (particionado por anio/mes, requiere pyarrow)
+EXPORT_FORMAT = 'csv'
+# 'plano' (hechos unidos a todas las dimensiones) o 'estrella' (un archivo por tabla + relaciones)
+EXPORT_MODE = 'plano'
+# Reescribir solo los períodos cuyos hechos cambiaron (solo aplica a Parquet particionado)
+EXPORT_INCREMENTAL = True
+# Conexiones del pool que exportan rangos de períodos en paralelo (1 = secuencial;
+# junto con la conexión de la etapa debe ser como máximo MYSQL_POOL_SIZE)
+EXPORT_WORKERS = 4
+PARQUET_COMPRESSION = 'snappy'
 
 # Configuración de logging
-LOG_FILE = 'logs/etl_log.txt'
\ No newline at end of file
+LOG_FILE = 'logs/etl_log.txt'
+LOG_METRICS_FILE = 'logs/etl_metricas.jsonl'  # Registros estructurados (JSON por línea)
+LOG_MAX_BYTES = 5 * 1024 * 1024               # Rotar al superar 5 MB
+LOG_BACKUP_COUNT = 5                          # Archivos rotados a conservar
+LOG_BUFFER_RECORDS = 200                      # Mensajes en memoria antes de escribir
+
+# Instrumentación SQL (resumen por sentencia al final de cada script)
+SQL_METRICS_DIR = 'logs/sql'
+
+# Resultados de validación reutilizables mientras no cambie el CHECKSUM TABLE
+# de las tablas que lee cada validación (05_validar_dw.py --force los ignora)
+VALIDACION_CACHE_FILE = 'logs/validacion_cache.json'
+
+# Validación concurrente (05_validar_dw.py y etapa validacion del pipeline):
+# cada sección es una tarea con su conexión del pool (perfil lectura)
+VALIDACION_WORKERS = 6              # Tareas simultáneas (como máximo MYSQL_POOL_SIZE)
+VALIDACION_LIMITE_CHEQUEO_S = 120   # Tiempo máximo de cada sección (todas sus consultas)
+VALIDACION_PRESUPUESTO_S = 300      # Tiempo total; las secciones sin terminar quedan en 'timeout'
+VALIDACION_REPORTE_FILE = 'logs/validacion_reporte.json'
+
+# Validación incremental (python/marcas_validacion.py): los chequeos de staging
+# y de hechos recorren solo las filas posteriores a la última clave validada
+VALIDACION_MARCAS_FILE = 'logs/validacion_marcas.json'
+VALIDACION_BARRIDO_CADA = 10   # Ejecuciones incrementales antes de un barrido completo
+
+# Historial de tablas e índices (python/asesor_indices.py, solo MySQL): una
+# foto al final de cada ejecución; el reporte analiza las últimas ASESOR_VENTANA_RUNS
+ESTADISTICAS_POR_EJECUCION = True
+# La foto de cada ejecución incluye además un recorrido completo cronometrado
+# de la tabla de hechos (comparación de formatos de fila); desactivado porque
+# cuesta un recorrido más por ejecución: asesor_indices.py --capturar lo mide
+ESTADISTICAS_RECORRIDO_POR_EJECUCION = False
+ASESOR_VENTANA_RUNS = 10
+
+# Formato de fila de la tabla de hechos (solo MySQL; 04_cargar_hechos.py lo
+# aplica con ALTER TABLE, con la tabla vacía, si difiere del actual):
+# None (no cambiarlo), 'DYNAMIC' (predeterminado de InnoDB), 'COMPRESSED'
+# (páginas comprimidas de HECHOS_KEY_BLOCK_SIZE KB) o 'PAGINA' (compresión
+# transparente de páginas; requiere un sistema de archivos con hole punching)
+HECHOS_FORMATO_FILA = None
+HECHOS_KEY_BLOCK_SIZE = 8
+HECHOS_COMPRESION_PAGINA = 'zlib'   # 'zlib' o 'lz4'
+
+# Capturar EXPLAIN FORMAT=JSON de sentencias más lentas que este umbral (ms)
+# None desactiva la captura; se puede activar con ETL_EXPLAIN_MS=500
+SQL_EXPLAIN_THRESHOLD_MS = (
+    float(os.environ['ETL_EXPLAIN_MS']) if os.environ.get('ETL_EXPLAIN_MS') else None
+)
+
+# Orquestador: tareas independientes (cargas de dimensiones, validaciones)
+# que se ejecutan en paralelo, cada una con su conexión del pool
+# (debe ser menor que MYSQL_POOL_SIZE)
+PIPELINE_WORKERS = 4
+
+# Datos sintéticos (python/generar_datos.py): proporción de filas alteradas
+SINTETICOS_DUPLICADOS = 0.01   # Copias exactas de una fila ya emitida
+SINTETICOS_NULOS = 0.005       # Una columna vacía
+SINTETICOS_INVALIDOS = 0.002   # Gender o Days_Indoors fuera de los valores válidos
+
+# Benchmark de escala (python/benchmark_escala.py)
+BENCHMARK_ESCALAS = [292364, 1000000, 5000000]
+BENCHMARK_DIR = 'data/benchmark'
+
+# API local de solo lectura (python/api_lectura.py)
+API_HOST = '127.0.0.1'
+API_PORT = 8050
+API_CACHE_ENTRADAS = 256   # Resultados en caché (LRU)
+API_CACHE_TTL_S = 300      # Vencimiento aunque la generación de carga no cambie
+
+# Cubo OLAP en memoria (python/cubo_olap.py): arreglos NumPy persistidos en
+# .npz; se reconstruye cuando cambia la generación de carga del DW
+CUBO_OLAP_PATH = 'data/cubo/cubo_olap.npz'
+
+# Índice bitmap por encuestado sobre el CSV limpio (python/indice_bitmap.py);
+# se reconstruye cuando cambia el CSV limpio
+INDICE_BITMAP_PATH = 'data/cubo/indice_bitmap.npz'
+
+# Muestra estratificada de staging por (periodo, país) que 02_cargar_staging.py
+# renueva en cada carga (python/muestreo.py)
+MUESTRA_STAGING_PATH = 'data/processed/muestra_staging.csv'
+MUESTREO_FILAS_ESTRATO = 200   # Tamaño del reservorio de cada estrato
+MUESTREO_CONFIANZA = 0.95      # Nivel de los intervalos de Wilson
+MUESTREO_ERROR_MAX = 2.0       # Semiamplitud máxima (puntos porcentuales); si no se alcanza, cálculo exacto
+# estadisticas_generales de 05_validar_dw.py desde la muestra (también con --aproximado)
+VALIDACION_APROXIMADA = False
@@ -6,26 +6,16 @@ Salida: data/processed/mental_health_clean.csv
 
 import pandas as pd
 import numpy as np
-from datetime import datetime
 import sys
 import os
 
 # Agregar el directorio raíz al path para importar config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.config import CSV_RAW_PATH, CSV_CLEAN_PATH, LOG_FILE
-
-
-def log_message(message):
-    """Registrar mensajes en el log y en consola"""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    log_entry = f"[{timestamp}] {message}"
-    print(log_entry)
-
-    # Crear directorio logs si no existe
-    os.makedirs('logs', exist_ok=True)
-
-    with open(LOG_FILE, 'a', encoding='utf-8') as f:
-        f.write(log_entry + '\n')
+from config.config import CSV_RAW_PATH, CSV_CLEAN_PATH
+from errores import ErrorETL
+from bitacora import log_message, medir_etapa
+from auditoria import ejecucion_etl, auditar_etapa, metricas_etapa
+from codigos import VALORES
 
 
 def cargar_csv():
@@ -42,10 +32,10 @@ def cargar_csv():
     except FileNotFoundError:
         log_message(f"❌ ERROR: No se encontró el archivo {CSV_RAW_PATH}")
         log_message("Verifica que el CSV esté en la carpeta data/raw/")
-        sys.exit(1)
+        raise ErrorETL(f"No se encontró el archivo {CSV_RAW_PATH}")
     except Exception as e:
         log_message(f"❌ ERROR al cargar CSV: {str(e)}")
-        sys.exit(1)
+        raise ErrorETL(f"Error al cargar CSV: {e}") from e
 
 
 def analizar_calidad_datos(df):
@@ -113,29 +103,33 @@ def limpiar_datos(df):
             if eliminados > 0:
                 log_message(f"  {campo}: eliminados {eliminados} registros con NULL")
 
-    # 5. Validar valores de campos categóricos
+    # 5. Validar valores de campos categóricos contra la tabla de códigos
+    # (staging guarda el código de cada respuesta: un valor sin código no se
+    # puede cargar; en campos críticos se elimina el registro y en el resto
+    # queda NULL)
     log_message("Validando valores categóricos...")
 
-    # Gender: solo Male, Female
-    if 'Gender' in df_clean.columns:
-        valores_validos_gender = ['Male', 'Female']
+    for col in VALORES:
+        if col not in df_clean.columns:
+            continue
+        invalidos = df_clean[col].notna() & ~df_clean[col].isin(VALORES[col])
+        if not invalidos.any():
+            continue
+        if col in campos_criticos:
+            df_clean = df_clean[~invalidos]
+            log_message(f"  {col}: eliminados {invalidos.sum()} registros con valores inválidos")
+        else:
+            df_clean.loc[invalidos, col] = np.nan
+            log_message(f"  {col}: {invalidos.sum()} valores inválidos reemplazados por NULL")
+
+    # Timestamp: formato M/D/YYYY H:MM (staging lo guarda como DATETIME)
+    if 'Timestamp' in df_clean.columns:
+        fechas = pd.to_datetime(df_clean['Timestamp'], format='%m/%d/%Y %H:%M', errors='coerce')
         antes = len(df_clean)
-        df_clean = df_clean[df_clean['Gender'].isin(valores_validos_gender)]
+        df_clean = df_clean[fechas.notna()]
         eliminados = antes - len(df_clean)
         if eliminados > 0:
-            log_message(f"  Gender: eliminados {eliminados} registros con valores inválidos")
-
-    # Days_Indoors: validar valores esperados
-    if 'Days_Indoors' in df_clean.columns:
-        valores_validos_days = [
-            'Go out Every day', '1-14 days', '15-30 days',
-            '31-60 days', 'More than 2 months'
-        ]
-        antes = len(df_clean)
-        df_clean = df_clean[df_clean['Days_Indoors'].isin(valores_validos_days)]
-        eliminados = antes - len(df_clean)
-        if eliminados > 0:
-            log_message(f"  Days_Indoors: eliminados {eliminados} registros con valores inválidos")
+            log_message(f"  Timestamp: eliminados {eliminados} registros con fecha inválida")
 
     # 6. Resumen de limpieza
     registros_finales = len(df_clean)
@@ -154,34 +148,54 @@ def guardar_csv_limpio(df):
     """Guardar el CSV limpio"""
     try:
         # Crear directorio si no existe
-        os.makedirs('data/processed', exist_ok=True)
+        os.makedirs(os.path.dirname(CSV_CLEAN_PATH) or '.', exist_ok=True)
 
         df.to_csv(CSV_CLEAN_PATH, index=False, encoding='utf-8')
         log_message(f"\n✅ CSV limpio guardado en: {CSV_CLEAN_PATH}")
         log_message(f"  {len(df)} registros, {len(df.columns)} columnas")
     except Exception as e:
         log_message(f"❌ ERROR al guardar CSV limpio: {str(e)}")
-        sys.exit(1)
+        raise ErrorETL(f"Error al guardar CSV limpio: {e}") from e
 
 
 def main():
-    """Función principal"""
+    """
+    Función principal
+    Devuelve las métricas de la etapa para la auditoría (etl_stage_runs)
+    """
     # 1. Cargar CSV
-    df = cargar_csv()
+    with medir_etapa('limpieza', 'cargar_csv') as medicion:
+        df = cargar_csv()
+        medicion['filas'] = len(df)
 
     # 2. Analizar calidad
     analizar_calidad_datos(df)
 
     # 3. Limpiar datos
-    df_clean = limpiar_datos(df)
+    with medir_etapa('limpieza', 'limpiar_datos') as medicion:
+        df_clean = limpiar_datos(df)
+        medicion['filas'] = len(df)
 
     # 4. Guardar CSV limpio
-    guardar_csv_limpio(df_clean)
+    with medir_etapa('limpieza', 'guardar_csv') as medicion:
+        guardar_csv_limpio(df_clean)
+        medicion['filas'] = len(df_clean)
 
     log_message("\n" + "=" * 50)
     log_message("LIMPIEZA COMPLETADA EXITOSAMENTE")
     log_message("=" * 50)
 
+    return {
+        'filas_entrada': len(df),
+        'filas_salida': len(df_clean),
+        'filas_rechazadas': len(df) - len(df_clean),
+        'bytes_leidos': os.path.getsize(CSV_RAW_PATH)
+    }
+
 
 if __name__ == "__main__":
-    main()
+    try:
+        with ejecucion_etl('01_limpiar_datos'), auditar_etapa('limpieza') as registro:
+            registro.update(metricas_etapa(main()))
+    except ErrorETL:
+        sys.exit(1)
@@ -2,42 +2,49 @@
 Script 2: Cargar datos del CSV limpio a la tabla staging de MySQL
 Entrada: data/processed/mental_health_clean.csv
 Salida: Tabla mental_health_staging poblada en MySQL
+
+Las respuestas categóricas se guardan con su código de config/codigos.json
+(TINYINT) y el Timestamp como fecha, anio y mes.
 """
 
 import pandas as pd
-import mysql.connector
-from datetime import datetime
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.config import MYSQL_CONFIG, CSV_CLEAN_PATH, LOG_FILE
-
-
-def log_message(message):
-    """Registrar mensajes en log y consola"""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    log_entry = f"[{timestamp}] {message}"
-    print(log_entry)
-
-    with open(LOG_FILE, 'a', encoding='utf-8') as f:
-        f.write(log_entry + '\n')
-
-
-def conectar_mysql():
-    """Conectar a MySQL"""
-    try:
-        log_message("Conectando a MySQL...")
-        conn = mysql.connector.connect(**MYSQL_CONFIG)
-        log_message("✅ Conexión exitosa a MySQL")
-        return conn
-    except mysql.connector.Error as err:
-        log_message(f"❌ ERROR de conexión: {err}")
-        log_message("Verifica que:")
-        log_message("  1. MySQL esté ejecutándose")
-        log_message("  2. Las credenciales en config.py sean correctas")
-        log_message("  3. La base de datos 'dw_salud_mental' exista")
-        sys.exit(1)
+from config.config import CSV_CLEAN_PATH, DW_BACKEND
+from errores import ErrorETL
+from bitacora import log_message, medir_etapa
+from base_datos import conectar_mysql, ERRORES_BD
+from auditoria import ejecucion_etl, auditar_etapa, metricas_etapa, run_actual
+from muestreo import construir_muestra
+from chequeos import chequeos_nulos
+from marcas_validacion import chequear_desde_marca, reiniciar_marcas
+from codigos import codificar_serie, decodificar, expresion_codificar_sql, sincronizar_tabla_codigos
+
+
+# Columnas categóricas del CSV limpio, guardadas como códigos en staging
+COLUMNAS_CODIFICADAS = [
+    'Gender', 'Country', 'Occupation', 'self_employed',
+    'family_history', 'treatment', 'Days_Indoors', 'Growing_Stress',
+    'Changes_Habits', 'Mental_Health_History', 'Mood_Swings',
+    'Coping_Struggles', 'Work_Interest', 'Social_Weakness',
+    'mental_health_interview', 'care_options'
+]
+
+# Columnas de mental_health_staging, en orden (fecha, anio y mes salen del Timestamp)
+COLUMNAS_STAGING = ['fecha', 'anio', 'mes'] + COLUMNAS_CODIFICADAS
+
+# Formato del Timestamp del CSV
+FORMATO_TIMESTAMP = '%m/%d/%Y %H:%M'
+
+# Campos que no deben tener NULL en staging
+CAMPOS_CRITICOS = [
+    'fecha', 'Gender', 'Country', 'Occupation',
+    'family_history', 'treatment', 'Days_Indoors',
+    'Growing_Stress', 'Mood_Swings', 'Coping_Struggles',
+    'Social_Weakness', 'care_options', 'mental_health_interview'
+]
 
 
 def verificar_tabla_staging(conn):
@@ -60,7 +67,7 @@ def verificar_tabla_staging(conn):
         log_message("❌ ERROR: La tabla mental_health_staging no existe")
         log_message("Ejecuta primero el script 02_crear_tablas.sql")
         cursor.close()
-        sys.exit(1)
+        raise ErrorETL("La tabla mental_health_staging no existe")
 
     log_message("✅ Tabla mental_health_staging existe")
     cursor.close()
@@ -73,6 +80,10 @@ def limpiar_tabla_staging(conn):
     cursor = conn.cursor()
     cursor.execute("TRUNCATE TABLE mental_health_staging")
     conn.commit()
+    reiniciar_marcas('mental_health_staging')
+
+    # Códigos vigentes, para decodificar staging desde SQL
+    sincronizar_tabla_codigos(conn)
 
     log_message("✅ Tabla staging limpiada")
     cursor.close()
@@ -89,10 +100,23 @@ def cargar_csv():
     except FileNotFoundError:
         log_message(f"❌ ERROR: No se encontró {CSV_CLEAN_PATH}")
         log_message("Ejecuta primero el script 01_limpiar_datos.py")
-        sys.exit(1)
+        raise ErrorETL(f"No se encontró {CSV_CLEAN_PATH}")
     except Exception as e:
         log_message(f"❌ ERROR al cargar CSV: {str(e)}")
-        sys.exit(1)
+        raise ErrorETL(f"Error al cargar CSV: {e}") from e
+
+
+def codificar_datos(df):
+    """DataFrame con las columnas de staging: fecha, anio, mes y los códigos"""
+    fecha = pd.to_datetime(df['Timestamp'], format=FORMATO_TIMESTAMP, errors='coerce')
+    codificado = pd.DataFrame({
+        'fecha': fecha,
+        'anio': fecha.dt.year.astype('Int64'),
+        'mes': fecha.dt.month.astype('Int64')
+    })
+    for col in COLUMNAS_CODIFICADAS:
+        codificado[col] = codificar_serie(df[col])
+    return codificado
 
 
 def insertar_datos_batch(conn, df, batch_size=1000):
@@ -104,19 +128,18 @@ def insertar_datos_batch(conn, df, batch_size=1000):
     cursor = conn.cursor()
 
     # Query de inserción
-    query = """
+    query = f"""
     INSERT INTO mental_health_staging (
-        Timestamp, Gender, Country, Occupation, self_employed,
-        family_history, treatment, Days_Indoors, Growing_Stress,
-        Changes_Habits, Mental_Health_History, Mood_Swings,
-        Coping_Struggles, Work_Interest, Social_Weakness,
-        mental_health_interview, care_options
+        {', '.join(COLUMNAS_STAGING)}, id_run
     ) VALUES (
-        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+        {', '.join(['%s'] * (len(COLUMNAS_STAGING) + 1))}
     )
     """
 
+    df = codificar_datos(df)
+
     total_registros = len(df)
+    id_run = run_actual()
     registros_insertados = 0
     errores = 0
 
@@ -127,10 +150,12 @@ def insertar_datos_batch(conn, df, batch_size=1000):
 
         # Preparar datos del lote
         batch_data = []
-        for _, row in batch.iterrows():
-            # Convertir NaN a None para MySQL
-            row_data = tuple(None if pd.isna(val) else val for val in row)
-            batch_data.append(row_data)
+        for row in batch.itertuples(index=False):
+            # Convertir NaN/NA a None y los tipos de NumPy/pandas a nativos para MySQL
+            row_data = (row[0].to_pydatetime() if not pd.isna(row[0]) else None,) + tuple(
+                None if pd.isna(val) else int(val) for val in row[1:]
+            )
+            batch_data.append(row_data + (id_run,))
 
         try:
             # Insertar lote
@@ -142,7 +167,7 @@ def insertar_datos_batch(conn, df, batch_size=1000):
 
             log_message(f"  Procesado: {registros_insertados}/{total_registros} ({porcentaje:.1f}%)")
 
-        except mysql.connector.Error as err:
+        except ERRORES_BD as err:
             errores += 1
             log_message(f"⚠️ Error en lote {start_idx}-{end_idx}: {err}")
             conn.rollback()
@@ -156,16 +181,53 @@ def insertar_datos_batch(conn, df, batch_size=1000):
     return registros_insertados, errores
 
 
+def insertar_desde_archivo(conn):
+    """
+    Cargar staging leyendo el archivo limpio directamente desde el motor
+    (DuckDB: read_csv/read_parquet, sin pasar las filas por pandas)
+    Devuelve los registros insertados.
+    """
+    log_message(f"\nInsertando {CSV_CLEAN_PATH} directamente desde DuckDB...")
+
+    if not os.path.exists(CSV_CLEAN_PATH):
+        log_message(f"❌ ERROR: No se encontró {CSV_CLEAN_PATH}")
+        log_message("Ejecuta primero el script 01_limpiar_datos.py")
+        raise ErrorETL(f"No se encontró {CSV_CLEAN_PATH}")
+
+    columnas = ', '.join(COLUMNAS_STAGING)
+    fecha = f"STR_TO_DATE(Timestamp, '{FORMATO_TIMESTAMP.replace('%M', '%i').replace('%', '%%')}')"
+    expresiones = ', '.join(
+        [f"{fecha}", f"YEAR({fecha})", f"MONTH({fecha})"] +
+        [expresion_codificar_sql(col) for col in COLUMNAS_CODIFICADAS]
+    )
+    if CSV_CLEAN_PATH.endswith('.parquet'):
+        origen = "read_parquet(%s)"
+    else:
+        origen = "read_csv(%s, header = true, all_varchar = true)"
+
+    cursor = conn.cursor()
+    cursor.execute(f"""
+    INSERT INTO mental_health_staging ({columnas}, id_run)
+    SELECT {expresiones}, %s
+    FROM {origen}
+    """, (run_actual(), CSV_CLEAN_PATH))
+    registros_insertados = cursor.rowcount
+    conn.commit()
+    cursor.close()
+
+    log_message(f"✅ Inserción completada: {registros_insertados} registros")
+    return registros_insertados
+
+
 def validar_carga(conn, registros_esperados):
     """Validar que la carga fue exitosa"""
     log_message("\n--- VALIDANDO CARGA ---")
 
-    cursor = conn.cursor()
+    # Conteo y NULL de los campos críticos en un solo recorrido de las filas
+    # de staging aún no validadas
+    count, nulos = chequear_desde_marca(conn, 'mental_health_staging', chequeos_nulos(CAMPOS_CRITICOS))
 
     # 1. Contar registros
-    cursor.execute("SELECT COUNT(*) FROM mental_health_staging")
-    count = cursor.fetchone()[0]
-
     log_message(f"Registros en staging: {count}")
     log_message(f"Registros esperados: {registros_esperados}")
 
@@ -177,23 +239,14 @@ def validar_carga(conn, registros_esperados):
     # 2. Verificar valores NULL en campos críticos
     log_message("\nVerificando campos críticos (no deben tener NULL)...")
 
-    campos_criticos = [
-        'Timestamp', 'Gender', 'Country', 'Occupation',
-        'family_history', 'treatment', 'Days_Indoors',
-        'Growing_Stress', 'Mood_Swings', 'Coping_Struggles',
-        'Social_Weakness', 'care_options', 'mental_health_interview'
-    ]
-
-    for campo in campos_criticos:
-        query = f"SELECT COUNT(*) FROM mental_health_staging WHERE {campo} IS NULL"
-        cursor.execute(query)
-        nulls = cursor.fetchone()[0]
-
-        if nulls > 0:
-            log_message(f"  ⚠️ {campo}: {nulls} valores NULL")
+    for campo in CAMPOS_CRITICOS:
+        if nulos[campo] > 0:
+            log_message(f"  ⚠️ {campo}: {nulos[campo]} valores NULL")
         else:
             log_message(f"  ✅ {campo}: sin valores NULL")
 
+    cursor = conn.cursor()
+
     # 3. Distribución por género
     log_message("\nDistribución por género:")
     cursor.execute("""
@@ -202,14 +255,14 @@ def validar_carga(conn, registros_esperados):
         GROUP BY Gender
     """)
     for row in cursor.fetchall():
-        log_message(f"  {row[0]}: {row[1]} registros")
+        log_message(f"  {decodificar('Gender', row[0])}: {row[1]} registros")
 
     # 4. Rango de fechas
     log_message("\nRango de fechas:")
     cursor.execute("""
         SELECT 
-            MIN(STR_TO_DATE(Timestamp, '%m/%d/%Y %H:%i')) as fecha_min,
-            MAX(STR_TO_DATE(Timestamp, '%m/%d/%Y %H:%i')) as fecha_max
+            MIN(fecha) as fecha_min,
+            MAX(fecha) as fecha_max
         FROM mental_health_staging
     """)
     fecha_min, fecha_max = cursor.fetchone()
@@ -226,35 +279,74 @@ def validar_carga(conn, registros_esperados):
         LIMIT 5
     """)
     for row in cursor.fetchall():
-        log_message(f"  {row[0]}: {row[1]} registros")
+        log_message(f"  {decodificar('Country', row[0])}: {row[1]} registros")
 
     cursor.close()
 
 
+def cargar_staging(conn, verificar=True):
+    """
+    Ejecutar la carga completa de staging sobre una conexión abierta
+    verificar=False omite la verificación de la tabla (el orquestador ya la conoce)
+    Devuelve las métricas de la etapa para la auditoría (etl_stage_runs)
+    """
+    # 1. Verificar que la tabla existe
+    if verificar:
+        verificar_tabla_staging(conn)
+
+    # 2. Limpiar tabla
+    limpiar_tabla_staging(conn)
+
+    if DW_BACKEND == 'duckdb':
+        # 3-4. El motor lee el archivo limpio e inserta en una sola sentencia
+        with medir_etapa('staging', 'insertar') as medicion:
+            registros_insertados = insertar_desde_archivo(conn)
+            medicion['filas'] = registros_insertados
+        filas_entrada = registros_insertados
+    else:
+        # 3. Cargar CSV
+        with medir_etapa('staging', 'cargar_csv') as medicion:
+            df = cargar_csv()
+            medicion['filas'] = len(df)
+
+        # 4. Insertar datos
+        with medir_etapa('staging', 'insertar') as medicion:
+            registros_insertados, errores = insertar_datos_batch(conn, df, batch_size=1000)
+            medicion['filas'] = registros_insertados
+        filas_entrada = len(df)
+
+    # 5. Renovar la muestra estratificada para las consultas aproximadas
+    # (auxiliar: si falla, la carga de staging sigue siendo válida)
+    with medir_etapa('staging', 'muestra') as medicion:
+        try:
+            medicion['filas'] = construir_muestra(None if DW_BACKEND == 'duckdb' else df)
+        except Exception as e:
+            log_message(f"⚠️ No se pudo renovar la muestra de staging: {e}")
+
+    # 6. Validar carga
+    with medir_etapa('staging', 'validar_carga') as medicion:
+        validar_carga(conn, filas_entrada)
+        medicion['filas'] = filas_entrada
+
+    return {
+        'filas_entrada': filas_entrada,
+        'filas_salida': registros_insertados,
+        'filas_rechazadas': filas_entrada - registros_insertados,
+        'bytes_leidos': os.path.getsize(CSV_CLEAN_PATH)
+    }
+
+
 def main():
     """Función principal"""
     log_message("=" * 50)
     log_message("INICIANDO CARGA DE STAGING")
     log_message("=" * 50)
 
-    # 1. Conectar a MySQL
-    conn = conectar_mysql()
+    # Conectar a MySQL
+    conn = conectar_mysql('02_cargar_staging', perfil='carga_masiva')
 
     try:
-        # 2. Verificar que la tabla existe
-        verificar_tabla_staging(conn)
-
-        # 3. Limpiar tabla
-        limpiar_tabla_staging(conn)
-
-        # 4. Cargar CSV
-        df = cargar_csv()
-
-        # 5. Insertar datos
-        registros_insertados, errores = insertar_datos_batch(conn, df, batch_size=1000)
-
-        # 6. Validar carga
-        validar_carga(conn, len(df))
+        resultado = cargar_staging(conn)
 
         log_message("\n" + "=" * 50)
         log_message("CARGA DE STAGING COMPLETADA EXITOSAMENTE")
@@ -266,9 +358,16 @@ def main():
         raise
 
     finally:
+        log_message(f"Resumen de sentencias SQL: {conn.escribir_resumen()}")
         conn.close()
         log_message("Conexión cerrada")
 
+    return resultado
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        with ejecucion_etl('02_cargar_staging'), auditar_etapa('staging') as registro:
+            registro.update(metricas_etapa(main()))
+    except ErrorETL:
+        sys.exit(1)
\ No newline at end of file
@@ -1,36 +1,30 @@
 """
 Script 3: Cargar todas las dimensiones desde staging
+Las claves son deterministas (iguales en cada recarga), para que la carga de
+hechos las calcule desde staging sin unir las dimensiones:
+- Dim_Tiempo: período YYYYMM
+- dimensiones estáticas: código de su valor en config/codigos.json
+- Dim_Acceso: códigos de sus atributos empaquetados
+- Dim_Sintomas: ídem, con el indicador inferido como bit menos significativo
 """
 
-import mysql.connector
-from datetime import datetime
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.config import MYSQL_CONFIG, LOG_FILE
+from config.config import DW_BACKEND, MYSQL_CONFIG
+from errores import ErrorETL
+from bitacora import log_message, medir_etapa
+from base_datos import conectar_mysql, incrementar_generacion
+from auditoria import ejecucion_etl, auditar_etapa, metricas_etapa
+from codigos import VALORES, codificar, decodificar, empaquetar
+from indicadores import CLAVES_DIMENSIONES, COLUMNAS_CLAVE, clave_tiempo, clave_sintomas
 
+# Mayor valor de los tipos enteros sin signo de las claves (02_crear_tablas.sql)
+MAXIMO_CLAVE = {'tinyint': 255, 'smallint': 65535, 'mediumint': 16777215, 'int': 4294967295}
 
-def log_message(message):
-    """Registrar mensajes"""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    log_entry = f"[{timestamp}] {message}"
-    print(log_entry)
-
-    with open(LOG_FILE, 'a', encoding='utf-8') as f:
-        f.write(log_entry + '\n')
-
-
-def conectar_mysql():
-    """Conectar a MySQL"""
-    try:
-        log_message("Conectando a MySQL...")
-        conn = mysql.connector.connect(**MYSQL_CONFIG)
-        log_message("✅ Conexión exitosa")
-        return conn
-    except mysql.connector.Error as err:
-        log_message(f"❌ ERROR: {err}")
-        sys.exit(1)
+# Fracción de la capacidad de una clave a partir de la cual se advierte
+UMBRAL_CAPACIDAD_CLAVE = 0.8
 
 
 def cargar_dim_tiempo(conn):
@@ -42,14 +36,10 @@ def cargar_dim_tiempo(conn):
     # Limpiar dimensión
     cursor.execute("TRUNCATE TABLE Dim_Tiempo")
 
-    # Extraer años y meses parseando manualmente el formato M/D/YYYY
+    # Años y meses ya separados por 02_cargar_staging.py
     query_fechas = """
-    SELECT DISTINCT
-        CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(Timestamp, ' ', 1), '/', -1) AS UNSIGNED) AS anio,
-        CAST(SUBSTRING_INDEX(Timestamp, '/', 1) AS UNSIGNED) AS mes
+    SELECT DISTINCT anio, mes
     FROM mental_health_staging
-    WHERE Timestamp IS NOT NULL
-        AND Timestamp != ''
     ORDER BY anio, mes
     """
 
@@ -72,11 +62,11 @@ def cargar_dim_tiempo(conn):
         semestre = 1 if mes <= 6 else 2
 
         query_insert = """
-        INSERT INTO Dim_Tiempo (anio, mes, nombre_mes, periodo, trimestre, semestre)
-        VALUES (%s, %s, %s, %s, %s, %s)
+        INSERT INTO Dim_Tiempo (id_tiempo, anio, mes, nombre_mes, periodo, trimestre, semestre)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
         """
 
-        cursor.execute(query_insert, (anio, mes, nombre_mes, periodo, trimestre, semestre))
+        cursor.execute(query_insert, (clave_tiempo(anio, mes), anio, mes, nombre_mes, periodo, trimestre, semestre))
 
     conn.commit()
 
@@ -87,175 +77,155 @@ def cargar_dim_tiempo(conn):
 
     cursor.close()
 
+    return count
 
-def cargar_dim_genero(conn):
-    """Cargar Dim_Genero"""
-    log_message("\n--- CARGANDO DIM_GENERO ---")
+
+def cargar_dimension_estatica(conn, tabla, clave, columnas, columna_staging, filas):
+    """
+    Cargar una dimensión de valores fijos con el código de cada valor como clave
+    La primera columna de cada fila es el valor de `columna_staging`; todos
+    los códigos deben tener su fila, porque la carga de hechos usa el código
+    de staging como clave foránea sin unir la dimensión.
+    """
+    log_message(f"\n--- CARGANDO {tabla.upper()} ---")
+
+    valores = [fila[0] for fila in filas]
+    sin_codigo = sorted(set(valores) - set(VALORES[columna_staging]))
+    sin_fila = [valor for valor in VALORES[columna_staging] if valor not in valores]
+    if sin_codigo or sin_fila:
+        if sin_codigo:
+            log_message(f"❌ ERROR: {tabla}: valores sin código en config/codigos.json: {', '.join(sin_codigo)}")
+        if sin_fila:
+            log_message(f"❌ ERROR: {tabla}: códigos de {columna_staging} sin fila en la dimensión: {', '.join(sin_fila)}")
+        raise ErrorETL(f"{tabla} no coincide con los códigos de {columna_staging}")
 
     cursor = conn.cursor()
-    cursor.execute("TRUNCATE TABLE Dim_Genero")
+    cursor.execute(f"TRUNCATE TABLE {tabla}")
 
-    query = """
-    INSERT INTO Dim_Genero (genero, descripcion)
-    VALUES 
-        ('Male', 'Masculino'),
-        ('Female', 'Femenino')
+    query = f"""
+    INSERT INTO {tabla} ({clave}, {', '.join(columnas)})
+    VALUES ({', '.join(['%s'] * (len(columnas) + 1))})
     """
-
-    cursor.execute(query)
+    cursor.executemany(query, [(codigo,) + fila for codigo, fila in zip(codificar(columna_staging, valores), filas)])
     conn.commit()
 
-    cursor.execute("SELECT COUNT(*) FROM Dim_Genero")
+    cursor.execute(f"SELECT COUNT(*) FROM {tabla}")
     count = cursor.fetchone()[0]
-    log_message(f"✅ Dim_Genero cargada: {count} registros")
+    log_message(f"✅ {tabla} cargada: {count} registros")
 
     cursor.close()
 
+    return count
 
-def cargar_dim_historial(conn):
-    """Cargar Dim_Historial"""
-    log_message("\n--- CARGANDO DIM_HISTORIAL ---")
 
-    cursor = conn.cursor()
-    cursor.execute("TRUNCATE TABLE Dim_Historial")
+# Filas de Dim_Genero (clave: código de Gender en config/codigos.json)
+DIM_GENERO = [
+    ('Male', 'Masculino'),
+    ('Female', 'Femenino')
+]
 
-    query = """
-    INSERT INTO Dim_Historial (family_history, descripcion)
-    VALUES 
-        ('Yes', 'Con antecedentes familiares de problemas de salud mental'),
-        ('No', 'Sin antecedentes familiares de problemas de salud mental')
-    """
 
-    cursor.execute(query)
-    conn.commit()
+def cargar_dim_genero(conn):
+    """Cargar Dim_Genero"""
+    return cargar_dimension_estatica(conn, 'Dim_Genero', 'id_genero', ('genero', 'descripcion'), 'Gender', DIM_GENERO)
 
-    cursor.execute("SELECT COUNT(*) FROM Dim_Historial")
-    count = cursor.fetchone()[0]
-    log_message(f"✅ Dim_Historial cargada: {count} registros")
 
-    cursor.close()
+# Filas de Dim_Historial (clave: código de family_history en config/codigos.json)
+DIM_HISTORIAL = [
+    ('Yes', 'Con antecedentes familiares de problemas de salud mental'),
+    ('No', 'Sin antecedentes familiares de problemas de salud mental')
+]
 
 
-def cargar_dim_ocupacion(conn):
-    """Cargar Dim_Ocupacion"""
-    log_message("\n--- CARGANDO DIM_OCUPACION ---")
+def cargar_dim_historial(conn):
+    """Cargar Dim_Historial"""
+    return cargar_dimension_estatica(conn, 'Dim_Historial', 'id_historial', ('family_history', 'descripcion'), 'family_history', DIM_HISTORIAL)
 
-    cursor = conn.cursor()
-    cursor.execute("TRUNCATE TABLE Dim_Ocupacion")
-
-    query = """
-    INSERT INTO Dim_Ocupacion (occupation, descripcion)
-    VALUES 
-        ('Corporate', 'Empleado en sector corporativo'),
-        ('Student', 'Estudiante'),
-        ('Business', 'Empresario o negocio propio'),
-        ('Housewife', 'Ama de casa'),
-        ('Others', 'Otras ocupaciones')
-    """
 
-    cursor.execute(query)
-    conn.commit()
+# Filas de Dim_Ocupacion (clave: código de Occupation en config/codigos.json)
+DIM_OCUPACION = [
+    ('Corporate', 'Empleado en sector corporativo'),
+    ('Student', 'Estudiante'),
+    ('Business', 'Empresario o negocio propio'),
+    ('Housewife', 'Ama de casa'),
+    ('Others', 'Otras ocupaciones')
+]
 
-    cursor.execute("SELECT COUNT(*) FROM Dim_Ocupacion")
-    count = cursor.fetchone()[0]
-    log_message(f"✅ Dim_Ocupacion cargada: {count} registros")
 
-    cursor.close()
+def cargar_dim_ocupacion(conn):
+    """Cargar Dim_Ocupacion"""
+    return cargar_dimension_estatica(conn, 'Dim_Ocupacion', 'id_ocupacion', ('occupation', 'descripcion'), 'Occupation', DIM_OCUPACION)
+
+
+# Filas de Dim_Pais (clave: código de Country en config/codigos.json)
+DIM_PAIS = [
+    # América del Norte
+    ('United States', 'América del Norte', 'USA'),
+    ('Canada', 'América del Norte', 'CAN'),
+    ('Mexico', 'América del Norte', 'MEX'),
+
+    # Europa
+    ('United Kingdom', 'Europa', 'GBR'),
+    ('Germany', 'Europa', 'DEU'),
+    ('France', 'Europa', 'FRA'),
+    ('Netherlands', 'Europa', 'NLD'),
+    ('Sweden', 'Europa', 'SWE'),
+    ('Denmark', 'Europa', 'DNK'),
+    ('Finland', 'Europa', 'FIN'),
+    ('Switzerland', 'Europa', 'CHE'),
+    ('Belgium', 'Europa', 'BEL'),
+    ('Ireland', 'Europa', 'IRL'),
+    ('Poland', 'Europa', 'POL'),
+    ('Portugal', 'Europa', 'PRT'),
+    ('Greece', 'Europa', 'GRC'),
+    ('Italy', 'Europa', 'ITA'),
+    ('Czech Republic', 'Europa', 'CZE'),
+    ('Croatia', 'Europa', 'HRV'),
+    ('Bosnia and Herzegovina', 'Europa', 'BIH'),
+    ('Russia', 'Europa', 'RUS'),
+    ('Moldova', 'Europa', 'MDA'),
+    ('Georgia', 'Europa', 'GEO'),
+
+    # Asia
+    ('India', 'Asia', 'IND'),
+    ('Philippines', 'Asia', 'PHL'),
+    ('Thailand', 'Asia', 'THA'),
+    ('Singapore', 'Asia', 'SGP'),
+    ('Israel', 'Asia', 'ISR'),
+
+    # Oceanía
+    ('Australia', 'Oceanía', 'AUS'),
+    ('New Zealand', 'Oceanía', 'NZL'),
+
+    # África
+    ('Nigeria', 'África', 'NGA'),
+    ('South Africa', 'África', 'ZAF'),
+
+    # América Latina
+    ('Brazil', 'América Latina', 'BRA'),
+    ('Colombia', 'América Latina', 'COL'),
+    ('Costa Rica', 'América Latina', 'CRI')
+]
 
 
 def cargar_dim_pais(conn):
     """Cargar Dim_Pais"""
-    log_message("\n--- CARGANDO DIM_PAIS ---")
+    return cargar_dimension_estatica(conn, 'Dim_Pais', 'id_pais', ('country', 'region', 'codigo_iso'), 'Country', DIM_PAIS)
 
-    cursor = conn.cursor()
-    cursor.execute("TRUNCATE TABLE Dim_Pais")
-
-    query = """
-    INSERT INTO Dim_Pais (country, region, codigo_iso)
-    VALUES 
-        -- América del Norte
-        ('United States', 'América del Norte', 'USA'),
-        ('Canada', 'América del Norte', 'CAN'),
-        ('Mexico', 'América del Norte', 'MEX'),
-        
-        -- Europa
-        ('United Kingdom', 'Europa', 'GBR'),
-        ('Germany', 'Europa', 'DEU'),
-        ('France', 'Europa', 'FRA'),
-        ('Netherlands', 'Europa', 'NLD'),
-        ('Sweden', 'Europa', 'SWE'),
-        ('Denmark', 'Europa', 'DNK'),
-        ('Finland', 'Europa', 'FIN'),
-        ('Switzerland', 'Europa', 'CHE'),
-        ('Belgium', 'Europa', 'BEL'),
-        ('Ireland', 'Europa', 'IRL'),
-        ('Poland', 'Europa', 'POL'),
-        ('Portugal', 'Europa', 'PRT'),
-        ('Greece', 'Europa', 'GRC'),
-        ('Italy', 'Europa', 'ITA'),
-        ('Czech Republic', 'Europa', 'CZE'),
-        ('Croatia', 'Europa', 'HRV'),
-        ('Bosnia and Herzegovina', 'Europa', 'BIH'),
-        ('Russia', 'Europa', 'RUS'),
-        ('Moldova', 'Europa', 'MDA'),
-        ('Georgia', 'Europa', 'GEO'),
-        
-        -- Asia
-        ('India', 'Asia', 'IND'),
-        ('Philippines', 'Asia', 'PHL'),
-        ('Thailand', 'Asia', 'THA'),
-        ('Singapore', 'Asia', 'SGP'),
-        ('Israel', 'Asia', 'ISR'),
-        
-        -- Oceanía
-        ('Australia', 'Oceanía', 'AUS'),
-        ('New Zealand', 'Oceanía', 'NZL'),
-        
-        -- África
-        ('Nigeria', 'África', 'NGA'),
-        ('South Africa', 'África', 'ZAF'),
-        
-        -- América Latina
-        ('Brazil', 'América Latina', 'BRA'),
-        ('Colombia', 'América Latina', 'COL'),
-        ('Costa Rica', 'América Latina', 'CRI')
-    """
-
-    cursor.execute(query)
-    conn.commit()
-
-    cursor.execute("SELECT COUNT(*) FROM Dim_Pais")
-    count = cursor.fetchone()[0]
-    log_message(f"✅ Dim_Pais cargada: {count} registros")
 
-    cursor.close()
+# Filas de Dim_Aislamiento (clave: código de Days_Indoors en config/codigos.json)
+DIM_AISLAMIENTO = [
+    ('Go out Every day', 1, 'Bajo'),
+    ('1-14 days', 2, 'Bajo'),
+    ('15-30 days', 3, 'Medio'),
+    ('31-60 days', 4, 'Alto'),
+    ('More than 2 months', 5, 'Alto')
+]
 
 
 def cargar_dim_aislamiento(conn):
     """Cargar Dim_Aislamiento"""
-    log_message("\n--- CARGANDO DIM_AISLAMIENTO ---")
-
-    cursor = conn.cursor()
-    cursor.execute("TRUNCATE TABLE Dim_Aislamiento")
-
-    query = """
-    INSERT INTO Dim_Aislamiento (days_indoors, orden, categoria)
-    VALUES 
-        ('Go out Every day', 1, 'Bajo'),
-        ('1-14 days', 2, 'Bajo'),
-        ('15-30 days', 3, 'Medio'),
-        ('31-60 days', 4, 'Alto'),
-        ('More than 2 months', 5, 'Alto')
-    """
-
-    cursor.execute(query)
-    conn.commit()
-
-    cursor.execute("SELECT COUNT(*) FROM Dim_Aislamiento")
-    count = cursor.fetchone()[0]
-    log_message(f"✅ Dim_Aislamiento cargada: {count} registros")
-
-    cursor.close()
+    return cargar_dimension_estatica(conn, 'Dim_Aislamiento', 'id_aislamiento', ('days_indoors', 'orden', 'categoria'), 'Days_Indoors', DIM_AISLAMIENTO)
 
 
 def cargar_dim_sintomas(conn):
@@ -286,8 +256,16 @@ def cargar_dim_sintomas(conn):
 
     log_message(f"Encontradas {len(combinaciones)} combinaciones únicas de síntomas")
 
-    # Insertar cada combinación con el indicador calculado
-    for growing, mood, coping, social, days in combinaciones:
+    # Calcular el indicador de cada combinación; Days_Indoors solo interviene
+    # en el indicador, así que varias combinaciones dan la misma fila
+    filas = {}
+    for codigos_combinacion in combinaciones:
+        growing, mood, coping, social, days = (
+            decodificar(columna, codigo) for columna, codigo in zip(
+                COLUMNAS_CLAVE['id_sintomas'] + ('Days_Indoors',), codigos_combinacion
+            )
+        )
+
         # Calcular indicador_inferido_estres
         if growing == 'Yes':
             indicador = True
@@ -298,13 +276,17 @@ def cargar_dim_sintomas(conn):
         else:
             indicador = False
 
-        query_insert = """
-        INSERT INTO Dim_Sintomas 
-            (growing_stress, mood_swings, coping_struggles, social_weakness, indicador_inferido_estres)
-        VALUES (%s, %s, %s, %s, %s)
-        """
+        clave = clave_sintomas(codigos_combinacion[:4], indicador)
+        filas[clave] = (clave, growing, mood, coping, social, indicador)
+
+    # Insertar cada fila (clave: códigos de los síntomas y el indicador)
+    query_insert = """
+    INSERT INTO Dim_Sintomas 
+        (id_sintomas, growing_stress, mood_swings, coping_struggles, social_weakness, indicador_inferido_estres)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    """
 
-        cursor.execute(query_insert, (growing, mood, coping, social, indicador))
+    cursor.executemany(query_insert, sorted(filas.values()))
 
     conn.commit()
 
@@ -328,6 +310,8 @@ def cargar_dim_sintomas(conn):
 
     cursor.close()
 
+    return count
+
 
 def cargar_dim_acceso(conn):
     """Cargar Dim_Acceso - CORREGIDO: sin treatment"""
@@ -351,14 +335,17 @@ def cargar_dim_acceso(conn):
 
     log_message(f"Encontradas {len(combinaciones)} combinaciones únicas de acceso")
 
-    # Insertar cada combinación
-    for care, interview in combinaciones:
+    # Insertar cada combinación; la clave empaqueta sus códigos
+    columnas_clave = COLUMNAS_CLAVE['id_acceso']
+    for cod_care, cod_interview in combinaciones:
         query_insert = """
-        INSERT INTO Dim_Acceso (care_options, mental_health_interview)
-        VALUES (%s, %s)
+        INSERT INTO Dim_Acceso (id_acceso, care_options, mental_health_interview)
+        VALUES (%s, %s, %s)
         """
 
-        cursor.execute(query_insert, (care, interview))
+        cursor.execute(query_insert, (empaquetar(columnas_clave, (cod_care, cod_interview)),
+                                      decodificar('care_options', cod_care),
+                                      decodificar('mental_health_interview', cod_interview)))
 
     conn.commit()
 
@@ -369,6 +356,8 @@ def cargar_dim_acceso(conn):
 
     cursor.close()
 
+    return count
+
 
 def validar_dimensiones(conn):
     """Validar que todas las dimensiones se cargaron correctamente"""
@@ -398,8 +387,67 @@ def validar_dimensiones(conn):
         else:
             log_message(f"❌ {dim}: 0 registros (ERROR)")
 
+    verificar_capacidad_claves(cursor)
+    cursor.close()
+
+
+def verificar_capacidad_claves(cursor):
+    """
+    Advertir las dimensiones cuya clave se acerca al máximo de su tipo
+    Las claves (y las de la tabla de hechos) son TINYINT/SMALLINT UNSIGNED:
+    al agotarse, la carga falla. DuckDB usa INTEGER y no lo necesita.
+    """
+    if DW_BACKEND == 'duckdb':
+        return
+
+    for clave, dim in CLAVES_DIMENSIONES:
+        cursor.execute("""
+            SELECT DATA_TYPE
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """, (MYSQL_CONFIG['database'], dim, clave))
+        fila = cursor.fetchone()
+        maximo = MAXIMO_CLAVE.get(fila[0].lower()) if fila else None
+        if maximo is None:
+            continue
+
+        cursor.execute(f"SELECT MAX({clave}) FROM {dim}")
+        usado = cursor.fetchone()[0] or 0
+        if usado > maximo * UMBRAL_CAPACIDAD_CLAVE:
+            log_message(f"⚠️ {dim}.{clave} ({fila[0]}): {usado} de {maximo} claves usadas; "
+                        f"ampliar el tipo en la dimensión y en la tabla de hechos")
+
+
+def cargar_dimension_sin_fk(conn, cargar_dimension):
+    """
+    Cargar una dimensión con FOREIGN_KEY_CHECKS desactivado en la sesión
+    Permite cargar cada dimensión en su propia conexión (TRUNCATE de tablas
+    referenciadas por la tabla de hechos)
+    """
+    cursor = conn.cursor()
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
     cursor.close()
 
+    try:
+        return cargar_dimension(conn)
+    finally:
+        cursor = conn.cursor()
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        cursor.close()
+
+
+# Cargas de dimensiones en orden de ejecución
+CARGAS_DIMENSIONES = [
+    cargar_dim_tiempo,
+    cargar_dim_genero,
+    cargar_dim_historial,
+    cargar_dim_ocupacion,
+    cargar_dim_pais,
+    cargar_dim_aislamiento,
+    cargar_dim_sintomas,
+    cargar_dim_acceso
+]
+
 """
 def main():
     Función principal
@@ -447,7 +495,8 @@ def main():
     log_message("=" * 50)
 
     # Conectar
-    conn = conectar_mysql()
+    conn = conectar_mysql('03_cargar_dimensiones', perfil='carga_masiva')
+    total = 0
 
     try:
         # DESACTIVAR verificación de claves foráneas
@@ -458,14 +507,10 @@ def main():
         log_message("✅ FK checks desactivados")
 
         # Cargar cada dimensión
-        cargar_dim_tiempo(conn)
-        cargar_dim_genero(conn)
-        cargar_dim_historial(conn)
-        cargar_dim_ocupacion(conn)
-        cargar_dim_pais(conn)
-        cargar_dim_aislamiento(conn)
-        cargar_dim_sintomas(conn)
-        cargar_dim_acceso(conn)
+        for cargar_dimension in CARGAS_DIMENSIONES:
+            with medir_etapa('dimensiones', cargar_dimension.__name__) as medicion:
+                medicion['filas'] = cargar_dimension(conn)
+            total += medicion['filas']
 
         # REACTIVAR verificación de claves foráneas
         cursor = conn.cursor()
@@ -477,6 +522,9 @@ def main():
         # Validar
         validar_dimensiones(conn)
 
+        # Invalidar cachés de lectura (API)
+        incrementar_generacion(conn)
+
         log_message("\n" + "=" * 50)
         log_message("DIMENSIONES CARGADAS EXITOSAMENTE")
         log_message("=" * 50)
@@ -494,10 +542,20 @@ def main():
             pass
 
         conn.rollback()
+        if isinstance(e, ErrorETL):
+            raise
+        raise ErrorETL(f"Error al cargar dimensiones: {e}") from e
     finally:
+        log_message(f"Resumen de sentencias SQL: {conn.escribir_resumen()}")
         conn.close()
         log_message("Conexión cerrada")
 
+    return total
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        with ejecucion_etl('03_cargar_dimensiones'), auditar_etapa('dimensiones') as registro:
+            registro.update(metricas_etapa(main()))
+    except ErrorETL:
+        sys.exit(1)
\ No newline at end of file
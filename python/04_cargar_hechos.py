@@ -1,37 +1,23 @@
 """
 Script 4: Cargar tabla de hechos con los 16 indicadores
-Proceso: Agregación desde staging + JOINs con dimensiones
+Proceso: Agregación desde staging con las claves de las dimensiones
+calculadas desde sus columnas (claves deterministas, sin JOIN)
 """
 
-import mysql.connector
-from datetime import datetime
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.config import MYSQL_CONFIG, LOG_FILE
-
-
-def log_message(message):
-    """Registrar mensajes"""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    log_entry = f"[{timestamp}] {message}"
-    print(log_entry)
-
-    with open(LOG_FILE, 'a', encoding='utf-8') as f:
-        f.write(log_entry + '\n')
-
-
-def conectar_mysql():
-    """Conectar a MySQL"""
-    try:
-        log_message("Conectando a MySQL...")
-        conn = mysql.connector.connect(**MYSQL_CONFIG)
-        log_message("✅ Conexión exitosa")
-        return conn
-    except mysql.connector.Error as err:
-        log_message(f"❌ ERROR: {err}")
-        sys.exit(1)
+from config.config import (
+    DW_BACKEND, MYSQL_CONFIG, HECHOS_FORMATO_FILA, HECHOS_KEY_BLOCK_SIZE, HECHOS_COMPRESION_PAGINA
+)
+from errores import ErrorETL
+from bitacora import log_message, medir_etapa
+from base_datos import conectar_mysql, incrementar_generacion, ERRORES_BD
+from auditoria import ejecucion_etl, auditar_etapa, metricas_etapa, run_actual
+from indicadores import CLAVES_DIMENSIONES, generar_sql_hechos, columnas_indicadores
+from chequeos import TABLA_HECHOS, chequeos_rango, chequeos_huerfanos
+from marcas_validacion import chequear_desde_marca, reiniciar_marcas
 
 
 def verificar_dimensiones(conn):
@@ -67,7 +53,7 @@ def verificar_dimensiones(conn):
 
     if not todas_ok:
         log_message("\n❌ ERROR: Faltan dimensiones. Ejecuta 03_cargar_dimensiones.py primero")
-        sys.exit(1)
+        raise ErrorETL("Faltan dimensiones")
 
     log_message("✅ Todas las dimensiones verificadas")
 
@@ -81,18 +67,80 @@ def limpiar_tabla_hechos(conn):
     cursor.execute("TRUNCATE TABLE Hechos_Estres_SaludMental")
     cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
     conn.commit()
+    reiniciar_marcas(TABLA_HECHOS)
 
     log_message("✅ Tabla de hechos limpiada")
     cursor.close()
 
 
+def opciones_formato_hechos(formato=HECHOS_FORMATO_FILA):
+    """
+    (ROW_FORMAT, KEY_BLOCK_SIZE, COMPRESSION) de un formato de HECHOS_FORMATO_FILA
+    KEY_BLOCK_SIZE 0 y COMPRESSION 'none' quitan la opción del formato anterior.
+    """
+    formatos = {
+        'DYNAMIC': ('DYNAMIC', 0, 'none'),
+        'COMPRESSED': ('COMPRESSED', HECHOS_KEY_BLOCK_SIZE, 'none'),
+        'PAGINA': ('DYNAMIC', 0, HECHOS_COMPRESION_PAGINA)
+    }
+    if formato not in formatos:
+        log_message(f"❌ ERROR: HECHOS_FORMATO_FILA desconocido: {formato} (DYNAMIC, COMPRESSED o PAGINA)")
+        raise ErrorETL(f"Formato de fila desconocido: {formato}")
+    return formatos[formato]
+
+
+def aplicar_formato_hechos(conn, formato=HECHOS_FORMATO_FILA):
+    """
+    Llevar la tabla de hechos (vacía) al formato de fila configurado
+    Se llama después del TRUNCATE, cuando reconstruir la tabla no cuesta nada;
+    si el servidor no admite el formato la carga sigue con el actual.
+    """
+    if formato is None or DW_BACKEND == 'duckdb':
+        return
+
+    row_format, key_block_size, compresion = opciones_formato_hechos(formato)
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT ROW_FORMAT, CREATE_OPTIONS
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+    """, (MYSQL_CONFIG['database'], TABLA_HECHOS))
+    actual, opciones = cursor.fetchone()
+    opciones = (opciones or '').lower()
+
+    vigente = (
+        actual.upper() == row_format
+        and (f"key_block_size={key_block_size}" in opciones) == bool(key_block_size)
+        and (f"compression='{compresion}'" in opciones) == (compresion != 'none')
+    )
+    if vigente:
+        cursor.close()
+        return
+
+    # COMPRESSION solo para activarla o quitar la de un formato anterior
+    # (no se combina con ROW_FORMAT=COMPRESSED)
+    opcion_compresion = ''
+    if compresion != 'none' or 'compression=' in opciones:
+        opcion_compresion = f" COMPRESSION='{compresion}'"
+
+    try:
+        cursor.execute(f"ALTER TABLE {TABLA_HECHOS} "
+                       f"ROW_FORMAT={row_format} KEY_BLOCK_SIZE={key_block_size}{opcion_compresion}")
+        log_message(f"✅ Formato de fila de {TABLA_HECHOS}: {actual} {opciones} → {formato}")
+    except ERRORES_BD as err:
+        log_message(f"⚠️ No se pudo aplicar el formato {formato} a {TABLA_HECHOS}: {err}")
+    finally:
+        cursor.close()
+
+
 def cargar_hechos(conn):
     """
     Cargar tabla de hechos con todos los indicadores
 
     Estrategia:
-    1. Agrupar staging por las 8 dimensiones
-    2. Hacer JOINs para obtener IDs de dimensiones
+    1. Calcular las claves de las 8 dimensiones desde staging
+    2. Agrupar staging por esas claves
     3. Calcular los 16 indicadores para cada grupo
     4. Insertar en tabla de hechos
     """
@@ -101,246 +149,15 @@ def cargar_hechos(conn):
 
     cursor = conn.cursor()
 
-    # Query complejo que:
-    # - Agrupa staging por las 8 dimensiones
-    # - Hace JOIN con cada dimensión para obtener IDs
-    # - Calcula los 16 indicadores
-
-    query = """
-    INSERT INTO Hechos_Estres_SaludMental (
-        id_tiempo, id_genero, id_historial, id_ocupacion, id_pais, 
-        id_aislamiento, id_sintomas, id_acceso,
-        cantidad_estres, porcentaje_estres,
-        cantidad_historial_estres, porcentaje_historial_estres,
-        cantidad_estres_afrontamiento, porcentaje_estres_afrontamiento_ocupacion,
-        porcentaje_tratamiento, porcentaje_no_tratamiento, cantidad_tratamiento,
-        porcentaje_deterioro_aislamiento, porcentaje_humor_aislamiento,
-        porcentaje_debilidad_aislamiento, porcentaje_acceso_recursos,
-        cantidad_estres_acceso, porcentaje_sintomas_no_reconocidos,
-        porcentaje_recursos_sin_tratamiento, porcentaje_postergacion
-    )
-    SELECT 
-        -- Claves foráneas
-        dt.id_tiempo,
-        dg.id_genero,
-        dh.id_historial,
-        do.id_ocupacion,
-        dp.id_pais,
-        da.id_aislamiento,
-        ds.id_sintomas,
-        dac.id_acceso,
-
-        -- INDICADOR 1: Cantidad con estrés creciente
-        SUM(CASE WHEN s.Growing_Stress = 'Yes' THEN 1 ELSE 0 END) as cantidad_estres,
-
-        -- INDICADOR 2: Porcentaje con estrés creciente
-        ROUND(
-            (SUM(CASE WHEN s.Growing_Stress = 'Yes' THEN 1 ELSE 0 END) / COUNT(*)) * 100, 
-            2
-        ) as porcentaje_estres,
-
-        -- INDICADOR 3: Cantidad con historial familiar y estrés
-        SUM(
-            CASE WHEN s.family_history = 'Yes' AND s.Growing_Stress = 'Yes' 
-            THEN 1 ELSE 0 END
-        ) as cantidad_historial_estres,
-
-        -- INDICADOR 4: Proporción con historial familiar que desarrollan estrés
-        CASE 
-            WHEN SUM(CASE WHEN s.family_history = 'Yes' THEN 1 ELSE 0 END) > 0 
-            THEN ROUND(
-                (SUM(CASE WHEN s.family_history = 'Yes' AND s.Growing_Stress = 'Yes' THEN 1 ELSE 0 END) / 
-                 SUM(CASE WHEN s.family_history = 'Yes' THEN 1 ELSE 0 END)) * 100, 
-                2
-            )
-            ELSE NULL
-        END as porcentaje_historial_estres,
-
-        -- INDICADOR 5: Cantidad con estrés y dificultades de afrontamiento
-        SUM(
-            CASE WHEN s.Growing_Stress = 'Yes' AND s.Coping_Struggles = 'Yes' 
-            THEN 1 ELSE 0 END
-        ) as cantidad_estres_afrontamiento,
-
-        -- INDICADOR 6: Proporción con estrés y dificultades por ocupación/país
-        ROUND(
-            (SUM(CASE WHEN s.Growing_Stress = 'Yes' AND s.Coping_Struggles = 'Yes' THEN 1 ELSE 0 END) / 
-             COUNT(*)) * 100, 
-            2
-        ) as porcentaje_estres_afrontamiento_ocupacion,
-
-        -- INDICADOR 7a: Porcentaje en tratamiento
-        ROUND(
-            (SUM(CASE WHEN s.treatment = 'Yes' THEN 1 ELSE 0 END) / COUNT(*)) * 100, 
-            2
-        ) as porcentaje_tratamiento,
-
-        -- INDICADOR 7b: Porcentaje sin tratamiento
-        ROUND(
-            (SUM(CASE WHEN s.treatment = 'No' THEN 1 ELSE 0 END) / COUNT(*)) * 100, 
-            2
-        ) as porcentaje_no_tratamiento,
-
-        -- INDICADOR 8: Cantidad en tratamiento
-        SUM(CASE WHEN s.treatment = 'Yes' THEN 1 ELSE 0 END) as cantidad_tratamiento,
-
-        -- INDICADOR 9: Proporción con deterioro emocional por aislamiento
-        ROUND(
-            (SUM(CASE WHEN s.Growing_Stress = 'Yes' THEN 1 ELSE 0 END) / COUNT(*)) * 100, 
-            2
-        ) as porcentaje_deterioro_aislamiento,
-
-        -- INDICADOR 10: Proporción con cambios de humor por aislamiento
-        ROUND(
-            (SUM(CASE WHEN s.Mood_Swings IN ('Medium', 'High') THEN 1 ELSE 0 END) / COUNT(*)) * 100, 
-            2
-        ) as porcentaje_humor_aislamiento,
-
-        -- INDICADOR 11: Proporción con debilidad social por aislamiento
-        ROUND(
-            (SUM(CASE WHEN s.Social_Weakness = 'Yes' THEN 1 ELSE 0 END) / COUNT(*)) * 100, 
-            2
-        ) as porcentaje_debilidad_aislamiento,
-
-        -- INDICADOR 12: Proporción con estrés que tienen acceso a recursos
-        CASE 
-            WHEN SUM(CASE WHEN s.Growing_Stress = 'Yes' THEN 1 ELSE 0 END) > 0 
-            THEN ROUND(
-                (SUM(CASE WHEN s.Growing_Stress = 'Yes' AND s.care_options IN ('Yes', 'Not sure') THEN 1 ELSE 0 END) / 
-                 SUM(CASE WHEN s.Growing_Stress = 'Yes' THEN 1 ELSE 0 END)) * 100, 
-                2
-            )
-            ELSE NULL
-        END as porcentaje_acceso_recursos,
-
-        -- INDICADOR 13: Cantidad con estrés y acceso a recursos
-        SUM(
-            CASE WHEN s.Growing_Stress = 'Yes' AND s.care_options IN ('Yes', 'Not sure') 
-            THEN 1 ELSE 0 END
-        ) as cantidad_estres_acceso,
-
-        -- INDICADOR 14: Proporción con síntomas no reconocidos que buscan tratamiento
-        CASE 
-            WHEN SUM(
-                CASE WHEN s.Growing_Stress IN ('No', 'Maybe') 
-                     AND s.Mood_Swings IN ('Medium', 'High')
-                     AND s.Coping_Struggles = 'Yes'
-                     AND s.Days_Indoors IN ('15-30 days', '31-60 days', 'More than 2 months')
-                THEN 1 ELSE 0 END
-            ) > 0
-            THEN ROUND(
-                (SUM(
-                    CASE WHEN s.Growing_Stress IN ('No', 'Maybe')
-                         AND s.Mood_Swings IN ('Medium', 'High')
-                         AND s.Coping_Struggles = 'Yes'
-                         AND s.Days_Indoors IN ('15-30 days', '31-60 days', 'More than 2 months')
-                         AND s.treatment = 'Yes'
-                    THEN 1 ELSE 0 END
-                ) / 
-                SUM(
-                    CASE WHEN s.Growing_Stress IN ('No', 'Maybe')
-                         AND s.Mood_Swings IN ('Medium', 'High')
-                         AND s.Coping_Struggles = 'Yes'
-                         AND s.Days_Indoors IN ('15-30 days', '31-60 days', 'More than 2 months')
-                    THEN 1 ELSE 0 END
-                )) * 100,
-                2
-            )
-            ELSE NULL
-        END as porcentaje_sintomas_no_reconocidos,
-
-        -- INDICADOR 15: Proporción con recursos disponibles que no buscan tratamiento
-        CASE 
-            WHEN SUM(
-                CASE WHEN ds.indicador_inferido_estres = 1 
-                     AND s.care_options IN ('Yes', 'Not sure')
-                THEN 1 ELSE 0 END
-            ) > 0
-            THEN ROUND(
-                (SUM(
-                    CASE WHEN ds.indicador_inferido_estres = 1
-                         AND s.care_options IN ('Yes', 'Not sure')
-                         AND s.treatment = 'No'
-                    THEN 1 ELSE 0 END
-                ) / 
-                SUM(
-                    CASE WHEN ds.indicador_inferido_estres = 1
-                         AND s.care_options IN ('Yes', 'Not sure')
-                    THEN 1 ELSE 0 END
-                )) * 100,
-                2
-            )
-            ELSE NULL
-        END as porcentaje_recursos_sin_tratamiento,
-
-        -- INDICADOR 16: Proporción que posterga tratamiento con recursos disponibles
-        CASE 
-            WHEN SUM(
-                CASE WHEN ds.indicador_inferido_estres = 1
-                     AND s.mental_health_interview IN ('Yes', 'Maybe')
-                     AND s.care_options IN ('Yes', 'Not sure')
-                THEN 1 ELSE 0 END
-            ) > 0
-            THEN ROUND(
-                (SUM(
-                    CASE WHEN ds.indicador_inferido_estres = 1
-                         AND s.mental_health_interview IN ('Yes', 'Maybe')
-                         AND s.care_options IN ('Yes', 'Not sure')
-                         AND s.treatment = 'No'
-                    THEN 1 ELSE 0 END
-                ) / 
-                SUM(
-                    CASE WHEN ds.indicador_inferido_estres = 1
-                         AND s.mental_health_interview IN ('Yes', 'Maybe')
-                         AND s.care_options IN ('Yes', 'Not sure')
-                    THEN 1 ELSE 0 END
-                )) * 100,
-                2
-            )
-            ELSE NULL
-        END as porcentaje_postergacion
-
-    FROM mental_health_staging s
-
-    -- JOINs con dimensiones para obtener IDs
-    INNER JOIN Dim_Tiempo dt ON 
-        dt.anio = CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(s.Timestamp, ' ', 1), '/', -1) AS UNSIGNED)
-        AND dt.mes = CAST(SUBSTRING_INDEX(s.Timestamp, '/', 1) AS UNSIGNED)
-
-    INNER JOIN Dim_Genero dg ON 
-        dg.genero = s.Gender
-
-    INNER JOIN Dim_Historial dh ON 
-        dh.family_history = s.family_history
-
-    INNER JOIN Dim_Ocupacion do ON 
-        do.occupation = s.Occupation
-
-    INNER JOIN Dim_Pais dp ON 
-        dp.country = s.Country
-
-    INNER JOIN Dim_Aislamiento da ON 
-        da.days_indoors = s.Days_Indoors
-
-    INNER JOIN Dim_Sintomas ds ON 
-        ds.growing_stress = s.Growing_Stress
-        AND ds.mood_swings = s.Mood_Swings
-        AND ds.coping_struggles = s.Coping_Struggles
-        AND ds.social_weakness = s.Social_Weakness
-
-    INNER JOIN Dim_Acceso dac ON 
-        dac.care_options = s.care_options
-        AND dac.mental_health_interview = s.mental_health_interview
-
-    -- Agrupar por todas las dimensiones
-    GROUP BY 
-        dt.id_tiempo, dg.id_genero, dh.id_historial, do.id_ocupacion,
-        dp.id_pais, da.id_aislamiento, ds.id_sintomas, dac.id_acceso
-    """
+    # Query generado desde el registro de indicadores:
+    # - Agrupa staging por las 8 claves, calculadas sin unir las dimensiones
+    # - Evalúa cada predicado distinto una sola vez
+    # - Deriva los 16 indicadores a partir de esos conteos
+    query = generar_sql_hechos()
 
     try:
         log_message("Ejecutando query de agregación...")
-        cursor.execute(query)
+        cursor.execute(query, (run_actual(),))
         conn.commit()
 
         # Obtener cantidad de registros insertados
@@ -349,13 +166,15 @@ def cargar_hechos(conn):
 
         log_message(f"✅ Tabla de hechos cargada: {count} registros agregados")
 
-    except mysql.connector.Error as err:
+    except ERRORES_BD as err:
         log_message(f"❌ ERROR al cargar hechos: {err}")
         conn.rollback()
         raise
 
     cursor.close()
 
+    return count
+
 
 def validar_hechos(conn):
     """Validar tabla de hechos"""
@@ -363,61 +182,26 @@ def validar_hechos(conn):
 
     cursor = conn.cursor()
 
-    # 1. Cantidad total de registros
-    cursor.execute("SELECT COUNT(*) FROM Hechos_Estres_SaludMental")
-    total = cursor.fetchone()[0]
+    # 1. Cantidad total de registros y huérfanos (un solo recorrido)
+    total, huerfanos = chequear_desde_marca(conn, TABLA_HECHOS, chequeos_huerfanos(conn))
     log_message(f"Total de hechos: {total}")
 
     # 2. Verificar que no hay registros huérfanos
     log_message("\nVerificando integridad referencial...")
 
-    dimensiones = [
-        ('id_tiempo', 'Dim_Tiempo'),
-        ('id_genero', 'Dim_Genero'),
-        ('id_historial', 'Dim_Historial'),
-        ('id_ocupacion', 'Dim_Ocupacion'),
-        ('id_pais', 'Dim_Pais'),
-        ('id_aislamiento', 'Dim_Aislamiento'),
-        ('id_sintomas', 'Dim_Sintomas'),
-        ('id_acceso', 'Dim_Acceso')
-    ]
-
-    for fk, tabla_dim in dimensiones:
-        query = f"""
-        SELECT COUNT(*) 
-        FROM Hechos_Estres_SaludMental h
-        LEFT JOIN {tabla_dim} d ON h.{fk} = d.{fk}
-        WHERE d.{fk} IS NULL
-        """
-        cursor.execute(query)
-        huerfanos = cursor.fetchone()[0]
-
-        if huerfanos == 0:
+    for fk, _ in CLAVES_DIMENSIONES:
+        if huerfanos[fk] == 0:
             log_message(f"  ✅ {fk}: sin huérfanos")
         else:
-            log_message(f"  ❌ {fk}: {huerfanos} registros huérfanos")
+            log_message(f"  ❌ {fk}: {huerfanos[fk]} registros huérfanos")
 
     # 3. Verificar rangos de indicadores
     log_message("\nVerificando rangos de indicadores...")
 
-    # Porcentajes deben estar entre 0 y 100
-    porcentajes = [
-        'porcentaje_estres', 'porcentaje_historial_estres',
-        'porcentaje_estres_afrontamiento_ocupacion', 'porcentaje_tratamiento',
-        'porcentaje_no_tratamiento', 'porcentaje_deterioro_aislamiento',
-        'porcentaje_humor_aislamiento', 'porcentaje_debilidad_aislamiento',
-        'porcentaje_acceso_recursos', 'porcentaje_sintomas_no_reconocidos',
-        'porcentaje_recursos_sin_tratamiento', 'porcentaje_postergacion'
-    ]
-
-    for pct in porcentajes:
-        query = f"""
-        SELECT COUNT(*) 
-        FROM Hechos_Estres_SaludMental 
-        WHERE {pct} IS NOT NULL AND ({pct} < 0 OR {pct} > 100)
-        """
-        cursor.execute(query)
-        fuera_rango = cursor.fetchone()[0]
+    # Porcentajes deben estar entre 0 y 100 (una sola consulta)
+    _, fallas = chequear_desde_marca(conn, TABLA_HECHOS, chequeos_rango('porcentaje'))
+    for pct in columnas_indicadores('porcentaje'):
+        fuera_rango = fallas[pct]
 
         if fuera_rango > 0:
             log_message(f"  ⚠️ {pct}: {fuera_rango} valores fuera de rango [0-100]")
@@ -450,26 +234,50 @@ def validar_hechos(conn):
     cursor.close()
 
 
+def cargar_tabla_hechos(conn, verificar=True):
+    """
+    Ejecutar la carga completa de hechos sobre una conexión abierta
+    verificar=False omite la verificación de dimensiones (ya validadas por el orquestador)
+    Devuelve las métricas de la etapa para la auditoría (etl_stage_runs)
+    """
+    # 1. Verificar dimensiones
+    if verificar:
+        verificar_dimensiones(conn)
+
+    # 2. Limpiar hechos (y ajustar su formato de fila mientras está vacía)
+    limpiar_tabla_hechos(conn)
+    aplicar_formato_hechos(conn)
+
+    # 3. Cargar hechos
+    with medir_etapa('hechos', 'cargar_hechos') as medicion:
+        total = cargar_hechos(conn)
+        medicion['filas'] = total
+
+    # Invalidar cachés de lectura (API)
+    incrementar_generacion(conn)
+
+    # 4. Validar
+    with medir_etapa('hechos', 'validar_hechos'):
+        validar_hechos(conn)
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM mental_health_staging")
+    filas_staging = cursor.fetchone()[0]
+    cursor.close()
+
+    return {'filas_entrada': filas_staging, 'filas_salida': total}
+
+
 def main():
     """Función principal"""
     log_message("=" * 50)
     log_message("INICIANDO CARGA DE TABLA DE HECHOS")
     log_message("=" * 50)
 
-    conn = conectar_mysql()
+    conn = conectar_mysql('04_cargar_hechos', perfil='agregacion')
 
     try:
-        # 1. Verificar dimensiones
-        verificar_dimensiones(conn)
-
-        # 2. Limpiar hechos
-        limpiar_tabla_hechos(conn)
-
-        # 3. Cargar hechos
-        cargar_hechos(conn)
-
-        # 4. Validar
-        validar_hechos(conn)
+        resultado = cargar_tabla_hechos(conn)
 
         log_message("\n" + "=" * 50)
         log_message("TABLA DE HECHOS CARGADA EXITOSAMENTE")
@@ -481,9 +289,16 @@ def main():
         raise
 
     finally:
+        log_message(f"Resumen de sentencias SQL: {conn.escribir_resumen()}")
         conn.close()
         log_message("Conexión cerrada")
 
+    return resultado
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        with ejecucion_etl('04_cargar_hechos'), auditar_etapa('hechos') as registro:
+            registro.update(metricas_etapa(main()))
+    except ErrorETL:
+        sys.exit(1)
\ No newline at end of file
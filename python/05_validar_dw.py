@@ -3,35 +3,55 @@ Script 5: Validación completa del Data Warehouse
 Verifica integridad, consistencia y calidad de datos
 """
 
-import mysql.connector
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+import argparse
+import json
+import logging
 import sys
 import os
+import threading
+import time
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.config import MYSQL_CONFIG, LOG_FILE
-
-
-def log_message(message):
-    """Registrar mensajes"""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    log_entry = f"[{timestamp}] {message}"
-    print(log_entry)
-
-    with open(LOG_FILE, 'a', encoding='utf-8') as f:
-        f.write(log_entry + '\n')
+from config.config import (
+    DW_BACKEND, VALIDACION_CACHE_FILE, VALIDACION_APROXIMADA, MUESTREO_ERROR_MAX, VALIDACION_WORKERS,
+    VALIDACION_LIMITE_CHEQUEO_S, VALIDACION_PRESUPUESTO_S, VALIDACION_REPORTE_FILE
+)
+from errores import ErrorETL
+from bitacora import log_message, medir_etapa, agrupar_mensajes, emitir_mensajes
+from base_datos import obtener_conexion, interrumpir_consulta
+from auditoria import ejecucion_etl, auditar_etapa
+from indicadores import CLAVES_DIMENSIONES, columnas_indicadores
+from chequeos import TABLA_HECHOS, Chequeo, chequeos_rango, chequeos_huerfanos
+from marcas_validacion import chequear_desde_marca, barrido_completo
+from muestreo import cargar_muestra, consultar_indicador
+
+
+# Chequeos de validar_indicadores, compilados en una sola consulta
+CHEQUEOS_INDICADORES = chequeos_rango('porcentaje') + chequeos_rango('cantidad') + [
+    Chequeo('tratamiento_inconsistente', """
+        porcentaje_tratamiento IS NOT NULL
+        AND porcentaje_no_tratamiento IS NOT NULL
+        AND ABS((porcentaje_tratamiento + porcentaje_no_tratamiento) - 100) > 1
+    """)
+]
 
 
-def conectar_mysql():
-    """Conectar a MySQL"""
-    try:
-        log_message("Conectando a MySQL...")
-        conn = mysql.connector.connect(**MYSQL_CONFIG)
-        log_message("✅ Conexión exitosa")
-        return conn
-    except mysql.connector.Error as err:
-        log_message(f"❌ ERROR: {err}")
-        sys.exit(1)
+# Tablas cuya existencia comprueba validar_estructura
+TABLAS_ESPERADAS = [
+    'mental_health_staging',
+    'codigos_staging',
+    'Dim_Tiempo',
+    'Dim_Genero',
+    'Dim_Historial',
+    'Dim_Ocupacion',
+    'Dim_Pais',
+    'Dim_Aislamiento',
+    'Dim_Sintomas',
+    'Dim_Acceso',
+    'Hechos_Estres_SaludMental'
+]
 
 
 def validar_estructura(conn):
@@ -42,20 +62,7 @@ def validar_estructura(conn):
 
     cursor = conn.cursor()
 
-    tablas_esperadas = [
-        'mental_health_staging',
-        'Dim_Tiempo',
-        'Dim_Genero',
-        'Dim_Historial',
-        'Dim_Ocupacion',
-        'Dim_Pais',
-        'Dim_Aislamiento',
-        'Dim_Sintomas',
-        'Dim_Acceso',
-        'Hechos_Estres_SaludMental'
-    ]
-
-    for tabla in tablas_esperadas:
+    for tabla in TABLAS_ESPERADAS:
         query = f"""
         SELECT COUNT(*) 
         FROM information_schema.TABLES 
@@ -124,40 +131,18 @@ def validar_integridad_referencial(conn):
     log_message("3. VALIDACIÓN DE INTEGRIDAD REFERENCIAL")
     log_message("=" * 50)
 
-    cursor = conn.cursor()
-
-    # Verificar cada FK
-    fks = [
-        ('id_tiempo', 'Dim_Tiempo'),
-        ('id_genero', 'Dim_Genero'),
-        ('id_historial', 'Dim_Historial'),
-        ('id_ocupacion', 'Dim_Ocupacion'),
-        ('id_pais', 'Dim_Pais'),
-        ('id_aislamiento', 'Dim_Aislamiento'),
-        ('id_sintomas', 'Dim_Sintomas'),
-        ('id_acceso', 'Dim_Acceso')
-    ]
+    # Un solo recorrido de los hechos aún no validados contra las claves de las 8 dimensiones
+    _, huerfanos = chequear_desde_marca(conn, TABLA_HECHOS, chequeos_huerfanos(conn))
 
     todas_ok = True
 
-    for fk, dim in fks:
-        query = f"""
-        SELECT COUNT(*) 
-        FROM Hechos_Estres_SaludMental h
-        LEFT JOIN {dim} d ON h.{fk} = d.{fk}
-        WHERE d.{fk} IS NULL
-        """
-        cursor.execute(query)
-        huerfanos = cursor.fetchone()[0]
-
-        if huerfanos == 0:
+    for fk, dim in CLAVES_DIMENSIONES:
+        if huerfanos[fk] == 0:
             log_message(f"✅ {fk} → {dim}: sin registros huérfanos")
         else:
-            log_message(f"❌ {fk} → {dim}: {huerfanos} registros huérfanos")
+            log_message(f"❌ {fk} → {dim}: {huerfanos[fk]} registros huérfanos")
             todas_ok = False
 
-    cursor.close()
-
     if todas_ok:
         log_message("\n✅ Integridad referencial correcta")
     else:
@@ -170,36 +155,16 @@ def validar_indicadores(conn):
     log_message("4. VALIDACIÓN DE INDICADORES")
     log_message("=" * 50)
 
-    cursor = conn.cursor()
+    # Rangos, conteos y consistencia en un solo recorrido de los hechos aún no validados
+    _, fallas = chequear_desde_marca(conn, TABLA_HECHOS, CHEQUEOS_INDICADORES)
 
     # 1. Porcentajes en rango [0, 100]
     log_message("\nVerificando rangos de porcentajes...")
 
-    porcentajes = [
-        'porcentaje_estres',
-        'porcentaje_historial_estres',
-        'porcentaje_estres_afrontamiento_ocupacion',
-        'porcentaje_tratamiento',
-        'porcentaje_no_tratamiento',
-        'porcentaje_deterioro_aislamiento',
-        'porcentaje_humor_aislamiento',
-        'porcentaje_debilidad_aislamiento',
-        'porcentaje_acceso_recursos',
-        'porcentaje_sintomas_no_reconocidos',
-        'porcentaje_recursos_sin_tratamiento',
-        'porcentaje_postergacion'
-    ]
-
     errores_rango = 0
 
-    for pct in porcentajes:
-        query = f"""
-        SELECT COUNT(*) 
-        FROM Hechos_Estres_SaludMental 
-        WHERE {pct} IS NOT NULL AND ({pct} < 0 OR {pct} > 100)
-        """
-        cursor.execute(query)
-        fuera_rango = cursor.fetchone()[0]
+    for pct in columnas_indicadores('porcentaje'):
+        fuera_rango = fallas[pct]
 
         if fuera_rango > 0:
             log_message(f"  ❌ {pct}: {fuera_rango} valores fuera de [0-100]")
@@ -211,24 +176,10 @@ def validar_indicadores(conn):
     # 2. Conteos no negativos
     log_message("\nVerificando conteos...")
 
-    conteos = [
-        'cantidad_estres',
-        'cantidad_historial_estres',
-        'cantidad_estres_afrontamiento',
-        'cantidad_tratamiento',
-        'cantidad_estres_acceso'
-    ]
-
     errores_negativos = 0
 
-    for cnt in conteos:
-        query = f"""
-        SELECT COUNT(*) 
-        FROM Hechos_Estres_SaludMental 
-        WHERE {cnt} IS NOT NULL AND {cnt} < 0
-        """
-        cursor.execute(query)
-        negativos = cursor.fetchone()[0]
+    for cnt in columnas_indicadores('cantidad'):
+        negativos = fallas[cnt]
 
         if negativos > 0:
             log_message(f"  ❌ {cnt}: {negativos} valores negativos")
@@ -240,23 +191,13 @@ def validar_indicadores(conn):
     # 3. Consistencia: porcentaje_tratamiento + porcentaje_no_tratamiento ≈ 100
     log_message("\nVerificando consistencia de tratamiento...")
 
-    query = """
-    SELECT COUNT(*)
-    FROM Hechos_Estres_SaludMental
-    WHERE porcentaje_tratamiento IS NOT NULL 
-      AND porcentaje_no_tratamiento IS NOT NULL
-      AND ABS((porcentaje_tratamiento + porcentaje_no_tratamiento) - 100) > 1
-    """
-    cursor.execute(query)
-    inconsistentes = cursor.fetchone()[0]
+    inconsistentes = fallas['tratamiento_inconsistente']
 
     if inconsistentes == 0:
         log_message("  ✅ Porcentajes de tratamiento consistentes")
     else:
         log_message(f"  ⚠️ {inconsistentes} registros con suma != 100")
 
-    cursor.close()
-
 
 def validar_variable_derivada(conn):
     """Validar lógica de indicador_inferido_estres"""
@@ -369,6 +310,49 @@ def estadisticas_generales(conn):
     cursor.close()
 
 
+def estadisticas_aproximadas(conn):
+    """
+    Estadísticas generales estimadas desde la muestra estratificada de staging
+    Son por encuestado (no por hecho): género y porcentajes con intervalo de
+    Wilson; países exactos (el país es parte del estrato). Sin muestra se
+    calculan las estadísticas exactas.
+    """
+    try:
+        muestra = cargar_muestra()
+    except ErrorETL:
+        log_message("⚠️ Sin muestra de staging: se calculan las estadísticas exactas")
+        estadisticas_generales(conn)
+        return
+
+    log_message("\n" + "=" * 50)
+    log_message("6. ESTADÍSTICAS GENERALES (APROXIMADAS, MUESTRA DE STAGING)")
+    log_message("=" * 50)
+
+    anios = sorted(muestra['anio'].unique())
+    log_message(f"\nPeríodo de análisis: {anios[0]} - {anios[-1]}")
+    log_message(f"Muestra: {len(muestra)} de {int(muestra['_peso'].sum().round())} registros")
+
+    log_message("\nDistribución por género en staging (estimada):")
+    pesos = muestra.groupby('Gender')['_peso'].sum()
+    for genero, estimado in pesos.items():
+        log_message(f"  {genero}: ~{estimado:.0f} registros")
+
+    log_message("\nTop 5 países por cantidad de registros:")
+    poblacion = muestra.drop_duplicates(['periodo', 'Country']).groupby('Country')['_poblacion'].sum()
+    for pais, cantidad in poblacion.sort_values(ascending=False).head(5).items():
+        log_message(f"  {pais}: {cantidad} registros")
+
+    log_message("\nIndicadores globales por encuestado:")
+    for etiqueta, columna in (('% Estrés', 'porcentaje_estres'), ('% En tratamiento', 'porcentaje_tratamiento')):
+        filas, origen = consultar_indicador(columna, error_max=MUESTREO_ERROR_MAX, muestra=muestra, conn=conn)
+        fila = filas[0]
+        if origen == 'exacto' or fila['exacto']:
+            log_message(f"  {etiqueta}: {fila['valor']}% (exacto)")
+        else:
+            log_message(f"  {etiqueta}: {fila['valor']}% "
+                        f"[{fila['ic_inferior']} - {fila['ic_superior']}] ±{fila['margen']}")
+
+
 def reporte_final(conn):
     """Generar reporte final de validación"""
     log_message("\n" + "=" * 50)
@@ -406,24 +390,339 @@ def reporte_final(conn):
     cursor.close()
 
 
+# Secciones de la validación en orden de ejecución
+VALIDACIONES = [
+    validar_estructura,
+    validar_volumetria,
+    validar_integridad_referencial,
+    validar_indicadores,
+    validar_variable_derivada,
+    estadisticas_generales,
+    reporte_final
+]
+
+
+def validaciones(aproximado=VALIDACION_APROXIMADA):
+    """
+    Secciones a ejecutar: en modo aproximado las estadísticas generales salen
+    de la muestra de staging (no usan la caché: no dependen del checksum)
+    """
+    if not aproximado:
+        return VALIDACIONES
+    return [estadisticas_aproximadas if v is estadisticas_generales else v for v in VALIDACIONES]
+
+
+TABLAS_DW = (
+    ['mental_health_staging']
+    + [dim for _, dim in CLAVES_DIMENSIONES]
+    + ['Hechos_Estres_SaludMental']
+)
+
+# Tablas que lee cada validación; su resultado se reutiliza mientras no
+# cambie el CHECKSUM TABLE de ninguna. Las que no figuran (reporte_final
+# lee estadísticas de information_schema) se ejecutan siempre.
+TABLAS_VALIDACIONES = {
+    'validar_estructura': TABLAS_ESPERADAS,
+    'validar_volumetria': TABLAS_DW,
+    'validar_integridad_referencial': TABLAS_DW[1:],
+    'validar_indicadores': ['Hechos_Estres_SaludMental'],
+    'validar_variable_derivada': ['Dim_Sintomas'],
+    'estadisticas_generales': ['Dim_Tiempo', 'Dim_Genero', 'Dim_Pais', 'Hechos_Estres_SaludMental']
+}
+
+
+class CacheValidaciones:
+    """
+    Resultados de validaciones anteriores (mensajes y estado) junto con el
+    CHECKSUM TABLE de cada tabla leída. Segura entre hilos: el orquestador
+    ejecuta las validaciones en paralelo.
+    """
+
+    def __init__(self, ruta=VALIDACION_CACHE_FILE, forzar=False):
+        self.ruta = ruta
+        self.forzar = forzar
+        self._lock = threading.Lock()
+        self._checksums = {}
+        self.en_cache = []
+
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                self._resultados = json.load(f)
+        except (OSError, ValueError):
+            self._resultados = {}
+
+    def checksums(self, conn, tablas):
+        """CHECKSUM TABLE de las tablas (cada una se calcula una vez por ejecución)"""
+        with self._lock:
+            faltantes = [t for t in tablas if t not in self._checksums]
+
+        if faltantes:
+            cursor = conn.cursor()
+            cursor.execute(f"CHECKSUM TABLE {', '.join(faltantes)}")
+            calculados = {tabla.split('.')[-1]: checksum for tabla, checksum in cursor.fetchall()}
+            cursor.close()
+            with self._lock:
+                self._checksums.update(calculados)
+
+        with self._lock:
+            return {t: self._checksums.get(t) for t in tablas}
+
+    def ejecutar(self, conn, validacion):
+        """Ejecutar una validación o reproducir su resultado si sus tablas no cambiaron"""
+        nombre = validacion.__name__
+        tablas = TABLAS_VALIDACIONES.get(nombre)
+
+        if tablas is None:
+            validacion(conn)
+            return
+
+        checksums = self.checksums(conn, tablas)
+        previa = self._resultados.get(nombre)
+
+        if not self.forzar and previa is not None and previa['checksums'] == checksums:
+            log_message(f"\n♻️ {nombre}: tablas sin cambios, resultado en caché ({previa['fecha']})")
+            for mensaje in previa['mensajes']:
+                log_message(mensaje)
+            with self._lock:
+                self.en_cache.append(nombre)
+            return
+
+        with agrupar_mensajes() as mensajes:
+            validacion(conn)
+
+        with self._lock:
+            self._resultados[nombre] = {
+                'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'checksums': checksums,
+                'estado': 'error' if any(nivel >= logging.ERROR for _, nivel in mensajes) else 'ok',
+                # Sin la marca de tiempo de log_message
+                'mensajes': [entrada.split('] ', 1)[-1] for entrada, _ in mensajes]
+            }
+
+    def guardar(self):
+        os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+        with self._lock:
+            with open(self.ruta, 'w', encoding='utf-8') as f:
+                json.dump(self._resultados, f, ensure_ascii=False, indent=2, default=str)
+
+
+# MySQL: "maximum statement execution time exceeded"
+ERRNO_MAX_EXECUTION_TIME = 3024
+
+# Intervalo entre interrupciones mientras una sección vencida siga corriendo
+REINTENTO_INTERRUPCION_S = 0.5
+
+
+class ConexionConPlazo:
+    """
+    Conexión de una sección de validación con su propio vencimiento
+    Ninguna sentencia empieza después de `vence` y en MySQL cada una recibe
+    como MAX_EXECUTION_TIME el tiempo que le queda a la sección (no el
+    límite completo). Un hilo vigilante interrumpe la sentencia en curso al
+    vencer (interrupt de DuckDB o KILL QUERY) y repite hasta que la sección
+    devuelve la conexión: una interrupción que llega entre dos sentencias
+    no se pierde.
+    """
+
+    def __init__(self, conn, vence):
+        self._conn = conn
+        self.vence = vence
+        self.vencida = False
+        self._terminada = threading.Event()
+        self._vigilante = threading.Thread(target=self._vigilar, daemon=True)
+        self._vigilante.start()
+
+    def _vigilar(self):
+        if self._terminada.wait(max(self.vence - time.perf_counter(), 0)):
+            return
+        self.vencida = True
+        while True:
+            try:
+                interrumpir_consulta(self._conn)
+            except Exception as e:
+                log_message(f"⚠️ No se pudo interrumpir la sección vencida: {e}")
+            if self._terminada.wait(REINTENTO_INTERRUPCION_S):
+                return
+
+    def terminar(self):
+        """La sección terminó: detener el vigilante"""
+        self._terminada.set()
+        self._vigilante.join()
+
+    def restante_ms(self):
+        return int((self.vence - time.perf_counter()) * 1000)
+
+    def cursor(self, *args, **kwargs):
+        return CursorConPlazo(self._conn.cursor(*args, **kwargs), self)
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+
+class CursorConPlazo:
+    """Cursor que no empieza sentencias fuera del plazo de su sección"""
+
+    def __init__(self, cursor, plazo):
+        self._cursor = cursor
+        self._plazo = plazo
+
+    def _verificar(self):
+        restante_ms = self._plazo.restante_ms()
+        if self._plazo.vencida or restante_ms <= 0:
+            raise TimeoutError("límite de la sección agotado")
+        if DW_BACKEND == 'mysql':
+            self._cursor.execute("SET SESSION MAX_EXECUTION_TIME = %s", (restante_ms,))
+
+    def execute(self, sql, params=None):
+        self._verificar()
+        return self._cursor.execute(sql, params)
+
+    def executemany(self, sql, seq_params):
+        self._verificar()
+        return self._cursor.executemany(sql, seq_params)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+
+def ejecutar_validaciones(secciones, cache, trabajadores=VALIDACION_WORKERS,
+                          limite_chequeo_s=VALIDACION_LIMITE_CHEQUEO_S,
+                          presupuesto_s=VALIDACION_PRESUPUESTO_S, ruta_reporte=VALIDACION_REPORTE_FILE):
+    """
+    Ejecutar las secciones de validación como tareas concurrentes de solo lectura
+    Cada sección toma su conexión del pool y vence al cumplir el límite por
+    chequeo o al agotarse el presupuesto total, lo que ocurra primero (sus
+    sentencias suman, no se mide cada una por separado: ConexionConPlazo).
+    Las secciones vencidas se interrumpen y se registran como 'timeout' una
+    vez detenidas; las que no llegaron a empezar quedan 'omitida'.
+
+    Los mensajes se emiten en el orden de declaración y el resultado de
+    cada sección (estado y duración) se guarda en `ruta_reporte` (JSON).
+    Lanza ErrorETL si alguna sección falló o no terminó.
+    """
+    inicio = time.perf_counter()
+    limite = inicio + presupuesto_s
+
+    def correr(validacion):
+        nombre = validacion.__name__
+        comienzo = time.perf_counter()
+        vence = min(comienzo + limite_chequeo_s, limite)
+        resultado = {'nombre': nombre, 'estado': 'ok', 'error': None}
+        plazo = None
+
+        with agrupar_mensajes(emitir=False) as mensajes:
+            try:
+                if vence <= comienzo:
+                    raise TimeoutError("presupuesto total agotado antes de empezar")
+
+                with obtener_conexion(f"05_validar_dw_{nombre}", 'lectura') as conn:
+                    plazo = ConexionConPlazo(conn, vence)
+                    try:
+                        with medir_etapa('validacion', nombre):
+                            cache.ejecutar(plazo, validacion)
+                    finally:
+                        plazo.terminar()
+
+                if any(nivel >= logging.ERROR for _, nivel in mensajes):
+                    resultado['estado'] = 'fallo'
+            except Exception as e:
+                expirado = (isinstance(e, TimeoutError)
+                            or (plazo is not None and plazo.vencida)
+                            or getattr(e, 'errno', None) == ERRNO_MAX_EXECUTION_TIME)
+                resultado.update(estado='timeout' if expirado else 'error', error=str(e))
+                log_message(f"❌ ERROR en validacion/{nombre}: "
+                            f"{'límite de tiempo agotado, sección interrumpida' if expirado else e}")
+
+        resultado['duracion_ms'] = round((time.perf_counter() - comienzo) * 1000, 1)
+        resultado['en_cache'] = nombre in cache.en_cache
+        return mensajes, resultado
+
+    executor = ThreadPoolExecutor(max_workers=trabajadores)
+    futuros = [executor.submit(correr, validacion) for validacion in secciones]
+    wait(futuros, timeout=max(limite - time.perf_counter(), 0))
+
+    # Presupuesto agotado: las que no empezaron se cancelan; las que corren ya
+    # vencieron y su vigilante las está interrumpiendo, se espera que se detengan
+    for futuro in futuros:
+        futuro.cancel()
+    en_curso = sum(not futuro.done() for futuro in futuros)
+    if en_curso:
+        log_message(f"⚠️ Presupuesto de {presupuesto_s} s agotado: deteniendo {en_curso} secciones")
+    executor.shutdown(wait=True)
+
+    resultados = []
+    for validacion, futuro in zip(secciones, futuros):
+        if not futuro.cancelled():
+            mensajes, resultado = futuro.result()
+            emitir_mensajes(mensajes)
+        else:
+            resultado = {'nombre': validacion.__name__, 'estado': 'omitida', 'duracion_ms': None,
+                         'en_cache': False, 'error': f"sin empezar tras el presupuesto de {presupuesto_s} s"}
+            log_message(f"❌ ERROR en validacion/{validacion.__name__}: omitida "
+                        f"(presupuesto de {presupuesto_s} s agotado)")
+        resultados.append(resultado)
+
+    duracion_s = time.perf_counter() - inicio
+    reporte = {
+        'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'duracion_s': round(duracion_s, 3),
+        'trabajadores': trabajadores,
+        'limite_chequeo_s': limite_chequeo_s,
+        'presupuesto_s': presupuesto_s,
+        'chequeos': resultados
+    }
+    os.makedirs(os.path.dirname(ruta_reporte) or '.', exist_ok=True)
+    with open(ruta_reporte, 'w', encoding='utf-8') as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+
+    duraciones = [r['duracion_ms'] for r in resultados if r['duracion_ms'] is not None]
+    log_message(f"\n📈 Validación: {len(secciones)} secciones en {duracion_s:.2f} s con {trabajadores} "
+                f"conexiones (sección más lenta: {max(duraciones, default=0) / 1000:.2f} s) → {ruta_reporte}")
+
+    fallidas = [r['nombre'] for r in resultados if r['estado'] in ('error', 'timeout', 'omitida')]
+    if fallidas:
+        raise ErrorETL(f"Validaciones sin completar: {', '.join(fallidas)}")
+    return reporte
+
+
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description='Validación completa del Data Warehouse')
+    parser.add_argument('--force', dest='forzar', action='store_true',
+                        help='Re-ejecutar todas las validaciones aunque sus tablas no hayan cambiado')
+    parser.add_argument('--aproximado', action='store_true', default=VALIDACION_APROXIMADA,
+                        help='Estadísticas generales desde la muestra estratificada de staging')
+    parser.add_argument('--completa', action='store_true',
+                        help='Recorrer staging y hechos completos aunque ya estén validados hasta su marca')
+    parser.add_argument('--trabajadores', type=int, default=VALIDACION_WORKERS,
+                        help='Secciones ejecutadas a la vez, cada una con su conexión del pool')
+    parser.add_argument('--limite-chequeo', dest='limite_chequeo', type=float, default=VALIDACION_LIMITE_CHEQUEO_S,
+                        help='Segundos máximos de cada sección (todas sus consultas)')
+    parser.add_argument('--presupuesto', type=float, default=VALIDACION_PRESUPUESTO_S,
+                        help='Segundos máximos para toda la validación')
+    args = parser.parse_args()
+
     log_message("\n" + "=" * 70)
     log_message("VALIDACIÓN COMPLETA DEL DATA WAREHOUSE")
     log_message("Data Warehouse: Análisis de Estrés y Salud Mental")
     log_message("=" * 70)
 
-    conn = conectar_mysql()
+    # Un barrido completo no puede reproducir resultados en caché
+    if args.completa:
+        barrido_completo()
+    cache = CacheValidaciones(forzar=args.forzar or args.completa)
 
     try:
-        # Ejecutar todas las validaciones
-        validar_estructura(conn)
-        validar_volumetria(conn)
-        validar_integridad_referencial(conn)
-        validar_indicadores(conn)
-        validar_variable_derivada(conn)
-        estadisticas_generales(conn)
-        reporte_final(conn)
+        # Ejecutar todas las validaciones (en paralelo, con límites de tiempo)
+        secciones = validaciones(args.aproximado)
+        ejecutar_validaciones(secciones, cache, args.trabajadores, args.limite_chequeo, args.presupuesto)
+
+        if cache.en_cache:
+            log_message(f"\n♻️ Validaciones en caché: {len(cache.en_cache)} de {len(secciones)} "
+                        f"(usa --force para re-ejecutarlas)")
 
         log_message("\n" + "=" * 70)
         log_message("✅ VALIDACIÓN COMPLETADA EXITOSAMENTE")
@@ -435,9 +734,12 @@ def main():
         raise
 
     finally:
-        conn.close()
-        log_message("\nConexión cerrada")
+        cache.guardar()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        with ejecucion_etl('05_validar_dw'), auditar_etapa('validacion'):
+            main()
+    except ErrorETL:
+        sys.exit(1)
\ No newline at end of file
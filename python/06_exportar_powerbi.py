@@ -1,11 +1,75 @@
-import pandas as pd
+"""
+Script 6: Exportar el Data Warehouse para Power BI
+Entrada: Hechos_Estres_SaludMental + dimensiones
+Salida (modo 'plano'): CSV desnormalizado (CSV_EXPORT_PATH) o Parquet
+        particionado por anio/mes (PARQUET_EXPORT_DIR)
+Salida (modo 'estrella'): un archivo por dimensión, la tabla de hechos
+        solo con claves y medidas, y el descriptor de relaciones
+        _modelo.json (ESTRELLA_EXPORT_DIR)
 
-def exportar_para_powerbi(conn, CSV_EXPORT=None):
-    """Exportar DW completo en formato plano para Power BI"""
+La exportación plana se hace por período (id_tiempo): cada período se lee
+con un cursor no bufferizado en lotes de EXPORT_CHUNK_SIZE filas, se ordena
+en el cliente y se escribe de inmediato. No hay ORDER BY global (filesort
+de toda la tabla) y la memoria queda acotada por el período más grande.
+"""
 
-    # Query que hace JOIN de hechos con todas las dimensiones
-    query_export = """
-    SELECT 
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import csv
+import json
+import shutil
+import sys
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow solo es necesario para formato='parquet'
+    pa = pq = None
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import (
+    CSV_EXPORT_PATH, PARQUET_EXPORT_DIR, ESTRELLA_EXPORT_DIR,
+    PARQUET_COMPRESSION, EXPORT_CHUNK_SIZE
+)
+from base_datos import obtener_conexion
+from bitacora import log_message
+from errores import ErrorETL
+from indicadores import CLAVES_DIMENSIONES, columnas_indicadores, proyeccion_exportacion
+from instrumentacion import huella_sql
+
+
+TABLA_HECHOS = 'Hechos_Estres_SaludMental'
+
+# Orden dentro de cada período (el orden entre períodos lo da Dim_Tiempo)
+ORDEN_PERIODO = ('genero', 'country')
+
+# Columnas numéricas que no son claves (id_*) ni indicadores; el resto de
+# las columnas son textos repetidos y se codifican por diccionario en Parquet
+COLUMNAS_ENTERAS = (
+    'anio', 'mes', 'trimestre', 'semestre', 'orden', 'aislamiento_orden',
+    'indicador_inferido_estres'
+)
+
+# Primer día del período: columna de filtro RangeStart/RangeEnd en Power BI
+# (solo en la exportación particionada; el CSV plano no la incluye)
+COLUMNAS_FECHA = ('fecha_periodo',)
+
+# Columnas de la ruta anio=/mes= de la exportación particionada y su tipo en
+# cada archivo: el mismo que infiere la lectura hive (int32), para que un
+# dataset particionado no encuentre dos tipos para la misma columna
+COLUMNAS_PARTICION = {'anio': 'int32', 'mes': 'int32'}
+
+
+def query_exportacion(particionada=False):
+    """
+    JOIN de hechos con todas las dimensiones para un período
+    particionada=True agrega fecha_periodo (filtro de la actualización
+    incremental); el CSV plano conserva sus columnas de siempre.
+    """
+    fecha_periodo = "CAST(CONCAT(dt.periodo, '-01') AS DATE) AS fecha_periodo," if particionada else ''
+    return f"""
+    SELECT
         -- Dimensión Tiempo
         dt.anio,
         dt.mes,
@@ -13,6 +77,7 @@ def exportar_para_powerbi(conn, CSV_EXPORT=None):
         dt.periodo,
         dt.trimestre,
         dt.semestre,
+        {fecha_periodo}
 
         -- Dimensión Género
         dg.genero,
@@ -21,7 +86,7 @@ def exportar_para_powerbi(conn, CSV_EXPORT=None):
         dh.family_history,
 
         -- Dimensión Ocupación
-        do.occupation,
+        doc.occupation,
 
         -- Dimensión País
         dp.country,
@@ -44,42 +109,592 @@ def exportar_para_powerbi(conn, CSV_EXPORT=None):
         dac.mental_health_interview,
 
         -- INDICADORES (16 métricas)
-        h.cantidad_estres,
-        h.porcentaje_estres,
-        h.cantidad_historial_estres,
-        h.porcentaje_historial_estres,
-        h.cantidad_estres_afrontamiento,
-        h.porcentaje_estres_afrontamiento_ocupacion,
-        h.porcentaje_tratamiento,
-        h.porcentaje_no_tratamiento,
-        h.cantidad_tratamiento,
-        h.porcentaje_deterioro_aislamiento,
-        h.porcentaje_humor_aislamiento,
-        h.porcentaje_debilidad_aislamiento,
-        h.porcentaje_acceso_recursos,
-        h.cantidad_estres_acceso,
-        h.porcentaje_sintomas_no_reconocidos,
-        h.porcentaje_recursos_sin_tratamiento,
-        h.porcentaje_postergacion
+        {proyeccion_exportacion('h')}
 
     FROM Hechos_Estres_SaludMental h
     INNER JOIN Dim_Tiempo dt ON h.id_tiempo = dt.id_tiempo
     INNER JOIN Dim_Genero dg ON h.id_genero = dg.id_genero
     INNER JOIN Dim_Historial dh ON h.id_historial = dh.id_historial
-    INNER JOIN Dim_Ocupacion do ON h.id_ocupacion = do.id_ocupacion
+    INNER JOIN Dim_Ocupacion doc ON h.id_ocupacion = doc.id_ocupacion
     INNER JOIN Dim_Pais dp ON h.id_pais = dp.id_pais
     INNER JOIN Dim_Aislamiento da ON h.id_aislamiento = da.id_aislamiento
     INNER JOIN Dim_Sintomas ds ON h.id_sintomas = ds.id_sintomas
     INNER JOIN Dim_Acceso dac ON h.id_acceso = dac.id_acceso
-    ORDER BY dt.anio, dt.mes, dg.genero, dp.country
+    WHERE h.id_tiempo = %s
+    """
+
+
+def query_hechos_estrella():
+    """Tabla de hechos sin JOIN: clave, claves foráneas e indicadores"""
+    columnas = ['id_hecho'] + [fk for fk, _ in CLAVES_DIMENSIONES] + columnas_indicadores()
+    return f"SELECT {', '.join(columnas)} FROM {TABLA_HECHOS}"
+
+
+def leer_consulta(conn, sql, params=None, tamano_lote=EXPORT_CHUNK_SIZE):
+    """
+    Ejecutar una consulta con un cursor no bufferizado
+    Devuelve (columnas, generador de lotes de tamano_lote filas)
+    """
+    cursor = conn.cursor(buffered=False)
+    cursor.execute(sql, params)
+    columnas = list(cursor.column_names)
+
+    def lotes():
+        try:
+            while True:
+                lote = cursor.fetchmany(tamano_lote)
+                if not lote:
+                    break
+                yield lote
+        finally:
+            cursor.close()
+
+    return columnas, lotes()
+
+
+def obtener_periodos(conn):
+    """(id_tiempo, anio, mes) de todos los períodos en orden cronológico"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT id_tiempo, anio, mes FROM Dim_Tiempo ORDER BY anio, mes")
+    periodos = cursor.fetchall()
+    cursor.close()
+    return periodos
+
+
+def leer_periodo(conn, id_tiempo, tamano_lote=EXPORT_CHUNK_SIZE, particionada=False):
+    """Filas desnormalizadas de un período: (columnas, generador de lotes)"""
+    return leer_consulta(conn, query_exportacion(particionada), (id_tiempo,), tamano_lote)
+
+
+def recorrer_periodos(conn, ordenar=True, tamano_lote=EXPORT_CHUNK_SIZE, periodos=None,
+                      particionada=False):
+    """
+    Recorrer el DW período a período (todos, o solo los (id_tiempo, anio, mes) indicados)
+    Produce (id_tiempo, anio, mes, columnas, lotes); los lotes de un período
+    deben consumirse antes de pasar al siguiente (cursor no bufferizado).
+    Con ordenar=True el período completo se ordena en el cliente y se
+    entrega como un único lote.
+    """
+    if periodos is None:
+        periodos = obtener_periodos(conn)
+
+    for id_tiempo, anio, mes in periodos:
+        columnas, lotes = leer_periodo(conn, id_tiempo, tamano_lote, particionada)
+
+        if ordenar:
+            indices = [columnas.index(c) for c in ORDEN_PERIODO]
+            filas = [fila for lote in lotes for fila in lote]
+            filas.sort(key=lambda fila: tuple(fila[i] for i in indices))
+            lotes = [filas] if filas else []
+
+        yield id_tiempo, anio, mes, columnas, lotes
+
+
+# ============================================
+# ESCRITORES DE TABLAS
+# Cada uno escribe columnas + lotes en un archivo y devuelve las filas
+# ============================================
+
+def escribir_tabla_csv(ruta, columnas, lotes, particion=None):
+    """Escribir una tabla como CSV, lote a lote (texto: `particion` no aplica)"""
+    filas = 0
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columnas)
+        for lote in lotes:
+            writer.writerows(lote)
+            filas += len(lote)
+    return filas
+
+
+def esquema_parquet(columnas, particion=None):
+    """
+    Esquema Arrow por nombre de columna (indicadores según el registro)
+    particion: {columna: tipo} de las columnas que también están en la ruta
+    """
+    particion = particion or {}
+    porcentajes = set(columnas_indicadores('porcentaje'))
+    enteras = set(columnas_indicadores('cantidad')) | set(COLUMNAS_ENTERAS)
+
+    campos = []
+    for columna in columnas:
+        if columna in particion:
+            tipo = pa.type_for_alias(particion[columna])
+        elif columna in porcentajes:
+            tipo = pa.float64()
+        elif columna in COLUMNAS_FECHA:
+            tipo = pa.date32()
+        elif columna in enteras or columna.startswith('id_'):
+            tipo = pa.int64()
+        else:
+            tipo = pa.string()
+        campos.append(pa.field(columna, tipo))
+    return pa.schema(campos)
+
+
+def lote_a_tabla(lote, esquema):
+    """Convertir un lote de tuplas en una tabla Arrow por columnas"""
+    arreglos = []
+    for i, campo in enumerate(esquema):
+        valores = [fila[i] for fila in lote]
+        if campo.type == pa.float64():
+            # DECIMAL llega como decimal.Decimal
+            valores = [float(v) if v is not None else None for v in valores]
+        elif pa.types.is_integer(campo.type):
+            # BOOLEAN llega como 0/1 desde MySQL y como bool desde DuckDB
+            valores = [int(v) if v is not None else None for v in valores]
+        arreglos.append(pa.array(valores, type=campo.type))
+    return pa.Table.from_arrays(arreglos, schema=esquema)
+
+
+def escribir_tabla_parquet(ruta, columnas, lotes, particion=None):
+    """
+    Escribir una tabla como Parquet: cada lote es un row group, las columnas
+    de texto se codifican por diccionario y todo se comprime
+    """
+    if pa is None:
+        raise ErrorETL("La exportación Parquet requiere pyarrow (pip install pyarrow)")
+
+    esquema = esquema_parquet(columnas, particion)
+    filas = 0
+    writer = pq.ParquetWriter(
+        ruta, esquema,
+        compression=PARQUET_COMPRESSION,
+        use_dictionary=[campo.name for campo in esquema if campo.type == pa.string()]
+    )
+    try:
+        for lote in lotes:
+            writer.write_table(lote_a_tabla(lote, esquema))
+            filas += len(lote)
+    finally:
+        writer.close()
+    return filas
+
+
+# formato -> (extensión, escritor)
+ESCRITORES = {
+    'csv': ('csv', escribir_tabla_csv),
+    'parquet': ('parquet', escribir_tabla_parquet)
+}
+
+
+def escribir_manifiesto(directorio, documento, nombre='_manifest.json'):
+    """Escribir un descriptor JSON en el directorio de exportación"""
+    ruta = os.path.join(directorio, nombre)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(documento, f, ensure_ascii=False, indent=2, default=str)
+    return ruta
+
+
+# ============================================
+# EXPORTACIÓN EN PARALELO
+# Los períodos se reparten en rangos contiguos de id_tiempo con una
+# cantidad de filas parecida; cada rango lo exporta un hilo con su propia
+# conexión del pool (perfil de lectura) en su propia parte.
+# ============================================
+
+def contar_por_periodo(conn):
+    """Filas de hechos por id_tiempo (recorre solo el índice idx_tiempo)"""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT id_tiempo, COUNT(*) FROM {TABLA_HECHOS} GROUP BY id_tiempo")
+    conteos = {id_tiempo: int(filas) for id_tiempo, filas in cursor.fetchall()}
+    cursor.close()
+    return conteos
+
+
+def dividir_rangos(periodos, filas_por_periodo, partes):
+    """
+    Dividir los períodos (en orden) en hasta `partes` rangos contiguos con
+    una cantidad de filas parecida, para que los meses grandes no dominen
+    """
+    total = sum(filas_por_periodo.get(periodo[0], 0) for periodo in periodos)
+    objetivo = total / max(1, partes)
+
+    rangos = []
+    actual = []
+    acumulado = 0
+    for periodo in periodos:
+        filas = filas_por_periodo.get(periodo[0], 0)
+        limite = objetivo * (len(rangos) + 1)
+        # Cortar antes del período si así el rango queda más cerca del límite
+        if actual and len(rangos) < partes - 1 and abs(acumulado - limite) <= abs(acumulado + filas - limite):
+            rangos.append(actual)
+            actual = []
+        actual.append(periodo)
+        acumulado += filas
+
+    if actual:
+        rangos.append(actual)
+    return rangos
+
+
+def en_paralelo(funcion, rangos):
+    """
+    Ejecutar funcion(conn, indice, periodos) para cada rango, cada una con
+    su conexión del pool; devuelve los resultados en el orden de los rangos
+    """
+    def correr(indice, periodos):
+        with obtener_conexion(f"06_exportar_powerbi_parte{indice:02d}", 'lectura') as conn:
+            return funcion(conn, indice, periodos)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(rangos))) as executor:
+        futuros = [executor.submit(correr, i, periodos) for i, periodos in enumerate(rangos)]
+        return [futuro.result() for futuro in futuros]
+
+
+def escribir_csv_paralelo(conn, ruta, trabajadores, ordenar=True, tamano_lote=EXPORT_CHUNK_SIZE):
     """
+    Escribir el CSV plano en partes paralelas (ruta.parteNN) y concatenarlas
+    en orden en un único archivo; devuelve (filas, columnas)
+    """
+    rangos = dividir_rangos(obtener_periodos(conn), contar_por_periodo(conn), trabajadores)
+    partes = [f"{ruta}.parte{i:02d}" for i in range(len(rangos))]
+
+    def escribir_parte(conn_parte, indice, periodos):
+        return escribir_csv(conn_parte, partes[indice], ordenar, tamano_lote, periodos)
+
+    resultados = en_paralelo(escribir_parte, rangos)
+
+    # Concatenar en binario conservando solo la primera cabecera
+    with open(ruta, 'wb') as destino:
+        for i, parte in enumerate(partes):
+            with open(parte, 'rb') as origen:
+                cabecera = origen.readline()
+                if i == 0:
+                    destino.write(cabecera)
+                shutil.copyfileobj(origen, destino)
+            os.remove(parte)
+
+    columnas = next((columnas for _, columnas in resultados if columnas), [])
+    return sum(filas for filas, _ in resultados), columnas
+
+
+# ============================================
+# MODO PLANO
+# ============================================
+
+def escribir_csv(conn, ruta, ordenar=True, tamano_lote=EXPORT_CHUNK_SIZE, periodos=None):
+    """Escribir el CSV plano lote a lote; devuelve (filas, columnas)"""
+    total = 0
+    columnas = None
+
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+
+        for _, _, _, columnas_periodo, lotes in recorrer_periodos(conn, ordenar, tamano_lote, periodos):
+            if columnas is None:
+                columnas = columnas_periodo
+                writer.writerow(columnas)
+
+            for lote in lotes:
+                writer.writerows(lote)
+                total += len(lote)
+
+    return total, columnas or []
+
+
+# ============================================
+# EXPORTACIÓN PARTICIONADA E INCREMENTAL
+# Un archivo por período (anio=2014/mes=8/part-0.parquet). El manifiesto
+# guarda por partición la huella de sus hechos (filas + BIT_XOR de CRC32 de
+# cada fila) y el rango [rango_inicio, rango_fin) de fecha_periodo, que es
+# el que Power BI filtra con RangeStart/RangeEnd en la actualización
+# incremental. Con incremental=True solo se reescriben las particiones cuya
+# huella cambió; si cambian las dimensiones, el formato o la consulta de
+# exportación se reescribe todo.
+# ============================================
+
+def query_huellas_periodos():
+    """
+    Filas y checksum de los hechos agrupados por id_tiempo
+    Sin id_hecho: no se exporta y cambia en cada recarga (y al cambiar un
+    período se desplaza en todos los posteriores).
+    """
+    columnas = [fk for fk, _ in CLAVES_DIMENSIONES] + columnas_indicadores()
+    # IFNULL evita que CONCAT_WS omita los NULL y confunda columnas distintas
+    # (CAST a texto: DuckDB no mezcla tipos en IFNULL)
+    campos = ', '.join(f"IFNULL(CAST({col} AS CHAR), '')" for col in columnas)
+    return f"""
+    SELECT id_tiempo, COUNT(*), BIT_XOR(CRC32(CONCAT_WS('|', {campos})))
+    FROM {TABLA_HECHOS}
+    GROUP BY id_tiempo
+    """
+
+
+def calcular_huellas(conn):
+    """Huella de los hechos de cada período: {id_tiempo: {'filas', 'crc'}}"""
+    cursor = conn.cursor()
+    cursor.execute(query_huellas_periodos())
+    huellas = {
+        id_tiempo: {'filas': int(filas), 'crc': int(crc)}
+        for id_tiempo, filas, crc in cursor.fetchall()
+    }
+    cursor.close()
+    return huellas
+
+
+def huellas_dimensiones(conn):
+    """CHECKSUM TABLE de cada dimensión: {tabla: checksum}"""
+    cursor = conn.cursor()
+    cursor.execute(f"CHECKSUM TABLE {', '.join(dim for _, dim in CLAVES_DIMENSIONES)}")
+    huellas = {tabla.split('.')[-1]: checksum for tabla, checksum in cursor.fetchall()}
+    cursor.close()
+    return huellas
+
+
+def rango_periodo(anio, mes):
+    """[inicio, fin) del período como fechas ISO (fin = primer día del mes siguiente)"""
+    siguiente = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+    return f"{anio:04d}-{mes:02d}-01", f"{siguiente[0]:04d}-{siguiente[1]:02d}-01"
+
+
+def leer_manifiesto(directorio, nombre='_manifest.json'):
+    """Manifiesto de la exportación anterior (None si no existe o es ilegible)"""
+    ruta = os.path.join(directorio, nombre)
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def escribir_periodos(conn, directorio, formato, periodos, huellas, ordenar=True,
+                      tamano_lote=EXPORT_CHUNK_SIZE):
+    """Escribir la partición de cada período indicado; devuelve (entradas del manifiesto, columnas)"""
+    extension, escribir = ESCRITORES[formato]
+    particiones = []
+    columnas = []
+
+    for id_tiempo, anio, mes, columnas, lotes in recorrer_periodos(conn, ordenar, tamano_lote, periodos,
+                                                                   particionada=True):
+        relativa = os.path.join(f"anio={anio}", f"mes={mes}", f"part-0.{extension}")
+        ruta = os.path.join(directorio, relativa)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+        filas = escribir(ruta, columnas, lotes, COLUMNAS_PARTICION)
+        rango_inicio, rango_fin = rango_periodo(anio, mes)
+
+        particiones.append({
+            'id_tiempo': id_tiempo,
+            'anio': anio,
+            'mes': mes,
+            'ruta': relativa.replace(os.sep, '/'),
+            'filas': filas,
+            'bytes': os.path.getsize(ruta),
+            'rango_inicio': rango_inicio,
+            'rango_fin': rango_fin,
+            'huella': huellas.get(id_tiempo, {'filas': 0, 'crc': 0})
+        })
+
+    return particiones, columnas
+
+
+def escribir_particionado(conn, directorio, formato='parquet', ordenar=True,
+                          tamano_lote=EXPORT_CHUNK_SIZE, incremental=False, trabajadores=1):
+    """
+    Escribir un archivo por período y el manifiesto con las particiones
+    Con trabajadores > 1 los períodos pendientes se reparten en rangos
+    escritos en paralelo; el manifiesto los combina.
+    Devuelve (filas totales, columnas, particiones reescritas).
+    anio y mes se conservan también dentro de cada archivo para que Power BI
+    no tenga que extraerlos de la ruta, con el tipo de COLUMNAS_PARTICION.
+    """
+    os.makedirs(directorio, exist_ok=True)
+
+    periodos = obtener_periodos(conn)
+    # Las huellas se calculan siempre para que la próxima ejecución pueda ser incremental
+    huellas = calcular_huellas(conn)
+    dimensiones = huellas_dimensiones(conn)
+    consulta = huella_sql(query_exportacion(particionada=True))
+
+    anterior = leer_manifiesto(directorio) or {}
+    compatible = (
+        incremental
+        and anterior.get('formato') == formato
+        and anterior.get('particionado') == COLUMNAS_PARTICION
+        and anterior.get('consulta') == consulta
+        and anterior.get('dimensiones') == dimensiones
+    )
+    previas = {p['id_tiempo']: p for p in anterior.get('particiones', [])} if compatible else {}
+
+    particiones = []
+    pendientes = []
+    for id_tiempo, anio, mes in periodos:
+        previa = previas.get(id_tiempo)
+        huella = huellas.get(id_tiempo, {'filas': 0, 'crc': 0})
+        if (previa is not None and previa['huella'] == huella
+                and os.path.exists(os.path.join(directorio, previa['ruta']))):
+            particiones.append(previa)
+        else:
+            pendientes.append((id_tiempo, anio, mes))
+
+    columnas = anterior.get('columnas', []) if compatible else []
+
+    def escribir_rango(conn_rango, _, periodos):
+        return escribir_periodos(conn_rango, directorio, formato, periodos, huellas, ordenar, tamano_lote)
+
+    if trabajadores > 1 and len(pendientes) > 1:
+        filas_por_periodo = {id_tiempo: h['filas'] for id_tiempo, h in huellas.items()}
+        resultados = en_paralelo(escribir_rango, dividir_rangos(pendientes, filas_por_periodo, trabajadores))
+    else:
+        resultados = [escribir_rango(conn, 0, pendientes)]
+
+    for nuevas, columnas_rango in resultados:
+        particiones.extend(nuevas)
+        columnas = columnas_rango or columnas
+
+    # Particiones de períodos que ya no existen
+    vigentes = {p['ruta'] for p in particiones}
+    for p in anterior.get('particiones', []):
+        ruta = os.path.join(directorio, p['ruta'])
+        if p['ruta'] not in vigentes and os.path.exists(ruta):
+            os.remove(ruta)
+            try:
+                os.removedirs(os.path.dirname(ruta))  # carpetas anio=/mes= vacías
+            except OSError:
+                pass
+
+    particiones.sort(key=lambda p: (p['anio'], p['mes']))
+    total = sum(p['filas'] for p in particiones)
+
+    escribir_manifiesto(directorio, {
+        'formato': formato,
+        'generado': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'compresion': PARQUET_COMPRESSION if formato == 'parquet' else None,
+        'particionado': COLUMNAS_PARTICION,
+        'columna_rango': COLUMNAS_FECHA[0],
+        'consulta': consulta,
+        'dimensiones': dimensiones,
+        'columnas': columnas,
+        'total_filas': total,
+        'particiones': particiones
+    })
+
+    return total, columnas, len(pendientes)
+
+
+# ============================================
+# MODO ESTRELLA
+# Cada Dim_* se escribe una sola vez y la tabla de hechos sin JOIN (solo
+# claves y medidas). _modelo.json describe tablas y relaciones; las
+# relaciones usan los nombres de propiedad de TMSL (fromTable, toColumn...)
+# para poder reconstruir el modelo en Power BI.
+# ============================================
+
+def relaciones_estrella():
+    """Relaciones muchos-a-uno de la tabla de hechos con cada dimensión"""
+    return [
+        {
+            'name': f"{TABLA_HECHOS}_{dimension}",
+            'fromTable': TABLA_HECHOS,
+            'fromColumn': fk,
+            'fromCardinality': 'many',
+            'toTable': dimension,
+            'toColumn': fk,
+            'toCardinality': 'one',
+            'crossFilteringBehavior': 'oneDirection'
+        }
+        for fk, dimension in CLAVES_DIMENSIONES
+    ]
+
+
+def escribir_estrella(conn, directorio, formato='csv', tamano_lote=EXPORT_CHUNK_SIZE):
+    """Escribir dimensiones, hechos y _modelo.json; devuelve (filas de hechos, tablas)"""
+    extension, escribir = ESCRITORES[formato]
+    os.makedirs(directorio, exist_ok=True)
+
+    consultas = [
+        (dimension, 'dimension', fk, f"SELECT * FROM {dimension}")
+        for fk, dimension in CLAVES_DIMENSIONES
+    ]
+    consultas.append((TABLA_HECHOS, 'hechos', 'id_hecho', query_hechos_estrella()))
+
+    tablas = []
+    for nombre, tipo, clave, sql in consultas:
+        archivo = f"{nombre}.{extension}"
+        ruta = os.path.join(directorio, archivo)
+
+        columnas, lotes = leer_consulta(conn, sql, tamano_lote=tamano_lote)
+        filas = escribir(ruta, columnas, lotes)
+
+        tablas.append({
+            'nombre': nombre,
+            'tipo': tipo,
+            'archivo': archivo,
+            'clave': clave,
+            'columnas': columnas,
+            'filas': filas,
+            'bytes': os.path.getsize(ruta)
+        })
+
+    escribir_manifiesto(directorio, {
+        'formato': formato,
+        'generado': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'tablas': tablas,
+        'relaciones': relaciones_estrella()
+    }, nombre='_modelo.json')
+
+    return tablas[-1]['filas'], tablas
+
+
+def exportar_para_powerbi(conn=None, CSV_EXPORT=None, ordenar=True, tamano_lote=EXPORT_CHUNK_SIZE,
+                          formato='csv', PARQUET_EXPORT=None, modo='plano', ESTRELLA_EXPORT=None,
+                          incremental=False, trabajadores=1):
+    """
+    Exportar DW completo para Power BI
+    modo='plano': formato='csv' escribe CSV_EXPORT; formato='parquet'
+    escribe el directorio particionado PARQUET_EXPORT con su _manifest.json;
+    con incremental=True solo reescribe los períodos cuyos hechos cambiaron
+    (el CSV único y el modo estrella se reescriben siempre completos).
+    trabajadores > 1 exporta el modo plano en paralelo por rangos de períodos.
+    modo='estrella': escribe en ESTRELLA_EXPORT dimensiones y hechos por
+    separado (en el formato indicado) y el descriptor _modelo.json.
+    Sin conexión, toma una del pool con el perfil de lectura.
+    ordenar=False escribe cada lote tal como llega (memoria constante).
+    Devuelve la cantidad de filas de hechos exportadas.
+    """
+    if CSV_EXPORT is None:
+        CSV_EXPORT = CSV_EXPORT_PATH
+    if PARQUET_EXPORT is None:
+        PARQUET_EXPORT = PARQUET_EXPORT_DIR
+    if ESTRELLA_EXPORT is None:
+        ESTRELLA_EXPORT = ESTRELLA_EXPORT_DIR
+
+    if conn is None:
+        with obtener_conexion('06_exportar_powerbi', 'lectura') as conn:
+            return exportar_para_powerbi(conn, CSV_EXPORT, ordenar, tamano_lote, formato,
+                                         PARQUET_EXPORT, modo, ESTRELLA_EXPORT, incremental,
+                                         trabajadores)
+
+    if formato not in ESCRITORES:
+        raise ErrorETL(f"Formato de exportación desconocido: {formato}")
+
+    if modo == 'estrella':
+        total, tablas = escribir_estrella(conn, ESTRELLA_EXPORT, formato, tamano_lote)
+        log_message(f"✅ Modelo estrella exportado: {ESTRELLA_EXPORT}")
+        for tabla in tablas:
+            log_message(f"   {tabla['archivo']:<40} {tabla['filas']:>8} filas")
+        log_message(f"   Relaciones: {len(CLAVES_DIMENSIONES)}")
+        return total
+
+    if modo != 'plano':
+        raise ErrorETL(f"Modo de exportación desconocido: {modo}")
 
-    # Ejecutar query y cargar en DataFrame
-    df = pd.read_sql(query_export, conn)
+    if formato == 'csv':
+        destino = CSV_EXPORT
+        if trabajadores > 1:
+            total, columnas = escribir_csv_paralelo(conn, destino, trabajadores, ordenar, tamano_lote)
+        else:
+            total, columnas = escribir_csv(conn, destino, ordenar, tamano_lote)
+    else:
+        destino = PARQUET_EXPORT
+        total, columnas, reescritas = escribir_particionado(
+            conn, destino, formato, ordenar, tamano_lote, incremental, trabajadores
+        )
+        log_message(f"   Particiones reescritas: {reescritas}")
 
-    # Exportar a CSV
-    df.to_csv(CSV_EXPORT, index=False, encoding='utf-8')
+    log_message(f"✅ Archivo exportado: {destino}")
+    log_message(f"   Registros: {total}")
+    log_message(f"   Columnas: {len(columnas)}")
 
-    print(f"✅ Archivo exportado: {CSV_EXPORT}")
-    print(f"   Registros: {len(df)}")
-    print(f"   Columnas: {len(df.columns)}")
+    return total
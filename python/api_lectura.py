@@ -0,0 +1,330 @@
+"""
+API local de solo lectura sobre el Data Warehouse
+Servidor HTTP/JSON de la biblioteca estándar con consultas parametrizadas de
+indicadores agrupados por período, país o género. Usa conexiones del pool
+(perfil de lectura) y una caché LRU con TTL cuya clave incluye la generación
+de carga del DW (etl_generacion): cuando un cargador termina una recarga la
+generación cambia y las entradas anteriores dejan de usarse.
+
+Uso:
+    python python/api_lectura.py [--host 127.0.0.1] [--port 8050]
+
+Endpoints:
+    GET /indicadores/periodo?pais=Brazil&genero=Female
+    GET /indicadores/pais?anio=2014&mes=8&indicadores=cantidad_estres,porcentaje_estres
+    GET /indicadores/genero?region=Europa
+    GET /metricas           aciertos/fallos de caché y latencias por endpoint
+
+Las cantidades se suman y los porcentajes se promedian (como en las
+estadísticas de 05_validar_dw.py).
+"""
+
+from collections import OrderedDict, deque
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import API_HOST, API_PORT, API_CACHE_ENTRADAS, API_CACHE_TTL_S
+from base_datos import obtener_conexion, generacion_actual
+from bitacora import log_message
+from errores import ErrorETL
+from indicadores import ALIAS_DIMENSIONES, CLAVES_DIMENSIONES, columnas_indicadores
+from instrumentacion import percentil
+
+
+# alias -> (clave foránea, tabla de dimensión)
+DIMENSIONES_POR_ALIAS = dict(zip(ALIAS_DIMENSIONES, CLAVES_DIMENSIONES))
+
+# Agrupaciones disponibles: nombre del endpoint -> (alias, columna)
+AGRUPACIONES = {
+    'periodo': ('dt', 'periodo'),
+    'pais': ('dp', 'country'),
+    'genero': ('dg', 'genero')
+}
+
+# Filtros admitidos en la query string: parámetro -> (alias, columna)
+FILTROS = {
+    'anio': ('dt', 'anio'),
+    'mes': ('dt', 'mes'),
+    'periodo': ('dt', 'periodo'),
+    'genero': ('dg', 'genero'),
+    'historial': ('dh', 'family_history'),
+    'ocupacion': ('doc', 'occupation'),
+    'pais': ('dp', 'country'),
+    'region': ('dp', 'region'),
+    'aislamiento': ('da', 'days_indoors'),
+    'atencion': ('dac', 'care_options')
+}
+
+# Latencias recientes conservadas por endpoint para los percentiles
+MUESTRAS_LATENCIA = 1000
+
+
+class ErrorConsulta(Exception):
+    """Parámetros inválidos en una consulta a la API (respuesta 400/404)"""
+
+    def __init__(self, mensaje, estado=400):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def construir_consulta(agrupacion, filtros, indicadores=None):
+    """
+    SQL parametrizado de indicadores agrupados
+    Solo se unen las dimensiones que usan la agrupación y los filtros.
+    Devuelve (sql, params).
+    """
+    if agrupacion not in AGRUPACIONES:
+        raise ErrorConsulta(f"Agrupación desconocida: {agrupacion}", 404)
+
+    desconocidos = sorted(set(filtros) - set(FILTROS))
+    if desconocidos:
+        raise ErrorConsulta(f"Filtros desconocidos: {', '.join(desconocidos)}")
+
+    validos = columnas_indicadores()
+    indicadores = indicadores or validos
+    invalidos = [ind for ind in indicadores if ind not in validos]
+    if invalidos:
+        raise ErrorConsulta(f"Indicadores desconocidos: {', '.join(invalidos)}")
+
+    alias_grupo, columna_grupo = AGRUPACIONES[agrupacion]
+    alias_usados = {alias_grupo} | {FILTROS[f][0] for f in filtros}
+
+    joins = []
+    for alias in ALIAS_DIMENSIONES:
+        if alias in alias_usados:
+            fk, dimension = DIMENSIONES_POR_ALIAS[alias]
+            joins.append(f"INNER JOIN {dimension} {alias} ON h.{fk} = {alias}.{fk}")
+
+    condiciones = []
+    params = []
+    for nombre in sorted(filtros):
+        alias, columna = FILTROS[nombre]
+        condiciones.append(f"{alias}.{columna} = %s")
+        params.append(filtros[nombre])
+
+    where = 'WHERE ' + ' AND '.join(condiciones) if condiciones else ''
+    separador = '\n    '
+
+    cantidades = set(columnas_indicadores('cantidad'))
+    agregados = [
+        f"SUM(h.{ind}) AS {ind}" if ind in cantidades else f"ROUND(AVG(h.{ind}), 2) AS {ind}"
+        for ind in indicadores
+    ]
+
+    sql = f"""
+    SELECT {alias_grupo}.{columna_grupo} AS {agrupacion},
+        COUNT(*) AS hechos,
+        {(',' + separador + '    ').join(agregados)}
+    FROM Hechos_Estres_SaludMental h
+    {separador.join(joins)}
+    {where}
+    GROUP BY {alias_grupo}.{columna_grupo}
+    ORDER BY {alias_grupo}.{columna_grupo}
+    """
+    return sql, params
+
+
+class CacheResultados:
+    """Caché LRU con vencimiento por TTL, segura entre hilos"""
+
+    def __init__(self, max_entradas=API_CACHE_ENTRADAS, ttl_s=API_CACHE_TTL_S):
+        self.max_entradas = max_entradas
+        self.ttl_s = ttl_s
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.vencidas = 0
+        self.desalojadas = 0
+
+    def obtener(self, clave):
+        """Valor en caché o None (cuenta acierto/fallo)"""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and time.monotonic() - entrada[0] > self.ttl_s:
+                del self._entradas[clave]
+                self.vencidas += 1
+                entrada = None
+
+            if entrada is None:
+                self.fallos += 1
+                return None
+
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._entradas[clave] = (time.monotonic(), valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.desalojadas += 1
+
+    def metricas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+                'ttl_s': self.ttl_s,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else None,
+                'vencidas': self.vencidas,
+                'desalojadas': self.desalojadas
+            }
+
+
+class MetricasLatencia:
+    """Latencias recientes por endpoint (ms)"""
+
+    def __init__(self, muestras=MUESTRAS_LATENCIA):
+        self._muestras = muestras
+        self._latencias = {}
+        self._totales = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, endpoint, duracion_ms):
+        with self._lock:
+            self._latencias.setdefault(endpoint, deque(maxlen=self._muestras)).append(duracion_ms)
+            self._totales[endpoint] = self._totales.get(endpoint, 0) + 1
+
+    def metricas(self):
+        with self._lock:
+            resultado = {}
+            for endpoint, latencias in self._latencias.items():
+                ordenadas = sorted(latencias)
+                resultado[endpoint] = {
+                    'solicitudes': self._totales[endpoint],
+                    'p50_ms': round(percentil(ordenadas, 50), 3),
+                    'p95_ms': round(percentil(ordenadas, 95), 3),
+                    'max_ms': round(ordenadas[-1], 3)
+                }
+            return resultado
+
+
+cache = CacheResultados()
+latencias = MetricasLatencia()
+
+
+def consultar_indicadores(agrupacion, filtros, indicadores=None):
+    """
+    Resolver una consulta de indicadores (desde la caché si la generación no cambió)
+    Devuelve (documento, origen) con origen 'cache' o 'mysql'.
+    """
+    sql, params = construir_consulta(agrupacion, filtros, indicadores)
+
+    with obtener_conexion('api_lectura', 'lectura', resumen=False) as conn:
+        generacion = generacion_actual(conn)
+        clave = (generacion, sql, tuple(params))
+
+        documento = cache.obtener(clave)
+        if documento is not None:
+            return documento, 'cache'
+
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        columnas = list(cursor.column_names)
+        filas = [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+        cursor.close()
+
+    documento = {
+        'agrupacion': agrupacion,
+        'filtros': filtros,
+        'generacion': generacion[0],
+        'filas': filas
+    }
+    cache.guardar(clave, documento)
+    return documento, 'mysql'
+
+
+def _a_json(valor):
+    """Serializar DECIMAL como número y el resto (fechas) como texto"""
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return str(valor)
+
+
+class ManejadorAPI(BaseHTTPRequestHandler):
+    """Rutas GET de la API"""
+
+    def do_GET(self):
+        inicio = time.perf_counter()
+        url = urlparse(self.path)
+        partes = [p for p in url.path.split('/') if p]
+        endpoint = '/' + '/'.join(partes)
+
+        try:
+            if partes == ['metricas']:
+                estado, cuerpo = 200, {'cache': cache.metricas(), 'latencias': latencias.metricas()}
+            elif len(partes) == 2 and partes[0] == 'indicadores':
+                consulta = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                indicadores = consulta.pop('indicadores', None)
+                cuerpo, origen = consultar_indicadores(
+                    partes[1], consulta, indicadores.split(',') if indicadores else None
+                )
+                estado = 200
+                cuerpo = dict(cuerpo, origen=origen)
+            else:
+                raise ErrorConsulta(f"Ruta desconocida: {url.path}", 404)
+        except ErrorConsulta as e:
+            estado, cuerpo = e.estado, {'error': str(e)}
+        except Exception as e:
+            log_message(f"❌ ERROR en API ({url.path}): {e}")
+            estado, cuerpo = 500, {'error': 'Error interno consultando el DW'}
+
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        if estado == 200 and endpoint != '/metricas':
+            latencias.registrar(endpoint, duracion_ms)
+
+        self._responder(estado, cuerpo)
+
+    def _responder(self, estado, cuerpo):
+        datos = json.dumps(cuerpo, ensure_ascii=False, default=_a_json).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, formato, *args):
+        # Sin una línea por solicitud en stderr; las latencias están en /metricas
+        pass
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description='API local de solo lectura del DW de salud mental')
+    parser.add_argument('--host', default=API_HOST)
+    parser.add_argument('--port', type=int, default=API_PORT)
+    args = parser.parse_args()
+
+    servidor = ThreadingHTTPServer((args.host, args.port), ManejadorAPI)
+    servidor.daemon_threads = True
+
+    log_message(f"API de lectura escuchando en http://{args.host}:{args.port}")
+    log_message(f"Caché: {API_CACHE_ENTRADAS} entradas, TTL {API_CACHE_TTL_S} s")
+
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        log_message("API detenida")
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ErrorETL:
+        sys.exit(1)
@@ -0,0 +1,583 @@
+"""
+Asesor de índices e historial de estadísticas de tablas (solo MySQL)
+Al terminar cada ejecución del ETL (auditoria.ejecucion_etl) guarda una foto de:
+- etl_tablas_historial: filas estimadas y bytes de datos e índices
+  (information_schema.TABLES), filas leídas por recorrido completo y filas
+  escritas (performance_schema), formato de fila y bytes asignados en disco
+  (INNODB_TABLESPACES, que refleja la compresión de páginas); para la tabla
+  de hechos, además, el tiempo de un recorrido completo, solo en las fotos
+  de --capturar (o en cada ejecución con ESTADISTICAS_RECORRIDO_POR_EJECUCION)
+- etl_indices_historial: columnas, tamaño (mysql.innodb_index_stats) y
+  filas leídas de cada índice (performance_schema)
+
+Los contadores de performance_schema son acumulados desde que arrancó el
+servidor y se reinician con TRUNCATE: el uso dentro de la ventana de
+ejecuciones se obtiene sumando los incrementos entre fotos consecutivas.
+
+El reporte compara los formatos de almacenamiento que tuvo la tabla de
+hechos (ROW_FORMAT, compresión y ancho fijo de fila, que cambia al angostar
+los tipos de las claves): bytes por fila y
+milisegundos por millón de filas recorridas de la última foto de cada uno.
+
+Recomendaciones:
+- quitar los índices redundantes, prefijo de otro (sys.schema_redundant_indexes)
+- quitar los índices sin lecturas en la ventana (salvo PRIMARY, UNIQUE y los
+  que sostienen una FOREIGN KEY), con las escrituras que dejarían de pagarlos
+- agregar índices sobre columnas filtradas o unidas en sentencias que
+  recorrieron tablas completas (events_statements_summary_by_digest), con
+  esas sentencias
+
+Uso:
+    python python/asesor_indices.py                 # reporte de las últimas 10 ejecuciones
+    python python/asesor_indices.py --runs 30
+    python python/asesor_indices.py --capturar      # guardar una foto ahora (con recorrido)
+"""
+
+from collections import namedtuple
+from datetime import datetime
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import (
+    MYSQL_CONFIG, DW_BACKEND, ASESOR_VENTANA_RUNS, ESTADISTICAS_POR_EJECUCION,
+    ESTADISTICAS_RECORRIDO_POR_EJECUCION
+)
+from errores import ErrorETL
+from bitacora import log_message
+from base_datos import obtener_conexion
+from chequeos import TABLA_HECHOS
+
+
+ESQUEMA = MYSQL_CONFIG['database']
+
+# Sentencias que examinan menos filas por ejecución no justifican un índice
+MIN_FILAS_EXAMINADAS = 1000
+
+# Segmentos de predicados (WHERE / ON de un JOIN) en el texto de un digest
+PATRON_PREDICADOS = re.compile(
+    r'\b(?:WHERE|ON(?!\s+DUPLICATE))\b(.*?)'
+    r'(?=\b(?:GROUP\s+BY|ORDER\s+BY|LIMIT|HAVING|UNION|JOIN|LEFT|RIGHT|INNER|WHERE)\b|$)',
+    re.S | re.I
+)
+
+Recomendacion = namedtuple('Recomendacion', 'accion tabla indice columnas motivo sql consultas')
+
+# Tablas cuyo recorrido completo se cronometra en las fotos que lo piden (medir)
+TABLAS_RECORRIDO = [TABLA_HECHOS]
+
+# Bytes de los tipos enteros de InnoDB
+ANCHO_ENTEROS = {'tinyint': 1, 'smallint': 2, 'mediumint': 3, 'int': 4, 'bigint': 8}
+# Bytes de DECIMAL por cantidad de dígitos sobrantes de cada grupo de 9 (4 bytes)
+ANCHO_DIGITOS = [0, 1, 1, 2, 2, 3, 3, 4, 4, 4]
+
+
+# ============================================
+# CAPTURA
+# ============================================
+
+def ancho_tipo(tipo):
+    """Bytes de un COLUMN_TYPE de ancho fijo (0 si es de ancho variable)"""
+    entero = re.match(r'(\w+)', tipo).group(1)
+    if entero in ANCHO_ENTEROS:
+        return ANCHO_ENTEROS[entero]
+    decimal = re.match(r'decimal\((\d+),(\d+)\)', tipo)
+    if decimal:
+        precision, escala = int(decimal.group(1)), int(decimal.group(2))
+        return sum(4 * (d // 9) + ANCHO_DIGITOS[d % 9] for d in (precision - escala, escala))
+    return 0
+
+
+def ancho_fila(cursor, tabla):
+    """Bytes de las columnas de ancho fijo de una tabla (cambia al angostar las claves)"""
+    return sum(ancho_tipo(tipo) for _, tipo in _firma_columnas(cursor, tabla))
+
+
+def medir_recorrido(cursor, tabla):
+    """
+    Milisegundos de un recorrido completo del índice agrupado (PRIMARY)
+    Se leen todas las columnas de cada fila (CHECKSUM de la fila), con el
+    buffer pool ya caliente: mide descompresión y ancho de fila, no disco.
+    """
+    cursor.execute(f"SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+                   f"WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s", (ESQUEMA, tabla))
+    columnas = ', '.join(f"`{fila[0]}`" for fila in cursor.fetchall())
+
+    inicio = time.perf_counter()
+    cursor.execute(f"SELECT COUNT(*), SUM(CRC32(CONCAT_WS(',', {columnas}))) "
+                   f"FROM `{tabla}` FORCE INDEX (PRIMARY)")
+    cursor.fetchall()
+    return round((time.perf_counter() - inicio) * 1000, 1)
+
+
+def capturar_estadisticas(conn, id_run=None, medir=False):
+    """
+    Guardar la foto de tablas e índices del DW; devuelve (tablas, índices)
+    medir=True cronometra además un recorrido completo de TABLAS_RECORRIDO
+    (recorrido_ms; sin medir queda NULL y la foto solo lee metadatos)
+    """
+    cursor = conn.cursor()
+    capturado = datetime.now()
+
+    cursor.execute("""
+        SELECT
+            t.TABLE_NAME, t.TABLE_ROWS, t.DATA_LENGTH, t.INDEX_LENGTH,
+            u.COUNT_READ, w.COUNT_WRITE,
+            TRIM(CONCAT(t.ROW_FORMAT, ' ', t.CREATE_OPTIONS)) AS formato_fila,
+            ts.ALLOCATED_SIZE
+        FROM information_schema.TABLES t
+        LEFT JOIN information_schema.INNODB_TABLESPACES ts
+            ON ts.NAME = CONCAT(t.TABLE_SCHEMA, '/', t.TABLE_NAME)
+        LEFT JOIN performance_schema.table_io_waits_summary_by_index_usage u
+            ON u.OBJECT_SCHEMA = t.TABLE_SCHEMA AND u.OBJECT_NAME = t.TABLE_NAME
+           AND u.INDEX_NAME IS NULL
+        LEFT JOIN performance_schema.table_io_waits_summary_by_table w
+            ON w.OBJECT_SCHEMA = t.TABLE_SCHEMA AND w.OBJECT_NAME = t.TABLE_NAME
+        WHERE t.TABLE_SCHEMA = %s AND t.TABLE_TYPE = 'BASE TABLE'
+    """, (ESQUEMA,))
+    tablas = []
+    for fila in cursor.fetchall():
+        fila = list(fila)
+        recorrido_ms = None
+        if fila[0] in TABLAS_RECORRIDO:
+            fila[6] = f"{fila[6]} fila={ancho_fila(cursor, fila[0])}B"
+            if medir:
+                recorrido_ms = medir_recorrido(cursor, fila[0])
+        tablas.append(tuple(fila) + (recorrido_ms,))
+
+    cursor.execute("""
+        SELECT
+            s.TABLE_NAME, s.INDEX_NAME,
+            GROUP_CONCAT(s.COLUMN_NAME ORDER BY s.SEQ_IN_INDEX) AS columnas,
+            MIN(s.NON_UNIQUE) = 0 AS unico,
+            MAX(st.stat_value) * @@innodb_page_size AS tamano_bytes,
+            MAX(u.COUNT_READ) AS lecturas
+        FROM information_schema.STATISTICS s
+        LEFT JOIN mysql.innodb_index_stats st
+            ON st.database_name = s.TABLE_SCHEMA AND st.table_name = s.TABLE_NAME
+           AND st.index_name = s.INDEX_NAME AND st.stat_name = 'size'
+        LEFT JOIN performance_schema.table_io_waits_summary_by_index_usage u
+            ON u.OBJECT_SCHEMA = s.TABLE_SCHEMA AND u.OBJECT_NAME = s.TABLE_NAME
+           AND u.INDEX_NAME = s.INDEX_NAME
+        WHERE s.TABLE_SCHEMA = %s
+        GROUP BY s.TABLE_NAME, s.INDEX_NAME
+    """, (ESQUEMA,))
+    indices = cursor.fetchall()
+
+    cursor.executemany("""
+        INSERT INTO etl_tablas_historial (
+            id_run, capturado, tabla, filas_estimadas, datos_bytes, indices_bytes,
+            filas_escaneo_completo, filas_escritas, formato_fila, archivo_bytes, recorrido_ms
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, [(id_run, capturado) + fila for fila in tablas])
+
+    cursor.executemany("""
+        INSERT INTO etl_indices_historial (
+            id_run, capturado, tabla, indice, columnas, unico, tamano_bytes, lecturas
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """, [(id_run, capturado) + tuple(fila) for fila in indices])
+
+    conn.commit()
+    cursor.close()
+    return len(tablas), len(indices)
+
+
+def registrar_estadisticas(id_run):
+    """Foto al final de una ejecución (ejecucion_etl); DuckDB no tiene estos contadores"""
+    if DW_BACKEND == 'duckdb' or not ESTADISTICAS_POR_EJECUCION:
+        return
+
+    with obtener_conexion('asesor_indices', resumen=False) as conn:
+        capturar_estadisticas(conn, id_run, medir=ESTADISTICAS_RECORRIDO_POR_EJECUCION)
+
+
+# ============================================
+# USO EN LA VENTANA
+# ============================================
+
+def uso_en_ventana(serie):
+    """
+    Incremento de un contador acumulado a lo largo de la serie de fotos
+    Un valor menor que el anterior indica un reinicio (servidor o TRUNCATE):
+    se cuenta desde cero. Con una sola foto, su valor acumulado.
+    """
+    serie = [valor or 0 for valor in serie]
+    if len(serie) < 2:
+        return serie[0] if serie else 0
+
+    total = 0
+    for anterior, actual in zip(serie, serie[1:]):
+        total += actual - anterior if actual >= anterior else actual
+    return total
+
+
+def _capturas(cursor, tabla_historial, runs):
+    """Marcas de tiempo de las runs + 1 últimas fotos (la primera es la base)"""
+    cursor.execute(f"""
+        SELECT DISTINCT capturado FROM {tabla_historial}
+        ORDER BY capturado DESC
+        LIMIT %s
+    """, (runs + 1,))
+    return sorted(fila[0] for fila in cursor.fetchall())
+
+
+def historial_tablas(conn, runs=ASESOR_VENTANA_RUNS):
+    """
+    {tabla: filas y bytes al inicio y al final de la ventana, filas leídas por
+    recorrido completo y filas escritas dentro de ella}
+    """
+    cursor = conn.cursor()
+    capturas = _capturas(cursor, 'etl_tablas_historial', runs)
+    if not capturas:
+        cursor.close()
+        return {}
+
+    cursor.execute("""
+        SELECT tabla, filas_estimadas, datos_bytes, indices_bytes, filas_escaneo_completo, filas_escritas
+        FROM etl_tablas_historial
+        WHERE capturado >= %s
+        ORDER BY capturado
+    """, (capturas[0],))
+    series = {}
+    for tabla, *valores in cursor.fetchall():
+        series.setdefault(tabla, []).append(valores)
+    cursor.close()
+
+    historial = {}
+    for tabla, fotos in series.items():
+        primera, ultima = fotos[0], fotos[-1]
+        historial[tabla] = {
+            'filas_inicio': primera[0] or 0,
+            'filas': ultima[0] or 0,
+            'bytes_inicio': (primera[1] or 0) + (primera[2] or 0),
+            'datos_bytes': ultima[1] or 0,
+            'indices_bytes': ultima[2] or 0,
+            'filas_escaneo_completo': uso_en_ventana([f[3] for f in fotos]),
+            'filas_escritas': uso_en_ventana([f[4] for f in fotos])
+        }
+    return historial
+
+
+def _firma_columnas(cursor, tabla):
+    """(columna, COLUMN_TYPE) de una tabla en orden"""
+    cursor.execute("""
+        SELECT COLUMN_NAME, COLUMN_TYPE
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+        ORDER BY ORDINAL_POSITION
+    """, (ESQUEMA, tabla))
+    return cursor.fetchall()
+
+
+def comparar_formatos(conn, tabla=TABLA_HECHOS):
+    """
+    Última foto de cada formato de fila que tuvo la tabla (todo el historial)
+    Cada elemento: formato, capturado, filas, bytes por fila (datos, índices
+    y asignados en disco) y ms por millón de filas del recorrido completo.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT h.formato_fila, h.capturado, h.filas_estimadas, h.datos_bytes,
+               h.indices_bytes, h.archivo_bytes, h.recorrido_ms
+        FROM etl_tablas_historial h
+        JOIN (
+            SELECT formato_fila, MAX(capturado) AS capturado
+            FROM etl_tablas_historial
+            WHERE tabla = %s AND recorrido_ms IS NOT NULL AND filas_estimadas > 0
+            GROUP BY formato_fila
+        ) u ON u.formato_fila = h.formato_fila AND u.capturado = h.capturado
+        WHERE h.tabla = %s
+        ORDER BY h.capturado
+    """, (tabla, tabla))
+    filas = cursor.fetchall()
+    cursor.close()
+
+    return [
+        {
+            'formato': formato,
+            'capturado': capturado,
+            'filas': filas_tabla,
+            'datos_por_fila': (datos or 0) / filas_tabla,
+            'indices_por_fila': (indices or 0) / filas_tabla,
+            'disco_por_fila': (archivo or 0) / filas_tabla,
+            'ms_por_millon': float(recorrido_ms) * 1e6 / filas_tabla
+        }
+        for formato, capturado, filas_tabla, datos, indices, archivo, recorrido_ms in filas
+    ]
+
+
+def uso_indices(conn, runs=ASESOR_VENTANA_RUNS):
+    """{(tabla, índice): columnas, unico, tamaño y lecturas en la ventana} de los índices actuales"""
+    cursor = conn.cursor()
+    capturas = _capturas(cursor, 'etl_indices_historial', runs)
+    if not capturas:
+        cursor.close()
+        return {}
+
+    cursor.execute("""
+        SELECT capturado, tabla, indice, columnas, unico, tamano_bytes, lecturas
+        FROM etl_indices_historial
+        WHERE capturado >= %s
+        ORDER BY capturado
+    """, (capturas[0],))
+    series = {}
+    for capturado, tabla, indice, columnas, unico, tamano, lecturas in cursor.fetchall():
+        serie = series.setdefault((tabla, indice), {'lecturas': []})
+        serie.update(capturado=capturado, columnas=columnas.split(','), unico=bool(unico),
+                     tamano_bytes=tamano or 0)
+        serie['lecturas'].append(lecturas)
+    cursor.close()
+
+    return {
+        clave: dict(serie, lecturas=uso_en_ventana(serie['lecturas']))
+        for clave, serie in series.items()
+        if serie['capturado'] == capturas[-1]
+    }
+
+
+# ============================================
+# RECOMENDACIONES
+# ============================================
+
+def _columnas_fk(cursor):
+    """{tabla: columnas con FOREIGN KEY}"""
+    cursor.execute("""
+        SELECT TABLE_NAME, COLUMN_NAME
+        FROM information_schema.KEY_COLUMN_USAGE
+        WHERE TABLE_SCHEMA = %s AND REFERENCED_TABLE_NAME IS NOT NULL
+    """, (ESQUEMA,))
+    fks = {}
+    for tabla, columna in cursor.fetchall():
+        fks.setdefault(tabla, set()).add(columna)
+    return fks
+
+
+def _columnas_tablas(cursor):
+    """{tabla: columnas}"""
+    cursor.execute("""
+        SELECT TABLE_NAME, COLUMN_NAME
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = %s
+    """, (ESQUEMA,))
+    columnas = {}
+    for tabla, columna in cursor.fetchall():
+        columnas.setdefault(tabla, set()).add(columna)
+    return columnas
+
+
+def sentencias_digest(conn):
+    """Sentencias sobre el DW agrupadas por digest (performance_schema)"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT
+            DIGEST_TEXT, COUNT_STAR, SUM_TIMER_WAIT / 1e12 AS total_s,
+            SUM_ROWS_EXAMINED, SUM_NO_INDEX_USED
+        FROM performance_schema.events_statements_summary_by_digest
+        WHERE SCHEMA_NAME = %s AND DIGEST_TEXT IS NOT NULL
+        ORDER BY SUM_TIMER_WAIT DESC
+    """, (ESQUEMA,))
+    sentencias = [
+        {'texto': texto, 'ejecuciones': ejecuciones, 'total_s': float(total_s or 0),
+         'filas_examinadas': filas or 0, 'sin_indice': sin_indice or 0}
+        for texto, ejecuciones, total_s, filas, sin_indice in cursor.fetchall()
+        if not re.search(r'performance_schema|information_schema|innodb_index_stats', texto)
+    ]
+    cursor.close()
+    return sentencias
+
+
+def _resumen_sentencia(sentencia, largo=120):
+    texto = ' '.join(sentencia['texto'].replace('`', '').split())
+    texto = texto if len(texto) <= largo else texto[:largo - 3] + '...'
+    return f"{sentencia['ejecuciones']}x {sentencia['total_s']:.2f} s: {texto}"
+
+
+def _tablas_de(texto, columnas_tablas):
+    return [tabla for tabla in columnas_tablas if f"`{tabla}`" in texto]
+
+
+def recomendar(conn, runs=ASESOR_VENTANA_RUNS):
+    """Lista de Recomendacion (quitar / agregar) con las sentencias afectadas"""
+    cursor = conn.cursor()
+    fks = _columnas_fk(cursor)
+    columnas_tablas = _columnas_tablas(cursor)
+
+    cursor.execute("""
+        SELECT table_name, redundant_index_name, redundant_index_columns,
+               dominant_index_name, dominant_index_columns, sql_drop_index
+        FROM sys.schema_redundant_indexes
+        WHERE table_schema = %s
+    """, (ESQUEMA,))
+    redundantes = cursor.fetchall()
+    cursor.close()
+
+    indices = uso_indices(conn, runs)
+    sentencias = sentencias_digest(conn)
+    escrituras = {
+        tabla: [s for s in sentencias
+                if re.match(r'\s*(INSERT|UPDATE|DELETE|REPLACE|LOAD)\b', s['texto'], re.I)
+                and tabla in _tablas_de(s['texto'], columnas_tablas)]
+        for tabla in columnas_tablas
+    }
+
+    recomendaciones = []
+
+    # 1. Redundantes: otro índice empieza con las mismas columnas
+    quitados = set()
+    for tabla, indice, columnas, dominante, columnas_dominante, sql in redundantes:
+        quitados.add((tabla, indice))
+        recomendaciones.append(Recomendacion(
+            'quitar', tabla, indice, columnas,
+            f"redundante: {dominante} ({columnas_dominante}) ya lo cubre como prefijo",
+            sql, escrituras[tabla]
+        ))
+
+    # 2. Sin lecturas en la ventana
+    for (tabla, indice), uso in sorted(indices.items()):
+        if indice == 'PRIMARY' or uso['unico'] or uso['lecturas'] > 0 or (tabla, indice) in quitados:
+            continue
+
+        primera = uso['columnas'][0]
+        otros = [i for (t, i), otro in indices.items()
+                 if t == tabla and i != indice and otro['columnas'][0] == primera]
+        if primera in fks.get(tabla, ()) and not otros:
+            continue    # InnoDB exige un índice que empiece por la columna de la FK
+
+        recomendaciones.append(Recomendacion(
+            'quitar', tabla, indice, ','.join(uso['columnas']),
+            f"sin lecturas en las últimas {runs} ejecuciones ({uso['tamano_bytes'] / 1024 / 1024:.1f} MB)",
+            f"ALTER TABLE `{ESQUEMA}`.`{tabla}` DROP INDEX `{indice}`", escrituras[tabla]
+        ))
+
+    # 3. Columnas de predicados en sentencias que recorrieron tablas completas
+    iniciales = {}
+    for (tabla, _), uso in indices.items():
+        iniciales.setdefault(tabla, set()).add(uso['columnas'][0])
+
+    candidatas = {}
+    for sentencia in sentencias:
+        if (not sentencia['sin_indice']
+                or sentencia['filas_examinadas'] < MIN_FILAS_EXAMINADAS * sentencia['ejecuciones']):
+            continue
+        predicados = ' '.join(PATRON_PREDICADOS.findall(sentencia['texto']))
+        nombres = set(re.findall(r'`(\w+)`', predicados))
+        for tabla in _tablas_de(sentencia['texto'], columnas_tablas):
+            for columna in sorted(nombres & columnas_tablas[tabla] - iniciales.get(tabla, set())):
+                candidatas.setdefault((tabla, columna), []).append(sentencia)
+
+    por_tiempo = sorted(candidatas.items(), key=lambda item: -sum(s['total_s'] for s in item[1]))
+    for (tabla, columna), afectadas in por_tiempo:
+        recomendaciones.append(Recomendacion(
+            'agregar', tabla, f"idx_{columna.lower()}", columna,
+            f"{len(afectadas)} sentencias sin índice la usan en WHERE/JOIN "
+            f"({sum(s['total_s'] for s in afectadas):.2f} s en total)",
+            f"ALTER TABLE `{ESQUEMA}`.`{tabla}` ADD INDEX `idx_{columna.lower()}` (`{columna}`)", afectadas
+        ))
+
+    return recomendaciones
+
+
+# ============================================
+# REPORTE
+# ============================================
+
+def reporte(conn, runs=ASESOR_VENTANA_RUNS):
+    """Tamaños y crecimiento, uso de índices y recomendaciones"""
+    log_message("\n" + "=" * 80)
+    log_message(f"TABLAS (últimas {runs} ejecuciones)")
+    log_message("=" * 80)
+
+    historial = historial_tablas(conn, runs)
+    if not historial:
+        log_message("⚠️ Sin historial: ejecuta el ETL o usa --capturar")
+        return []
+
+    log_message(f"{'Tabla':<30} {'Filas':>10} {'Δ filas':>9} {'Datos MB':>9} {'Índices MB':>11} "
+                f"{'Δ MB':>7} {'Filas recorridas':>17} {'Filas escritas':>15}")
+    log_message("-" * 80)
+    for tabla, h in sorted(historial.items(), key=lambda item: -item[1]['datos_bytes']):
+        total_mb = (h['datos_bytes'] + h['indices_bytes']) / 1024 / 1024
+        log_message(f"{tabla:<30} {h['filas']:>10} {h['filas'] - h['filas_inicio']:>+9} "
+                    f"{h['datos_bytes'] / 1024 / 1024:>9.1f} {h['indices_bytes'] / 1024 / 1024:>11.1f} "
+                    f"{total_mb - h['bytes_inicio'] / 1024 / 1024:>+7.1f} "
+                    f"{h['filas_escaneo_completo']:>17} {h['filas_escritas']:>15}")
+
+    log_message("\n" + "=" * 80)
+    log_message(f"FORMATOS DE ALMACENAMIENTO DE {TABLA_HECHOS}")
+    log_message("=" * 80)
+    formatos = comparar_formatos(conn)
+    if formatos:
+        log_message(f"{'Formato':<36} {'Capturado':<17} {'Filas':>9} {'Datos B/f':>10} "
+                    f"{'Índ. B/f':>9} {'Disco B/f':>10} {'ms/M filas':>11}")
+        log_message("-" * 80)
+        for f in formatos:
+            log_message(f"{f['formato'][:36]:<36} {f['capturado']:%Y-%m-%d %H:%M} {f['filas']:>9} "
+                        f"{f['datos_por_fila']:>10.1f} {f['indices_por_fila']:>9.1f} "
+                        f"{f['disco_por_fila']:>10.1f} {f['ms_por_millon']:>11.1f}")
+        base, ultimo = formatos[0], formatos[-1]
+        if len(formatos) > 1 and base['datos_por_fila'] and base['ms_por_millon']:
+            log_message(f"📈 {ultimo['formato']} frente a {base['formato']}: "
+                        f"{(ultimo['datos_por_fila'] + ultimo['indices_por_fila']) / (base['datos_por_fila'] + base['indices_por_fila']) * 100:.0f}% "
+                        f"de los bytes por fila, {ultimo['ms_por_millon'] / base['ms_por_millon'] * 100:.0f}% del tiempo de recorrido")
+    else:
+        log_message("⚠️ Sin recorridos cronometrados de la tabla de hechos (se miden con --capturar)")
+
+    log_message("\n" + "=" * 80)
+    log_message("ÍNDICES")
+    log_message("=" * 80)
+    log_message(f"{'Tabla':<30} {'Índice':<22} {'Columnas':<28} {'MB':>6} {'Lecturas':>12}")
+    log_message("-" * 80)
+    for (tabla, indice), uso in sorted(uso_indices(conn, runs).items()):
+        log_message(f"{tabla:<30} {indice:<22} {','.join(uso['columnas'])[:28]:<28} "
+                    f"{uso['tamano_bytes'] / 1024 / 1024:>6.1f} {uso['lecturas']:>12}")
+
+    log_message("\n" + "=" * 80)
+    log_message("RECOMENDACIONES")
+    log_message("=" * 80)
+
+    recomendaciones = recomendar(conn, runs)
+    if not recomendaciones:
+        log_message("✅ Sin cambios de índices recomendados")
+
+    for r in recomendaciones:
+        log_message(f"\n{r.accion.upper()} {r.tabla}.{r.indice} ({r.columnas}): {r.motivo}")
+        log_message(f"   {r.sql};")
+        if r.consultas:
+            titulo = 'Escrituras que dejarían de mantenerlo' if r.accion == 'quitar' else 'Sentencias beneficiadas'
+            log_message(f"   {titulo}:")
+            for sentencia in r.consultas[:5]:
+                log_message(f"     - {_resumen_sentencia(sentencia)}")
+
+    return recomendaciones
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description='Historial de tablas e índices y recomendaciones de índices')
+    parser.add_argument('--runs', type=int, default=ASESOR_VENTANA_RUNS,
+                        help=f'Ejecuciones del ETL que forman la ventana (por defecto {ASESOR_VENTANA_RUNS})')
+    parser.add_argument('--capturar', action='store_true',
+                        help='Guardar una foto (con recorrido cronometrado de hechos) antes del reporte')
+    args = parser.parse_args()
+
+    if DW_BACKEND == 'duckdb':
+        log_message("❌ ERROR: el asesor de índices requiere MySQL (performance_schema y sys)")
+        raise ErrorETL("Asesor de índices no disponible con DuckDB")
+
+    if args.capturar:
+        with obtener_conexion('asesor_indices') as conn:
+            tablas, indices = capturar_estadisticas(conn, medir=True)
+        log_message(f"✅ Foto guardada: {tablas} tablas, {indices} índices")
+
+    with obtener_conexion('asesor_indices_reporte', 'lectura') as conn:
+        reporte(conn, args.runs)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ErrorETL:
+        sys.exit(1)
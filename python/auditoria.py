@@ -0,0 +1,229 @@
+"""
+Auditoría de ejecuciones del ETL
+- etl_runs: una fila por ejecución (pipeline completo o script independiente)
+- etl_stage_runs: una fila por etapa con filas de entrada/salida/rechazadas,
+  bytes leídos, duración, RSS pico y estado
+- al cerrar cada run, una foto de tablas e índices (asesor_indices.py)
+El orquestador abre el run y lo comparte con las etapas mediante la variable
+de entorno ETL_RUN_ID; las filas de staging y de hechos guardan ese id_run.
+
+Reporte de tendencias de throughput por etapa:
+    python python/auditoria.py [--etapa staging] [--meses 12]
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from base_datos import obtener_conexion
+from bitacora import log_message, rss_pico_mb
+from asesor_indices import registrar_estadisticas
+from errores import ErrorETL
+
+
+ENV_RUN = 'ETL_RUN_ID'
+
+METRICAS_ETAPA = ('filas_entrada', 'filas_salida', 'filas_rechazadas', 'bytes_leidos')
+
+
+def run_actual():
+    """id_run de la ejecución en curso (None fuera de una ejecución auditada)"""
+    valor = os.environ.get(ENV_RUN)
+    return int(valor) if valor else None
+
+
+def metricas_etapa(resultado):
+    """
+    Normalizar lo que devuelve una etapa: un dict con METRICAS_ETAPA,
+    un entero (filas de salida) o None
+    """
+    if isinstance(resultado, dict):
+        return {k: v for k, v in resultado.items() if k in METRICAS_ETAPA}
+    if isinstance(resultado, int):
+        return {'filas_salida': resultado}
+    return {}
+
+
+def _abrir_run(origen):
+    with obtener_conexion('auditoria', resumen=False) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO etl_runs (origen, inicio, estado) VALUES (%s, %s, 'en_curso')",
+            (origen, datetime.now())
+        )
+        id_run = cursor.lastrowid
+        conn.commit()
+        cursor.close()
+    return id_run
+
+
+def _cerrar_run(id_run, estado):
+    with obtener_conexion('auditoria', resumen=False) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE etl_runs SET fin = %s, estado = %s, rss_pico_mb = %s WHERE id_run = %s",
+            (datetime.now(), estado, rss_pico_mb(), id_run)
+        )
+        conn.commit()
+        cursor.close()
+
+
+@contextmanager
+def ejecucion_etl(origen):
+    """
+    Run de auditoría: reutiliza el del orquestador (ETL_RUN_ID) o abre uno
+    propio para un script ejecutado de forma independiente
+    """
+    existente = run_actual()
+    if existente is not None:
+        yield existente
+        return
+
+    try:
+        id_run = _abrir_run(origen)
+    except Exception as e:
+        # Sin auditoría (p. ej. tablas aún no creadas) el ETL sigue funcionando
+        log_message(f"⚠️ No se pudo registrar la ejecución en etl_runs: {e}")
+        yield None
+        return
+
+    os.environ[ENV_RUN] = str(id_run)
+    log_message(f"Ejecución ETL #{id_run} ({origen})")
+    estado = 'ok'
+
+    try:
+        yield id_run
+    except BaseException:
+        estado = 'error'
+        raise
+    finally:
+        os.environ.pop(ENV_RUN, None)
+        try:
+            _cerrar_run(id_run, estado)
+        except Exception as e:
+            log_message(f"⚠️ No se pudo cerrar la ejecución #{id_run}: {e}")
+
+        # Historial de tamaños y uso de índices (asesor_indices.py)
+        try:
+            registrar_estadisticas(id_run)
+        except Exception as e:
+            log_message(f"⚠️ No se pudo guardar el historial de tablas e índices: {e}")
+
+
+def registrar_etapa(id_run, etapa, inicio, fin, registro, estado):
+    """Insertar la fila de una etapa en etl_stage_runs"""
+    with obtener_conexion('auditoria', resumen=False) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO etl_stage_runs (
+                id_run, etapa, inicio, fin, duracion_ms,
+                filas_entrada, filas_salida, filas_rechazadas, bytes_leidos,
+                rss_pico_mb, estado
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (
+            id_run, etapa, inicio, fin,
+            round((fin - inicio).total_seconds() * 1000),
+            registro['filas_entrada'], registro['filas_salida'],
+            registro['filas_rechazadas'], registro['bytes_leidos'],
+            rss_pico_mb(), estado
+        ))
+        conn.commit()
+        cursor.close()
+
+
+@contextmanager
+def auditar_etapa(etapa):
+    """
+    Registrar una etapa del run en curso en etl_stage_runs
+    El bloque informa sus métricas en el dict devuelto (METRICAS_ETAPA).
+    """
+    registro = dict.fromkeys(METRICAS_ETAPA)
+    inicio = datetime.now()
+    estado = 'ok'
+
+    try:
+        yield registro
+    except BaseException:
+        estado = 'error'
+        raise
+    finally:
+        id_run = run_actual()
+        if id_run is not None:
+            try:
+                registrar_etapa(id_run, etapa, inicio, datetime.now(), registro, estado)
+            except Exception as e:
+                log_message(f"⚠️ No se pudo registrar la etapa {etapa} en etl_stage_runs: {e}")
+
+
+# ============================================
+# REPORTE DE THROUGHPUT
+# ============================================
+
+def tendencias_throughput(conn, etapa=None, meses=12):
+    """Throughput mensual por etapa (solo etapas terminadas sin error)"""
+    cursor = conn.cursor()
+    filtro = "AND etapa = %s" if etapa else ""
+    cursor.execute(f"""
+        SELECT
+            etapa,
+            DATE_FORMAT(inicio, '%%Y-%%m') AS mes,
+            COUNT(*) AS ejecuciones,
+            ROUND(AVG(duracion_ms) / 1000, 2) AS duracion_media_s,
+            ROUND(SUM(filas_salida) / NULLIF(SUM(duracion_ms) / 1000, 0), 1) AS filas_por_seg,
+            MAX(rss_pico_mb) AS rss_pico_mb
+        FROM etl_stage_runs
+        WHERE estado = 'ok'
+          AND inicio >= DATE_SUB(CURDATE(), INTERVAL %s MONTH)
+          {filtro}
+        GROUP BY etapa, mes
+        ORDER BY etapa, mes
+    """, [meses] + ([etapa] if etapa else []))
+    filas = cursor.fetchall()
+    cursor.close()
+    return filas
+
+
+def reporte_throughput(conn, etapa=None, meses=12):
+    """Mostrar la evolución mensual del throughput de cada etapa"""
+    log_message("\n" + "=" * 80)
+    log_message(f"THROUGHPUT POR ETAPA (últimos {meses} meses)")
+    log_message("=" * 80)
+    log_message(f"{'Etapa':<14} {'Mes':<8} {'Runs':>5} {'Duración (s)':>13} "
+                f"{'Filas/s':>12} {'Δ vs mes ant.':>14} {'RSS (MB)':>9}")
+    log_message("-" * 80)
+
+    anterior = {}
+    for nombre, mes, ejecuciones, duracion, filas_por_seg, rss in tendencias_throughput(conn, etapa, meses):
+        previo = anterior.get(nombre)
+        if previo and filas_por_seg is not None:
+            variacion = f"{(float(filas_por_seg) / float(previo) - 1) * 100:+.1f}%"
+        else:
+            variacion = '-'
+        anterior[nombre] = filas_por_seg
+
+        log_message(f"{nombre:<14} {mes:<8} {ejecuciones:>5} {duracion:>13} "
+                    f"{filas_por_seg if filas_por_seg is not None else '-':>12} "
+                    f"{variacion:>14} {rss if rss is not None else '-':>9}")
+
+    log_message("-" * 80)
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description='Reporte de throughput de las ejecuciones del ETL')
+    parser.add_argument('--etapa', help='Solo esta etapa (limpieza, staging, dimensiones, ...)')
+    parser.add_argument('--meses', type=int, default=12, help='Meses hacia atrás (por defecto 12)')
+    args = parser.parse_args()
+
+    with obtener_conexion('auditoria_reporte', 'lectura') as conn:
+        reporte_throughput(conn, args.etapa, args.meses)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ErrorETL:
+        sys.exit(1)
@@ -0,0 +1,166 @@
+"""
+Capa compartida de acceso a MySQL
+- Un único pool de conexiones (mysql.connector.pooling) para scripts y orquestador
+- Usa la extensión C de mysql-connector cuando está disponible
+- Perfiles de sesión con nombre (PERFILES_SESION en config.py) que se aplican
+  al tomar la conexión y se descartan al devolverla al pool
+- Con DW_BACKEND = 'duckdb' las conexiones son del motor embebido
+  (motor_duckdb.py), con la misma interfaz y sin perfiles de sesión
+"""
+
+from contextlib import contextmanager
+import os
+import sys
+import threading
+
+import mysql.connector
+from mysql.connector import pooling
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import MYSQL_CONFIG, MYSQL_POOL_SIZE, PERFILES_SESION, DW_BACKEND
+from bitacora import log_message
+from errores import ErrorETL
+from instrumentacion import instrumentar
+import motor_duckdb
+
+
+# Errores de base de datos de cualquiera de los dos motores
+ERRORES_BD = (mysql.connector.Error,) + motor_duckdb.ERRORES_DUCKDB
+
+_pool = None
+_lock_pool = threading.Lock()
+
+# El pool de mysql-connector falla si está agotado; el semáforo hace esperar
+_semaforo = threading.BoundedSemaphore(MYSQL_POOL_SIZE)
+
+
+def usa_extension_c():
+    """True si mysql-connector tiene disponible la extensión C"""
+    return getattr(mysql.connector, 'HAVE_CEXT', False)
+
+
+def obtener_pool():
+    """Crear (una sola vez) y devolver el pool de conexiones"""
+    global _pool
+
+    with _lock_pool:
+        if _pool is None:
+            _pool = pooling.MySQLConnectionPool(
+                pool_name='dw_salud_mental',
+                pool_size=MYSQL_POOL_SIZE,
+                pool_reset_session=True,
+                use_pure=not usa_extension_c(),
+                **MYSQL_CONFIG
+            )
+    return _pool
+
+
+def aplicar_perfil(conn, perfil):
+    """Aplicar las variables de sesión de un perfil con nombre"""
+    if perfil not in PERFILES_SESION:
+        raise ErrorETL(f"Perfil de sesión desconocido: {perfil}")
+
+    cursor = conn.cursor()
+    for variable, valor in PERFILES_SESION[perfil].items():
+        cursor.execute(f"SET SESSION {variable} = %s", (valor,))
+    cursor.close()
+
+
+def _tomar_del_pool(perfil):
+    if DW_BACKEND == 'duckdb':
+        return motor_duckdb.conectar()
+
+    try:
+        conn = obtener_pool().get_connection()
+    except mysql.connector.Error as err:
+        log_message(f"❌ ERROR de conexión: {err}")
+        log_message("Verifica que:")
+        log_message("  1. MySQL esté ejecutándose")
+        log_message("  2. Las credenciales en config.py sean correctas")
+        log_message("  3. La base de datos 'dw_salud_mental' exista")
+        raise ErrorETL(f"Error de conexión: {err}") from err
+
+    aplicar_perfil(conn, perfil)
+    return conn
+
+
+def conectar_mysql(nombre_script, perfil='default'):
+    """
+    Conexión instrumentada para un script ejecutado de forma independiente
+    Al llamar a close() vuelve al pool.
+    """
+    log_message(f"Conectando a {'DuckDB' if DW_BACKEND == 'duckdb' else 'MySQL'} (perfil {perfil})...")
+    conn = instrumentar(_tomar_del_pool(perfil), nombre_script)
+    log_message("✅ Conexión exitosa")
+    return conn
+
+
+@contextmanager
+def obtener_conexion(nombre, perfil='default', resumen=True):
+    """
+    Tomar prestada una conexión del pool para una tarea
+    Espera si el pool está agotado; al salir devuelve la conexión y
+    escribe el resumen de sentencias SQL de la tarea (salvo resumen=False,
+    p. ej. para las consultas cortas y frecuentes de la API de lectura).
+    """
+    with _semaforo:
+        conn = instrumentar(_tomar_del_pool(perfil), nombre)
+        try:
+            yield conn
+        finally:
+            conn.close()
+            if resumen:
+                conn.escribir_resumen()
+
+
+def interrumpir_consulta(conn):
+    """
+    Detener desde otro hilo la sentencia en curso de una conexión
+    DuckDB: interrupt(); MySQL: KILL QUERY desde una conexión aparte, fuera
+    del pool (puede estar agotado por las mismas tareas que se quieren detener).
+    """
+    if DW_BACKEND == 'duckdb':
+        conn.interrupt()
+        return
+
+    otra = mysql.connector.connect(**dict(MYSQL_CONFIG, raise_on_warnings=False))
+    try:
+        cursor = otra.cursor()
+        cursor.execute(f"KILL QUERY {int(conn.connection_id)}")
+        cursor.close()
+    finally:
+        otra.close()
+
+
+# ============================================
+# GENERACIÓN DE CARGA
+# Contador en etl_generacion que los cargadores incrementan al terminar
+# una recarga; permite a los lectores (API) invalidar sus cachés.
+# ============================================
+
+def incrementar_generacion(conn):
+    """Registrar que terminó una recarga del DW y devolver la nueva generación"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO etl_generacion (id, generacion, actualizado)
+        VALUES (1, 1, NOW(6))
+        ON DUPLICATE KEY UPDATE generacion = generacion + 1, actualizado = NOW(6)
+    """)
+    conn.commit()
+    cursor.close()
+
+    generacion = generacion_actual(conn)
+    log_message(f"✅ Generación de carga del DW: {generacion[0]}")
+    return generacion
+
+
+def generacion_actual(conn):
+    """
+    (generacion, actualizado) de la última recarga
+    La fecha distingue generaciones con el mismo número si se recrea la base.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT generacion, actualizado FROM etl_generacion WHERE id = 1")
+    fila = cursor.fetchone()
+    cursor.close()
+    return (fila[0], str(fila[1])) if fila else (0, None)
@@ -0,0 +1,169 @@
+"""
+Benchmark de escala del pipeline completo
+Para cada escala genera un CSV crudo sintético (generar_datos.py) y ejecuta
+las etapas 01 a 06 contra el MySQL local, cada una en su propio proceso
+(pipeline.py --only <etapa>), registrando tiempo, RSS pico y filas/s.
+
+Las etapas heredan el run de auditoría del benchmark (ETL_RUN_ID), de modo
+que sus filas procesadas se leen de etl_stage_runs.
+
+Uso:
+    python python/benchmark_escala.py --escalas 292364 5000000 50000000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import BENCHMARK_ESCALAS, BENCHMARK_DIR
+from base_datos import obtener_conexion
+from bitacora import log_message
+from errores import ErrorETL
+from auditoria import ejecucion_etl
+from generar_datos import generar_csv
+from pipeline import ETAPAS
+
+
+RESULTADOS_BENCHMARK = 'logs/benchmark_escala.json'
+
+PIPELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pipeline.py')
+
+
+def rutas_escala(directorio):
+    """Variables de entorno ETL_* que redirigen entrada y salidas a `directorio`"""
+    return {
+        'ETL_CSV_RAW_PATH': os.path.join(directorio, 'mental_health.csv'),
+        'ETL_CSV_CLEAN_PATH': os.path.join(directorio, 'mental_health_clean.csv'),
+        'ETL_CSV_EXPORT_PATH': os.path.join(directorio, 'export', 'dw_salud_mental_powerbi.csv'),
+        'ETL_PARQUET_EXPORT_DIR': os.path.join(directorio, 'export', 'parquet'),
+        'ETL_ESTRELLA_EXPORT_DIR': os.path.join(directorio, 'export', 'estrella')
+    }
+
+
+def ejecutar_etapa(etapa, entorno):
+    """
+    Ejecutar una etapa en un proceso hijo
+    os.wait4 devuelve el uso de recursos del hijo (ru_maxrss en KB en Linux).
+    """
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen([sys.executable, PIPELINE, '--only', etapa], env=entorno)
+    _, estado, uso = os.wait4(proceso.pid, 0)
+    proceso.returncode = os.waitstatus_to_exitcode(estado)
+
+    return {
+        'estado': 'ok' if proceso.returncode == 0 else 'error',
+        'duracion_s': round(time.perf_counter() - inicio, 2),
+        'rss_pico_mb': round(uso.ru_maxrss / 1024, 1)
+    }
+
+
+def filas_auditadas(id_run, etapa):
+    """(filas_entrada, filas_salida) que registró la etapa en etl_stage_runs"""
+    if id_run is None:
+        return None, None
+
+    with obtener_conexion('benchmark_escala', 'lectura', resumen=False) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT filas_entrada, filas_salida
+            FROM etl_stage_runs
+            WHERE id_run = %s AND etapa = %s
+            ORDER BY id DESC
+            LIMIT 1
+        """, (id_run, etapa))
+        fila = cursor.fetchone()
+        cursor.close()
+    return fila if fila else (None, None)
+
+
+def medir_escala(escala, etapas, directorio, semilla):
+    """Generar los datos de una escala y medir cada etapa; se detiene si una falla"""
+    log_message("\n" + "=" * 70)
+    log_message(f"ESCALA: {escala:,} filas")
+    log_message("=" * 70)
+
+    directorio = os.path.join(directorio, str(escala))
+    rutas = rutas_escala(directorio)
+    generar_csv(rutas['ETL_CSV_RAW_PATH'], escala, semilla)
+
+    resultados = []
+    with ejecucion_etl(f"benchmark_{escala}") as id_run:
+        entorno = dict(os.environ, **rutas)
+
+        for etapa in etapas:
+            log_message(f"\n--- {etapa} ({escala:,} filas) ---")
+            medicion = ejecutar_etapa(etapa, entorno)
+            entrada, salida = filas_auditadas(id_run, etapa)
+            # Sin auditoría el throughput se calcula sobre las filas generadas
+            filas = entrada or salida or escala
+
+            medicion.update({
+                'escala': escala,
+                'etapa': etapa,
+                'filas_entrada': entrada,
+                'filas_salida': salida,
+                'filas_por_seg': round(filas / medicion['duracion_s']) if medicion['duracion_s'] else None
+            })
+            resultados.append(medicion)
+
+            if medicion['estado'] != 'ok':
+                log_message(f"❌ La etapa {etapa} falló en la escala {escala:,}; se omiten las siguientes")
+                break
+
+    return resultados
+
+
+def reporte_benchmark(resultados):
+    """Mostrar y guardar los resultados"""
+    log_message("\n" + "=" * 80)
+    log_message("BENCHMARK DE ESCALA")
+    log_message("=" * 80)
+    log_message(f"{'Escala':>12} {'Etapa':<13} {'Estado':<7} {'Duración (s)':>13} "
+                f"{'Filas/s':>12} {'RSS pico (MB)':>14}")
+    log_message("-" * 80)
+
+    for r in resultados:
+        filas_por_seg = f"{r['filas_por_seg']:,}" if r['filas_por_seg'] else '-'
+        log_message(f"{r['escala']:>12,} {r['etapa']:<13} {r['estado']:<7} {r['duracion_s']:>13} "
+                    f"{filas_por_seg:>12} {r['rss_pico_mb']:>14}")
+
+    log_message("-" * 80)
+
+    os.makedirs(os.path.dirname(RESULTADOS_BENCHMARK), exist_ok=True)
+    with open(RESULTADOS_BENCHMARK, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    log_message(f"Resultados guardados en {RESULTADOS_BENCHMARK}")
+
+
+def main():
+    """Función principal"""
+    nombres = [etapa.nombre for etapa in ETAPAS]
+
+    parser = argparse.ArgumentParser(description='Benchmark del pipeline ETL a distintas escalas')
+    parser.add_argument('--escalas', type=int, nargs='+', default=BENCHMARK_ESCALAS,
+                        help='Cantidades de filas a generar y procesar')
+    parser.add_argument('--etapas', nargs='+', default=nombres, choices=nombres)
+    parser.add_argument('--directorio', default=BENCHMARK_DIR, help='Directorio de datos del benchmark')
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    etapas = [n for n in nombres if n in args.etapas]
+    resultados = []
+    for escala in args.escalas:
+        resultados.extend(medir_escala(escala, etapas, args.directorio, args.semilla))
+
+    reporte_benchmark(resultados)
+
+    if any(r['estado'] != 'ok' for r in resultados):
+        raise ErrorETL("El benchmark terminó con errores")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ErrorETL:
+        sys.exit(1)
@@ -0,0 +1,174 @@
+"""
+Bitácora compartida del ETL
+Reemplaza las copias de log_message de cada script:
+- Mensajes legibles en consola y en LOG_FILE (escritura con buffer y rotación por tamaño)
+- Registros estructurados JSON (etapa, evento, filas, duración, RSS pico) en LOG_METRICS_FILE
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import MemoryHandler, RotatingFileHandler
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows no tiene el módulo resource
+    resource = None
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import (
+    LOG_FILE, LOG_METRICS_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_BUFFER_RECORDS
+)
+
+
+def _crear_logger(nombre, ruta):
+    """Logger con buffer en memoria sobre un archivo rotativo"""
+    logger = logging.getLogger(nombre)
+
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+
+        archivo = RotatingFileHandler(
+            ruta, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+            encoding='utf-8', delay=True
+        )
+        archivo.setFormatter(logging.Formatter('%(message)s'))
+
+        # Los errores fuerzan el vaciado inmediato del buffer
+        buffer = MemoryHandler(LOG_BUFFER_RECORDS, flushLevel=logging.ERROR, target=archivo)
+
+        logger.addHandler(buffer)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+    return logger
+
+
+# Mensajes retenidos por hilo (ver agrupar_mensajes)
+_local = threading.local()
+_lock_consola = threading.Lock()
+
+
+def _emitir(log_entry, nivel):
+    print(log_entry)
+    _crear_logger('etl', LOG_FILE).log(nivel, log_entry)
+
+
+def log_message(message):
+    """Registrar mensajes en consola y en el log (con buffer)"""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    log_entry = f"[{timestamp}] {message}"
+    nivel = logging.ERROR if '❌' in message else logging.INFO
+
+    pendientes = getattr(_local, 'pendientes', None)
+    if pendientes is not None:
+        pendientes.append((log_entry, nivel))
+        return
+
+    with _lock_consola:
+        _emitir(log_entry, nivel)
+
+
+def emitir_mensajes(pendientes):
+    """Emitir de una sola vez mensajes retenidos por agrupar_mensajes"""
+    anteriores = getattr(_local, 'pendientes', None)
+    if anteriores is not None:
+        anteriores.extend(pendientes)
+        return
+
+    with _lock_consola:
+        for log_entry, nivel in pendientes:
+            _emitir(log_entry, nivel)
+
+
+@contextmanager
+def agrupar_mensajes(emitir=True):
+    """
+    Retener los mensajes del hilo actual y emitirlos juntos al salir
+    Evita que se intercalen las salidas de tareas que corren en paralelo.
+    Con emitir=False los mensajes quedan en la lista devuelta para que
+    el llamador los emita después (p. ej. en el orden de declaración).
+    """
+    anteriores = getattr(_local, 'pendientes', None)
+    _local.pendientes = []
+
+    try:
+        yield _local.pendientes
+    finally:
+        pendientes = _local.pendientes
+        _local.pendientes = anteriores
+
+        if emitir:
+            emitir_mensajes(pendientes)
+
+
+def rss_pico_mb():
+    """Memoria residente máxima del proceso en MB (None si no está disponible)"""
+    if resource is None:
+        return None
+
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB; macOS informa bytes
+    if sys.platform == 'darwin':
+        return round(maxrss / 1024 / 1024, 1)
+    return round(maxrss / 1024, 1)
+
+
+def log_evento(etapa, evento, filas=None, duracion_ms=None, **extra):
+    """Registrar un evento estructurado y su resumen legible"""
+    filas_por_seg = None
+    if filas is not None and duracion_ms:
+        filas_por_seg = round(filas / (duracion_ms / 1000), 1)
+
+    registro = {
+        'ts': datetime.now().isoformat(timespec='milliseconds'),
+        'etapa': etapa,
+        'evento': evento,
+        'filas': filas,
+        'duracion_ms': round(duracion_ms, 1) if duracion_ms is not None else None,
+        'filas_por_seg': filas_por_seg,
+        'rss_pico_mb': rss_pico_mb()
+    }
+    registro.update(extra)
+
+    _crear_logger('etl.metricas', LOG_METRICS_FILE).info(
+        json.dumps(registro, ensure_ascii=False, default=str)
+    )
+
+    partes = []
+    if filas is not None:
+        partes.append(f"{filas} filas")
+    if duracion_ms is not None:
+        partes.append(f"{duracion_ms:.0f} ms")
+    if filas_por_seg is not None:
+        partes.append(f"{filas_por_seg:,.0f} filas/s")
+    if registro['rss_pico_mb'] is not None:
+        partes.append(f"RSS pico {registro['rss_pico_mb']} MB")
+    log_message(f"📈 {etapa}/{evento}: " + ", ".join(partes))
+
+    return registro
+
+
+@contextmanager
+def medir_etapa(etapa, evento):
+    """
+    Medir un bloque y registrar su duración y throughput
+    El bloque puede informar las filas procesadas en medicion['filas'].
+    """
+    medicion = {'filas': None}
+    inicio = time.perf_counter()
+    estado = 'ok'
+
+    try:
+        yield medicion
+    except BaseException:
+        estado = 'error'
+        raise
+    finally:
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        log_evento(etapa, evento, filas=medicion['filas'], duracion_ms=duracion_ms, estado=estado)
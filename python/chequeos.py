@@ -0,0 +1,124 @@
+"""
+Compilador de chequeos de validación
+Cada chequeo se declara como un predicado SQL que identifica las filas que
+fallan; los chequeos de una misma tabla se compilan en una sola consulta
+
+    SELECT COUNT(*), SUM(CASE WHEN <chequeo 1> THEN 1 ELSE 0 END), ...
+    FROM <tabla>
+
+de modo que la tabla se recorre una vez en lugar de una vez por chequeo.
+
+Los huérfanos de la tabla de hechos se cuentan del mismo modo: las claves
+de cada dimensión (tablas chicas) se leen primero y se comparan contra la
+tabla de hechos en un único recorrido, en lugar de un anti-join por
+dimensión.
+"""
+
+from collections import namedtuple
+
+from indicadores import CLAVES_DIMENSIONES, columnas_indicadores, condicion_fuera_de_rango
+
+
+TABLA_HECHOS = 'Hechos_Estres_SaludMental'
+
+# nombre: clave del resultado; condicion: predicado SQL de las filas que fallan
+Chequeo = namedtuple('Chequeo', 'nombre condicion')
+
+# Claves consecutivas a partir de las cuales se usa BETWEEN en lugar de IN
+MIN_TRAMO = 3
+
+
+def chequeos_rango(tipo=None):
+    """Un chequeo por indicador con su condición de fuera de rango"""
+    return [Chequeo(col, condicion_fuera_de_rango(col)) for col in columnas_indicadores(tipo)]
+
+
+def chequeos_nulos(columnas):
+    """Un chequeo por columna que no debe tener NULL"""
+    return [Chequeo(col, f"{col} IS NULL") for col in columnas]
+
+
+def compilar_chequeos(tabla, chequeos, where=None, extra=()):
+    """
+    SQL de un solo recorrido: COUNT(*) y una suma condicional por chequeo
+    `extra`: expresiones que se agregan antes del COUNT(*) (p. ej. MAX(id))
+    """
+    columnas = list(extra) + ["COUNT(*)"] + [
+        f"SUM(CASE WHEN {chequeo.condicion} THEN 1 ELSE 0 END)" for chequeo in chequeos
+    ]
+    separador = ",\n        "
+    return f"""
+    SELECT
+        {separador.join(columnas)}
+    FROM {tabla}
+    {f'WHERE {where}' if where else ''}
+    """
+
+
+def ejecutar_chequeos(conn, tabla, chequeos, where=None, params=None):
+    """
+    Ejecutar los chequeos de una tabla en una sola consulta
+    Devuelve (filas recorridas, {nombre del chequeo: filas que fallan}).
+    """
+    cursor = conn.cursor()
+    cursor.execute(compilar_chequeos(tabla, chequeos, where), params)
+    fila = cursor.fetchone()
+    cursor.close()
+
+    # SUM sobre una tabla vacía es NULL; MySQL devuelve DECIMAL
+    total, *fallas = (int(valor or 0) for valor in fila)
+    return total, {chequeo.nombre: falla for chequeo, falla in zip(chequeos, fallas)}
+
+
+def condicion_fuera_de_claves(expresion, claves):
+    """
+    Predicado de `expresion` NULL o fuera del conjunto de claves
+    Los tramos de claves consecutivas (AUTO_INCREMENT) se expresan con BETWEEN
+    y el resto con IN, para que el predicado sea corto aunque haya muchas claves.
+    """
+    claves = sorted(set(claves))
+    if not claves:
+        return "1 = 1"
+
+    tramos = []
+    sueltas = []
+    inicio = anterior = claves[0]
+    for clave in claves[1:] + [None]:
+        if clave is not None and clave == anterior + 1:
+            anterior = clave
+            continue
+        if anterior - inicio + 1 >= MIN_TRAMO:
+            tramos.append(f"{expresion} BETWEEN {inicio} AND {anterior}")
+        else:
+            sueltas.extend(range(inicio, anterior + 1))
+        if clave is not None:
+            inicio = anterior = clave
+
+    if sueltas:
+        tramos.append(f"{expresion} IN ({', '.join(str(c) for c in sueltas)})")
+    return f"({expresion} IS NULL OR NOT ({' OR '.join(tramos)}))"
+
+
+def cargar_claves(conn, dimensiones=CLAVES_DIMENSIONES):
+    """{clave foránea: claves existentes en su dimensión}"""
+    cursor = conn.cursor()
+    claves = {}
+    for fk, dimension in dimensiones:
+        cursor.execute(f"SELECT {fk} FROM {dimension}")
+        claves[fk] = [fila[0] for fila in cursor.fetchall()]
+    cursor.close()
+    return claves
+
+
+def chequeos_huerfanos(conn, dimensiones=CLAVES_DIMENSIONES):
+    """Un chequeo por clave foránea con las claves actuales de su dimensión"""
+    claves = cargar_claves(conn, dimensiones)
+    return [Chequeo(fk, condicion_fuera_de_claves(fk, claves[fk])) for fk, _ in dimensiones]
+
+
+def contar_huerfanos(conn, dimensiones=CLAVES_DIMENSIONES, where=None, params=None):
+    """
+    Huérfanos de cada clave foránea de la tabla de hechos en un solo recorrido
+    Devuelve (hechos recorridos, {clave foránea: hechos huérfanos}).
+    """
+    return ejecutar_chequeos(conn, TABLA_HECHOS, chequeos_huerfanos(conn, dimensiones), where, params)
@@ -0,0 +1,130 @@
+"""
+Códigos de las respuestas categóricas de staging
+config/codigos.json asigna a cada valor de cada columna un entero pequeño
+(su posición en la lista, desde 1). Staging guarda esos códigos en columnas
+TINYINT UNSIGNED en lugar de VARCHAR utf8mb4: la tabla ocupa una fracción
+y la carga de hechos agrupa y compara enteros (claves de las dimensiones y
+predicados de los indicadores).
+
+Versionado: un valor nuevo se agrega al final de su lista (un código nunca
+cambia de significado) y cada cambio incrementa "version". 02_cargar_staging.py
+replica el archivo en la tabla codigos_staging para decodificar en SQL.
+
+Los códigos son también las claves de las dimensiones (03_cargar_dimensiones.py):
+las estáticas usan el código de su valor y Dim_Sintomas / Dim_Acceso los
+códigos de sus atributos empaquetados en BITS_EMPAQUETADO bits cada uno.
+"""
+
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import CODIGOS_PATH
+from errores import ErrorETL
+from bitacora import log_message
+
+
+# Mayor código que cabe en TINYINT UNSIGNED
+CODIGO_MAXIMO = 255
+
+# Bits de cada código en una clave empaquetada (columnas de hasta 7 valores)
+BITS_EMPAQUETADO = 3
+
+
+def cargar_tabla_codigos(ruta=CODIGOS_PATH):
+    """(version, {columna: [valores en orden de código]}) del archivo de códigos"""
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            tabla = json.load(f)
+    except (OSError, ValueError) as e:
+        log_message(f"❌ ERROR: no se pudo leer la tabla de códigos {ruta}: {e}")
+        raise ErrorETL(f"Tabla de códigos inválida: {e}") from e
+
+    for columna, valores in tabla['columnas'].items():
+        if len(set(valores)) != len(valores) or len(valores) > CODIGO_MAXIMO:
+            log_message(f"❌ ERROR: {columna} tiene valores repetidos o más de {CODIGO_MAXIMO} códigos")
+            raise ErrorETL(f"Tabla de códigos inválida: {columna}")
+
+    return tabla['version'], tabla['columnas']
+
+
+VERSION_CODIGOS, VALORES = cargar_tabla_codigos()
+
+# {columna: {valor: código}}
+CODIGOS = {
+    columna: {valor: codigo for codigo, valor in enumerate(valores, 1)}
+    for columna, valores in VALORES.items()
+}
+
+
+def codificar(columna, valores):
+    """Códigos de una secuencia de valores de una columna"""
+    try:
+        return tuple(CODIGOS[columna][valor] for valor in valores)
+    except KeyError as e:
+        raise ErrorETL(f"Sin código para {columna} = {e}") from e
+
+
+def decodificar(columna, codigo):
+    """Valor de un código (None si es NULL o desconocido)"""
+    if codigo is None or columna not in CODIGOS:
+        return codigo
+    valores = VALORES[columna]
+    return valores[codigo - 1] if 1 <= codigo <= len(valores) else None
+
+
+def codificar_serie(serie):
+    """Serie de pandas con los códigos de su columna (Int64; NA si no tiene código)"""
+    return serie.map(CODIGOS[serie.name]).astype('Int64')
+
+
+def expresion_codificar_sql(columna, expresion=None):
+    """CASE que traduce un valor de texto a su código (NULL si no tiene)"""
+    expresion = expresion or columna
+    casos = ' '.join(
+        f"WHEN '{valor.replace(chr(39), chr(39) * 2)}' THEN {codigo}"
+        for valor, codigo in CODIGOS[columna].items()
+    )
+    return f"CASE {expresion} {casos} END"
+
+
+def _verificar_empaquetables(columnas):
+    maximo = 2 ** BITS_EMPAQUETADO - 1
+    for columna in columnas:
+        if len(VALORES[columna]) > maximo:
+            log_message(f"❌ ERROR: {columna} tiene más de {maximo} códigos y no cabe en una clave empaquetada")
+            raise ErrorETL(f"Códigos de {columna} no empaquetables")
+
+
+def empaquetar(columnas, codigos):
+    """Clave entera de una combinación de códigos (BITS_EMPAQUETADO bits por columna)"""
+    _verificar_empaquetables(columnas)
+    clave = 0
+    for codigo in codigos:
+        clave = (clave << BITS_EMPAQUETADO) | codigo
+    return clave
+
+
+def expresion_empaquetar_sql(columnas, alias='s'):
+    """La misma clave de empaquetar() calculada en SQL sobre las columnas de staging"""
+    _verificar_empaquetables(columnas)
+    factor = 2 ** BITS_EMPAQUETADO
+    terminos = [
+        f"CAST({alias}.{columna} AS UNSIGNED) * {factor ** exponente}" if exponente else f"{alias}.{columna}"
+        for exponente, columna in zip(range(len(columnas) - 1, -1, -1), columnas)
+    ]
+    return f"({' + '.join(terminos)})"
+
+
+def sincronizar_tabla_codigos(conn):
+    """Reemplazar el contenido de codigos_staging por el del archivo"""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM codigos_staging")
+    cursor.executemany(
+        "INSERT INTO codigos_staging (columna, codigo, valor, version) VALUES (%s, %s, %s, %s)",
+        [(columna, codigo, valor, VERSION_CODIGOS)
+         for columna, codigos in CODIGOS.items() for valor, codigo in codigos.items()]
+    )
+    conn.commit()
+    cursor.close()
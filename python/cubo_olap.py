@@ -0,0 +1,374 @@
+"""
+Cubo OLAP en memoria sobre el modelo estrella
+Carga una sola vez Hechos_Estres_SaludMental en arreglos NumPy por columna:
+- Por cada dimensión, el código denso de cada hecho (posición de la fila
+  de la dimensión, en el tipo entero más chico que alcanza)
+- Por cada atributo de dimensión (region, trimestre, categoria, ...), un
+  arreglo de mapeo fila de dimensión -> código de valor y los valores
+- Las 16 medidas como float32 (0 donde son NULL, con su máscara de válidos)
+
+Filtrar, agrupar y hacer rollup no vuelve a MySQL: los filtros se resuelven
+sobre las dimensiones (pocas filas) y se proyectan a los hechos con un
+gather; la agrupación es un np.bincount sobre el índice lineal de los
+códigos de grupo. Como en la API, las cantidades se suman y los porcentajes
+se promedian (suma y cantidad de no nulos son aditivas: el rollup es exacto).
+
+El cubo se guarda en un .npz (CUBO_OLAP_PATH) junto con la generación de
+carga del DW; cubo_vigente() lo recarga del archivo mientras la generación
+no cambie y lo reconstruye en caso contrario.
+
+Uso:
+    python python/cubo_olap.py --agrupar region anio --filtro genero=Female
+    python python/cubo_olap.py --agrupar anio trimestre mes --rollup
+    python python/cubo_olap.py --construir
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import CUBO_OLAP_PATH, EXPORT_CHUNK_SIZE
+from base_datos import obtener_conexion, generacion_actual
+from bitacora import log_message
+from errores import ErrorETL
+from indicadores import CLAVES_DIMENSIONES, columnas_indicadores
+
+
+TABLA_HECHOS = 'Hechos_Estres_SaludMental'
+
+# Texto libre: no sirve para agrupar ni filtrar
+COLUMNAS_EXCLUIDAS = {'descripcion'}
+
+
+def _tipo_codigo(cardinalidad):
+    """Tipo entero sin signo más chico que representa códigos 0..cardinalidad-1"""
+    return np.min_scalar_type(max(cardinalidad - 1, 0))
+
+
+def _codificar(valores):
+    """Valores de una columna -> (valores distintos ordenados, código de cada valor)"""
+    if any(isinstance(v, str) for v in valores):
+        valores = ['' if v is None else v for v in valores]
+    elif any(isinstance(v, bool) for v in valores):
+        # BOOLEAN llega como 0/1 desde MySQL y como bool desde DuckDB
+        valores = [int(v) for v in valores]
+
+    distintos, codigos = np.unique(np.asarray(valores), return_inverse=True)
+    return distintos, codigos.astype(_tipo_codigo(len(distintos)))
+
+
+class CuboOLAP:
+    """Hechos codificados por dimensión con medidas aditivas"""
+
+    def __init__(self, codigos, atributos, medidas, validos, generacion):
+        self.codigos = codigos        # clave foránea -> código de dimensión por hecho
+        self.atributos = atributos    # atributo -> (clave foránea, mapa, valores)
+        self.medidas = medidas        # indicador -> float32 por hecho (0 si NULL)
+        self.validos = validos        # indicador -> bool por hecho (solo si tiene NULL)
+        self.generacion = generacion
+        self.filas = len(next(iter(codigos.values()))) if codigos else 0
+
+    # ============================================
+    # CONSTRUCCIÓN Y PERSISTENCIA
+    # ============================================
+
+    @classmethod
+    def desde_dw(cls, conn):
+        """Leer dimensiones y hechos del DW y codificarlos"""
+        cursor = conn.cursor()
+        ids_dimension = {}
+        atributos = {}
+
+        for fk, tabla in CLAVES_DIMENSIONES:
+            cursor.execute(f"SELECT * FROM {tabla} ORDER BY {fk}")
+            columnas = list(cursor.column_names)
+            filas = cursor.fetchall()
+            ids_dimension[fk] = np.array([fila[columnas.index(fk)] for fila in filas], dtype=np.int64)
+
+            for i, columna in enumerate(columnas):
+                if columna == fk or columna in COLUMNAS_EXCLUIDAS:
+                    continue
+                if columna in atributos:
+                    log_message(f"❌ ERROR: El atributo {columna} está en {tabla} y en otra dimensión")
+                    raise ErrorETL(f"Atributo {columna} repetido en {tabla} y otra dimensión")
+                valores, mapa = _codificar([fila[i] for fila in filas])
+                atributos[columna] = (fk, mapa, valores)
+
+        claves = [fk for fk, _ in CLAVES_DIMENSIONES]
+        indicadores = columnas_indicadores()
+        cursor.execute(f"SELECT {', '.join(claves + indicadores)} FROM {TABLA_HECHOS}")
+
+        # Lotes como float64: DECIMAL se convierte y NULL queda NaN
+        lotes = []
+        while True:
+            lote = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not lote:
+                break
+            lotes.append(np.array(lote, dtype=np.float64))
+        cursor.close()
+
+        datos = np.concatenate(lotes) if lotes else np.empty((0, len(claves) + len(indicadores)))
+
+        codigos = {}
+        for j, fk in enumerate(claves):
+            ids = ids_dimension[fk]
+            claves_hechos = datos[:, j].astype(np.int64)
+            posiciones = np.searchsorted(ids, claves_hechos)
+            encontradas = posiciones < len(ids)
+            encontradas[encontradas] = ids[posiciones[encontradas]] == claves_hechos[encontradas]
+            if not encontradas.all():
+                log_message(f"❌ ERROR: {(~encontradas).sum()} hechos con {fk} sin fila en la dimensión")
+                log_message("Ejecuta 05_validar_dw.py para revisar la integridad referencial")
+                raise ErrorETL(f"{(~encontradas).sum()} hechos con {fk} sin fila en la dimensión")
+            codigos[fk] = posiciones.astype(_tipo_codigo(len(ids)))
+
+        medidas = {}
+        validos = {}
+        for j, columna in enumerate(indicadores, start=len(claves)):
+            valores = datos[:, j]
+            nulos = np.isnan(valores)
+            if nulos.any():
+                validos[columna] = ~nulos
+            medidas[columna] = np.where(nulos, 0, valores).astype(np.float32)
+
+        return cls(codigos, atributos, medidas, validos, generacion_actual(conn))
+
+    def guardar(self, ruta=CUBO_OLAP_PATH):
+        """Persistir el cubo en un .npz sin comprimir (la carga es casi una copia de memoria)"""
+        arreglos = {f'codigo__{fk}': codigos for fk, codigos in self.codigos.items()}
+        for nombre, (_, mapa, valores) in self.atributos.items():
+            arreglos[f'mapa__{nombre}'] = mapa
+            arreglos[f'valores__{nombre}'] = valores
+        for columna, valores in self.medidas.items():
+            arreglos[f'medida__{columna}'] = valores
+        for columna, validos in self.validos.items():
+            arreglos[f'validos__{columna}'] = validos
+
+        meta = {
+            'generacion': list(self.generacion),
+            'atributos': {nombre: fk for nombre, (fk, _, _) in self.atributos.items()}
+        }
+        arreglos['meta'] = np.array(json.dumps(meta))
+
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        temporal = ruta + '.tmp.npz'
+        np.savez(temporal, **arreglos)
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta=CUBO_OLAP_PATH):
+        """Reconstruir el cubo desde un .npz guardado con guardar()"""
+        with np.load(ruta, allow_pickle=False) as archivo:
+            meta = json.loads(str(archivo['meta']))
+            arreglos = {nombre: archivo[nombre] for nombre in archivo.files if nombre != 'meta'}
+
+        def con_prefijo(prefijo):
+            return {nombre[len(prefijo):]: arreglo
+                    for nombre, arreglo in arreglos.items() if nombre.startswith(prefijo)}
+
+        codigos = {fk: con_prefijo('codigo__')[fk] for fk, _ in CLAVES_DIMENSIONES}
+        mapas = con_prefijo('mapa__')
+        valores = con_prefijo('valores__')
+        atributos = {nombre: (fk, mapas[nombre], valores[nombre])
+                     for nombre, fk in meta['atributos'].items()}
+
+        return cls(codigos, atributos, con_prefijo('medida__'), con_prefijo('validos__'),
+                   tuple(meta['generacion']))
+
+    # ============================================
+    # CONSULTAS
+    # ============================================
+
+    def _atributo(self, nombre):
+        if nombre not in self.atributos:
+            log_message(f"❌ ERROR: Atributo desconocido: {nombre}")
+            log_message(f"Disponibles: {', '.join(sorted(self.atributos))}")
+            raise ErrorETL(f"Atributo desconocido: {nombre}")
+        return self.atributos[nombre]
+
+    def _mascara(self, filtros):
+        """
+        Hechos que cumplen los filtros {atributo: valor o lista de valores}
+        Cada filtro se evalúa sobre las filas de la dimensión y se proyecta
+        a los hechos con el código de dimensión. None si no hay filtros.
+        """
+        mascara = None
+        for nombre, aceptados in (filtros or {}).items():
+            fk, mapa, valores = self._atributo(nombre)
+            if not isinstance(aceptados, (list, tuple, set)):
+                aceptados = [aceptados]
+            aceptados = np.asarray(list(aceptados)).astype(valores.dtype)
+
+            filas_dimension = np.isin(valores, aceptados)[mapa]
+            condicion = filas_dimension[self.codigos[fk]]
+            mascara = condicion if mascara is None else mascara & condicion
+        return mascara
+
+    def _agregar(self, agrupar, filtros, medidas):
+        """
+        Arreglos densos con forma (cardinalidad de cada atributo de agrupar)
+        Devuelve (conteos, sumas, no_nulos); sumas y no_nulos por medida.
+        """
+        forma = tuple(len(self._atributo(nombre)[2]) for nombre in agrupar)
+        celdas = int(np.prod(forma, dtype=np.int64))
+
+        lineal = np.zeros(self.filas, dtype=np.int64)
+        for nombre, cardinalidad in zip(agrupar, forma):
+            fk, mapa, _ = self.atributos[nombre]
+            lineal *= cardinalidad
+            lineal += mapa[self.codigos[fk]]
+
+        # Los hechos filtrados van a una celda extra que se descarta
+        mascara = self._mascara(filtros)
+        if mascara is not None:
+            lineal[~mascara] = celdas
+
+        def contar(pesos=None):
+            return np.bincount(lineal, weights=pesos, minlength=celdas + 1)[:celdas].reshape(forma)
+
+        conteos = contar()
+        sumas = {}
+        no_nulos = {}
+        for columna in medidas:
+            sumas[columna] = contar(self.medidas[columna])
+            no_nulos[columna] = contar(self.validos[columna]) if columna in self.validos else conteos
+        return conteos, sumas, no_nulos
+
+    def _medidas(self, medidas):
+        validas = columnas_indicadores()
+        medidas = list(medidas or validas)
+        invalidas = [m for m in medidas if m not in validas]
+        if invalidas:
+            log_message(f"❌ ERROR: Indicadores desconocidos: {', '.join(invalidas)}")
+            raise ErrorETL(f"Indicadores desconocidos: {', '.join(invalidas)}")
+        return medidas
+
+    def _filas(self, agrupar, conteos, sumas, no_nulos, medidas, nivel=None):
+        """Celdas no vacías como dicts (las columnas fuera del nivel van en None)"""
+        cantidades = set(columnas_indicadores('cantidad'))
+        valores = [self.atributos[nombre][2] for nombre in agrupar]
+
+        filas = []
+        for indice in map(tuple, np.argwhere(conteos)):
+            fila = {nombre: valores[i][indice[i]].item() for i, nombre in enumerate(agrupar)}
+            if nivel is not None:
+                fila.update({nombre: None for nombre in nivel})
+            fila['hechos'] = int(conteos[indice])
+
+            for columna in medidas:
+                if columna in cantidades:
+                    fila[columna] = int(round(float(sumas[columna][indice])))
+                else:
+                    n = no_nulos[columna][indice]
+                    fila[columna] = round(float(sumas[columna][indice] / n), 2) if n else None
+            filas.append(fila)
+        return filas
+
+    def consultar(self, agrupar=(), filtros=None, medidas=None):
+        """Indicadores agrupados por los atributos de `agrupar` (una fila por grupo no vacío)"""
+        agrupar = tuple(agrupar)
+        medidas = self._medidas(medidas)
+        conteos, sumas, no_nulos = self._agregar(agrupar, filtros, medidas)
+        return self._filas(agrupar, conteos, sumas, no_nulos, medidas)
+
+    def rollup(self, jerarquia, filtros=None, medidas=None):
+        """
+        Como GROUP BY ... WITH ROLLUP: el nivel más fino y cada subtotal
+        quitando atributos desde el final, hasta el total general
+        Los subtotales se obtienen sumando ejes del arreglo del nivel más fino.
+        """
+        jerarquia = tuple(jerarquia)
+        medidas = self._medidas(medidas)
+        conteos, sumas, no_nulos = self._agregar(jerarquia, filtros, medidas)
+
+        filas = []
+        for profundidad in range(len(jerarquia), -1, -1):
+            ejes = tuple(range(profundidad, len(jerarquia)))
+            filas.extend(self._filas(
+                jerarquia[:profundidad],
+                conteos.sum(axis=ejes),
+                {c: s.sum(axis=ejes) for c, s in sumas.items()},
+                {c: n.sum(axis=ejes) for c, n in no_nulos.items()},
+                medidas,
+                nivel=jerarquia[profundidad:]
+            ))
+        return filas
+
+
+def cubo_vigente(ruta=CUBO_OLAP_PATH, reconstruir=False):
+    """
+    Cubo de la generación de carga actual
+    Se recarga del .npz si su generación coincide con la del DW; si no
+    (o con reconstruir=True) se construye desde el DW y se guarda.
+    """
+    with obtener_conexion('cubo_olap', 'lectura', resumen=False) as conn:
+        generacion = generacion_actual(conn)
+
+        if not reconstruir and os.path.exists(ruta):
+            inicio = time.perf_counter()
+            cubo = CuboOLAP.cargar(ruta)
+            if cubo.generacion == generacion:
+                log_message(f"♻️ Cubo cargado de {ruta} ({cubo.filas} hechos, "
+                            f"{(time.perf_counter() - inicio) * 1000:.1f} ms)")
+                return cubo
+            log_message(f"Cubo de la generación {cubo.generacion[0]}; DW en la {generacion[0]}: se reconstruye")
+
+        inicio = time.perf_counter()
+        cubo = CuboOLAP.desde_dw(conn)
+
+    cubo.guardar(ruta)
+    log_message(f"✅ Cubo construido desde el DW: {cubo.filas} hechos, {len(cubo.atributos)} atributos "
+                f"({time.perf_counter() - inicio:.2f} s) → {ruta}")
+    return cubo
+
+
+def _valor_filtro(texto):
+    """'2014' -> 2014; 'Brazil,Chile' -> ['Brazil', 'Chile']"""
+    valores = [int(v) if v.lstrip('-').isdigit() else v for v in texto.split(',')]
+    return valores if len(valores) > 1 else valores[0]
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description='Cubo OLAP en memoria del DW de salud mental')
+    parser.add_argument('--agrupar', nargs='*', default=[], help='Atributos de agrupación (p. ej. region anio)')
+    parser.add_argument('--filtro', action='append', default=[], metavar='ATRIBUTO=VALOR[,VALOR]')
+    parser.add_argument('--indicadores', nargs='+', help='Indicadores a calcular (por defecto todos)')
+    parser.add_argument('--rollup', action='store_true', help='Agregar subtotales por nivel de --agrupar')
+    parser.add_argument('--construir', action='store_true', help='Reconstruir el cubo desde el DW')
+    parser.add_argument('--ruta', default=CUBO_OLAP_PATH)
+    args = parser.parse_args()
+
+    filtros = {}
+    for filtro in args.filtro:
+        nombre, separador, valor = filtro.partition('=')
+        if not separador:
+            parser.error(f"Filtro inválido: {filtro} (se espera atributo=valor)")
+        filtros[nombre] = _valor_filtro(valor)
+
+    cubo = cubo_vigente(args.ruta, reconstruir=args.construir)
+    if args.construir and not args.agrupar and not filtros:
+        return
+
+    inicio = time.perf_counter()
+    if args.rollup:
+        filas = cubo.rollup(args.agrupar, filtros, args.indicadores)
+    else:
+        filas = cubo.consultar(args.agrupar, filtros, args.indicadores)
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+
+    for fila in filas:
+        log_message(json.dumps(fila, ensure_ascii=False))
+    log_message(f"📈 {len(filas)} filas en {duracion_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ErrorETL:
+        sys.exit(1)
@@ -0,0 +1,13 @@
+"""
+Excepciones compartidas del ETL
+"""
+
+
+class ErrorETL(Exception):
+    """
+    Error que detiene una etapa del ETL
+    Los scripts la lanzan en lugar de terminar el proceso con sys.exit(1),
+    para que el orquestador pueda registrar la falla y no ejecutar las
+    etapas dependientes. Ejecutados de forma independiente, el bloque
+    __main__ la convierte en código de salida 1.
+    """
@@ -0,0 +1,219 @@
+"""
+Generador de datos sintéticos con el esquema crudo de mental_health.csv
+(17 columnas) para probar el pipeline a otras escalas.
+
+- Si existe el CSV real, remuestrea sus filas completas (bootstrap): conserva
+  las distribuciones marginales (sesgo por país, proporción de género, mezcla
+  de Days_Indoors) y las correlaciones entre columnas. El día y la hora del
+  Timestamp se sortean dentro del mes de la fila original; si no, a gran
+  escala casi todas las filas serían copias que la limpieza elimina.
+- Si no existe, usa las marginales aproximadas de MARGINALES, muestreadas de
+  forma independiente (sin correlaciones).
+- Inyecta una proporción configurable de duplicados exactos, valores vacíos
+  e inválidos (los mismos casos que descarta 01_limpiar_datos.py).
+
+Uso:
+    python python/generar_datos.py --filas 5000000 --salida data/benchmark/5000000/mental_health.csv
+"""
+
+from collections import deque
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import (
+    CSV_RAW_PATH, SINTETICOS_DUPLICADOS, SINTETICOS_NULOS, SINTETICOS_INVALIDOS
+)
+from bitacora import log_message
+from errores import ErrorETL
+
+
+COLUMNAS = [
+    'Timestamp', 'Gender', 'Country', 'Occupation', 'self_employed',
+    'family_history', 'treatment', 'Days_Indoors', 'Growing_Stress',
+    'Changes_Habits', 'Mental_Health_History', 'Mood_Swings',
+    'Coping_Struggles', 'Work_Interest', 'Social_Weakness',
+    'mental_health_interview', 'care_options'
+]
+
+# Marginales aproximadas del archivo real: columna -> [(valor, peso)]
+MARGINALES = {
+    'Gender': [('Male', 82), ('Female', 18)],
+    'Country': [
+        ('United States', 59), ('United Kingdom', 17), ('Canada', 6), ('Australia', 2),
+        ('Netherlands', 2), ('Ireland', 2), ('Germany', 2), ('Sweden', 1), ('India', 1),
+        ('France', 1), ('Brazil', 1), ('South Africa', 1), ('New Zealand', 1),
+        ('Switzerland', 1), ('Israel', 1), ('Italy', 1), ('Belgium', 1)
+    ],
+    'Occupation': [('Housewife', 22), ('Student', 21), ('Corporate', 20),
+                   ('Others', 19), ('Business', 18)],
+    'self_employed': [('No', 88), ('Yes', 10), ('', 2)],
+    'family_history': [('No', 60), ('Yes', 40)],
+    'treatment': [('Yes', 50), ('No', 50)],
+    'Days_Indoors': [('1-14 days', 22), ('Go out Every day', 21), ('More than 2 months', 20),
+                     ('15-30 days', 19), ('31-60 days', 18)],
+    'Growing_Stress': [('Maybe', 34), ('Yes', 34), ('No', 32)],
+    'Changes_Habits': [('Yes', 38), ('Maybe', 32), ('No', 30)],
+    'Mental_Health_History': [('No', 36), ('Maybe', 33), ('Yes', 31)],
+    'Mood_Swings': [('Medium', 35), ('Low', 33), ('High', 32)],
+    'Coping_Struggles': [('No', 53), ('Yes', 47)],
+    'Work_Interest': [('No', 39), ('Maybe', 34), ('Yes', 27)],
+    'Social_Weakness': [('Maybe', 35), ('No', 33), ('Yes', 32)],
+    'mental_health_interview': [('No', 79), ('Maybe', 17), ('Yes', 4)],
+    'care_options': [('No', 40), ('Yes', 34), ('Not sure', 26)]
+}
+
+# Períodos de Timestamp (M/D/YYYY) cuando no hay archivo real
+PERIODOS = [(2014, mes, 70) for mes in range(8, 13)] + [(2015, mes, 3) for mes in range(1, 13)] \
+    + [(2016, mes, 1) for mes in (1, 2)]
+
+# Valores que 01_limpiar_datos.py descarta
+VALORES_INVALIDOS = {
+    'Gender': ['Unknown', 'Other', 'N/A'],
+    'Days_Indoors': ['Never', 'Sometimes', '0 days']
+}
+
+# Filas recientes entre las que se eligen los duplicados
+VENTANA_DUPLICADOS = 10000
+
+FILAS_POR_BLOQUE = 50000
+
+
+def cargar_filas_reales(ruta):
+    """Filas del CSV real (tuplas de 17 valores) o None si no existe"""
+    if not os.path.exists(ruta):
+        return None
+
+    with open(ruta, newline='', encoding='utf-8') as f:
+        lector = csv.reader(f)
+        encabezado = next(lector)
+        if encabezado != COLUMNAS:
+            raise ErrorETL(f"{ruta} no tiene el esquema esperado de {len(COLUMNAS)} columnas")
+        # sys.intern: las filas repiten pocos valores distintos
+        return [tuple(sys.intern(v) for v in fila) for fila in lector]
+
+
+def timestamp_aleatorio(rng, anio, mes):
+    """Timestamp M/D/YYYY H:MM con día y hora al azar dentro del mes"""
+    return f"{mes}/{rng.randint(1, 28)}/{anio} {rng.randint(0, 23)}:{rng.randint(0, 59):02d}"
+
+
+def remuestrear(rng, reales, cantidad):
+    """Filas reales al azar con el Timestamp redistribuido dentro de su mes"""
+    bloque = []
+    for fila in rng.choices(reales, k=cantidad):
+        fecha = fila[0].split(' ', 1)[0].split('/')
+        if len(fecha) == 3:
+            fila = (timestamp_aleatorio(rng, fecha[2], fecha[0]),) + fila[1:]
+        bloque.append(fila)
+    return bloque
+
+
+def muestrear_marginales(rng, cantidad):
+    """Filas con cada columna muestreada de forma independiente"""
+    periodos = rng.choices(PERIODOS, weights=[p[2] for p in PERIODOS], k=cantidad)
+    columnas = [[timestamp_aleatorio(rng, anio, mes) for anio, mes, _ in periodos]]
+    for columna in COLUMNAS[1:]:
+        valores, pesos = zip(*MARGINALES[columna])
+        columnas.append(rng.choices(valores, weights=pesos, k=cantidad))
+    return list(zip(*columnas))
+
+
+def alterar(rng, fila, nulos, invalidos):
+    """Vaciar una columna o poner un valor inválido en una fila (según las proporciones)"""
+    azar = rng.random()
+    if azar < nulos:
+        fila = list(fila)
+        fila[rng.randrange(len(COLUMNAS))] = ''
+        return fila, 'nulo'
+    if azar < nulos + invalidos:
+        columna = rng.choice(list(VALORES_INVALIDOS))
+        fila = list(fila)
+        fila[COLUMNAS.index(columna)] = rng.choice(VALORES_INVALIDOS[columna])
+        return fila, 'invalido'
+    return fila, None
+
+
+def generar_csv(ruta, filas, semilla=42, duplicados=SINTETICOS_DUPLICADOS,
+                nulos=SINTETICOS_NULOS, invalidos=SINTETICOS_INVALIDOS, origen=CSV_RAW_PATH):
+    """
+    Escribir un CSV crudo sintético de `filas` filas
+    Devuelve un dict con las filas escritas y las alteradas por tipo.
+    """
+    rng = random.Random(semilla)
+    reales = cargar_filas_reales(origen)
+
+    if reales:
+        log_message(f"Remuestreando {len(reales)} filas reales de {origen}")
+    else:
+        log_message(f"⚠️ No se encontró {origen}: se usan marginales aproximadas (sin correlaciones)")
+
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    conteo = {'filas': 0, 'duplicados': 0, 'nulo': 0, 'invalido': 0}
+    recientes = deque(maxlen=VENTANA_DUPLICADOS)
+    inicio = time.perf_counter()
+
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(COLUMNAS)
+
+        while conteo['filas'] < filas:
+            cantidad = min(FILAS_POR_BLOQUE, filas - conteo['filas'])
+            if reales:
+                bloque = remuestrear(rng, reales, cantidad)
+            else:
+                bloque = muestrear_marginales(rng, cantidad)
+
+            salida = []
+            for fila in bloque:
+                if recientes and rng.random() < duplicados:
+                    salida.append(rng.choice(recientes))
+                    conteo['duplicados'] += 1
+                    continue
+
+                fila, alteracion = alterar(rng, fila, nulos, invalidos)
+                if alteracion:
+                    conteo[alteracion] += 1
+                recientes.append(fila)
+                salida.append(fila)
+
+            escritor.writerows(salida)
+            conteo['filas'] += cantidad
+
+            if conteo['filas'] % (FILAS_POR_BLOQUE * 20) == 0:
+                log_message(f"  Generadas: {conteo['filas']}/{filas}")
+
+    duracion = time.perf_counter() - inicio
+    log_message(f"✅ CSV sintético generado: {ruta}")
+    log_message(f"  {conteo['filas']} filas en {duracion:.1f} s "
+                f"({conteo['filas'] / duracion if duracion else 0:,.0f} filas/s)")
+    log_message(f"  Duplicados: {conteo['duplicados']}, con NULL: {conteo['nulo']}, "
+                f"inválidos: {conteo['invalido']}")
+    return conteo
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description='Generar un CSV crudo sintético con el esquema de mental_health.csv')
+    parser.add_argument('--filas', type=int, required=True, help='Cantidad de filas a generar')
+    parser.add_argument('--salida', required=True, help='Ruta del CSV a escribir')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--duplicados', type=float, default=SINTETICOS_DUPLICADOS)
+    parser.add_argument('--nulos', type=float, default=SINTETICOS_NULOS)
+    parser.add_argument('--invalidos', type=float, default=SINTETICOS_INVALIDOS)
+    parser.add_argument('--origen', default=CSV_RAW_PATH, help='CSV real a remuestrear')
+    args = parser.parse_args()
+
+    generar_csv(args.salida, args.filas, args.semilla, args.duplicados,
+                args.nulos, args.invalidos, args.origen)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ErrorETL:
+        sys.exit(1)
@@ -0,0 +1,308 @@
+"""
+Registro de indicadores del Data Warehouse
+Cada indicador se define una sola vez como numerador/denominador sobre
+predicados; a partir de este registro se generan el SQL de carga de hechos,
+las validaciones de rango y la proyección de exportación.
+Los predicados se escriben con los valores de la encuesta y se comparan
+contra los códigos enteros de staging (codigos.py).
+"""
+
+from collections import namedtuple
+
+from codigos import CODIGOS, codificar, empaquetar, expresion_empaquetar_sql
+
+
+# ============================================
+# CLAVES FORÁNEAS DE LA TABLA DE HECHOS
+# ============================================
+
+CLAVES_DIMENSIONES = [
+    ('id_tiempo', 'Dim_Tiempo'),
+    ('id_genero', 'Dim_Genero'),
+    ('id_historial', 'Dim_Historial'),
+    ('id_ocupacion', 'Dim_Ocupacion'),
+    ('id_pais', 'Dim_Pais'),
+    ('id_aislamiento', 'Dim_Aislamiento'),
+    ('id_sintomas', 'Dim_Sintomas'),
+    ('id_acceso', 'Dim_Acceso')
+]
+
+# Alias de las dimensiones en las consultas de lectura (mismo orden que CLAVES_DIMENSIONES)
+ALIAS_DIMENSIONES = ['dt', 'dg', 'dh', 'doc', 'dp', 'da', 'ds', 'dac']
+
+# Columnas de staging de las que sale cada clave foránea. Las claves son deterministas (03_cargar_dimensiones.py):
+# - Dim_Tiempo: período YYYYMM
+# - dimensiones estáticas: código de su valor en config/codigos.json
+# - Dim_Acceso: códigos de sus atributos empaquetados
+# - Dim_Sintomas: ídem, seguido del bit de indicador_inferido_estres (la
+#   regla depende también de Days_Indoors, que no es atributo de síntomas)
+# de modo que la carga de hechos las calcula sin unir las dimensiones.
+COLUMNAS_CLAVE = {
+    'id_tiempo': ('anio', 'mes'),
+    'id_genero': ('Gender',),
+    'id_historial': ('family_history',),
+    'id_ocupacion': ('Occupation',),
+    'id_pais': ('Country',),
+    'id_aislamiento': ('Days_Indoors',),
+    'id_sintomas': ('Growing_Stress', 'Mood_Swings', 'Coping_Struggles', 'Social_Weakness'),
+    'id_acceso': ('care_options', 'mental_health_interview')
+}
+
+
+def clave_tiempo(anio, mes):
+    """Clave de Dim_Tiempo: YYYYMM"""
+    return anio * 100 + mes
+
+
+def clave_sintomas(codigos, indicador):
+    """Clave de Dim_Sintomas: códigos de sus atributos empaquetados y el indicador inferido"""
+    return empaquetar(COLUMNAS_CLAVE['id_sintomas'], codigos) * 2 + int(indicador)
+
+
+def expresion_clave_sql(fk, alias='s'):
+    """
+    Expresión SQL de una clave foránea de hechos sobre la fila de staging
+    (los productos se calculan en UNSIGNED: DuckDB opera en el tipo de la
+    columna, SMALLINT/TINYINT, y desbordaría)
+    """
+    columnas = COLUMNAS_CLAVE[fk]
+    if fk == 'id_tiempo':
+        return f"CAST({alias}.anio AS UNSIGNED) * 100 + {alias}.mes"
+    if fk == 'id_sintomas':
+        return f"{expresion_empaquetar_sql(columnas, alias)} * 2 + {regla_estres_inferido_sql()}"
+    if len(columnas) == 1:
+        return f"{alias}.{columnas[0]}"
+    return expresion_empaquetar_sql(columnas, alias)
+
+
+# ============================================
+# PREDICADOS
+# Un predicado es una conjunción de condiciones (columna, valores aceptados)
+# ============================================
+
+ESTRES = ('Growing_Stress', ('Yes',))
+SIN_ESTRES_DECLARADO = ('Growing_Stress', ('No', 'Maybe'))
+HISTORIAL = ('family_history', ('Yes',))
+AFRONTAMIENTO = ('Coping_Struggles', ('Yes',))
+TRATAMIENTO = ('treatment', ('Yes',))
+SIN_TRATAMIENTO = ('treatment', ('No',))
+HUMOR = ('Mood_Swings', ('Medium', 'High'))
+DEBILIDAD = ('Social_Weakness', ('Yes',))
+CON_RECURSOS = ('care_options', ('Yes', 'Not sure'))
+ENTREVISTA = ('mental_health_interview', ('Yes', 'Maybe'))
+AISLAMIENTO_PROLONGADO = ('Days_Indoors', ('15-30 days', '31-60 days', 'More than 2 months'))
+ESTRES_INFERIDO = ('indicador_inferido_estres', (1,))
+
+SINTOMAS_NO_RECONOCIDOS = (SIN_ESTRES_DECLARADO, HUMOR, AFRONTAMIENTO, AISLAMIENTO_PROLONGADO)
+
+# Regla de indicador_inferido_estres (cargar_dim_sintomas) por encuestado:
+# disyunción de conjunciones sobre columnas de staging
+REGLA_ESTRES_INFERIDO = ((ESTRES,), (HUMOR, AFRONTAMIENTO, AISLAMIENTO_PROLONGADO))
+
+PREDICADOS = {
+    'estres': (ESTRES,),
+    'historial': (HISTORIAL,),
+    'historial_estres': (HISTORIAL, ESTRES),
+    'estres_afrontamiento': (ESTRES, AFRONTAMIENTO),
+    'tratamiento': (TRATAMIENTO,),
+    'no_tratamiento': (SIN_TRATAMIENTO,),
+    'humor': (HUMOR,),
+    'debilidad': (DEBILIDAD,),
+    'estres_acceso': (ESTRES, CON_RECURSOS),
+    'sintomas_no_reconocidos': SINTOMAS_NO_RECONOCIDOS,
+    'sintomas_no_reconocidos_tratamiento': SINTOMAS_NO_RECONOCIDOS + (TRATAMIENTO,),
+    'inferido_recursos': (ESTRES_INFERIDO, CON_RECURSOS),
+    'inferido_recursos_sin_tratamiento': (ESTRES_INFERIDO, CON_RECURSOS, SIN_TRATAMIENTO),
+    'inferido_entrevista': (ESTRES_INFERIDO, ENTREVISTA, CON_RECURSOS),
+    'inferido_entrevista_sin_tratamiento': (ESTRES_INFERIDO, ENTREVISTA, CON_RECURSOS, SIN_TRATAMIENTO)
+}
+
+
+# ============================================
+# INDICADORES
+# denominador None = total del grupo (COUNT(*))
+# ============================================
+
+Indicador = namedtuple('Indicador', 'numero columna tipo numerador denominador descripcion')
+
+INDICADORES = [
+    Indicador('1', 'cantidad_estres', 'cantidad', 'estres', None,
+              'Cantidad con estrés creciente'),
+    Indicador('2', 'porcentaje_estres', 'porcentaje', 'estres', None,
+              'Porcentaje con estrés creciente'),
+    Indicador('3', 'cantidad_historial_estres', 'cantidad', 'historial_estres', None,
+              'Cantidad con historial familiar y estrés'),
+    Indicador('4', 'porcentaje_historial_estres', 'porcentaje', 'historial_estres', 'historial',
+              'Proporción con historial familiar que desarrollan estrés'),
+    Indicador('5', 'cantidad_estres_afrontamiento', 'cantidad', 'estres_afrontamiento', None,
+              'Cantidad con estrés y dificultades de afrontamiento'),
+    Indicador('6', 'porcentaje_estres_afrontamiento_ocupacion', 'porcentaje', 'estres_afrontamiento', None,
+              'Proporción con estrés y dificultades por ocupación/país'),
+    Indicador('7a', 'porcentaje_tratamiento', 'porcentaje', 'tratamiento', None,
+              'Porcentaje en tratamiento'),
+    Indicador('7b', 'porcentaje_no_tratamiento', 'porcentaje', 'no_tratamiento', None,
+              'Porcentaje sin tratamiento'),
+    Indicador('8', 'cantidad_tratamiento', 'cantidad', 'tratamiento', None,
+              'Cantidad en tratamiento'),
+    Indicador('9', 'porcentaje_deterioro_aislamiento', 'porcentaje', 'estres', None,
+              'Proporción con deterioro emocional por aislamiento'),
+    Indicador('10', 'porcentaje_humor_aislamiento', 'porcentaje', 'humor', None,
+              'Proporción con cambios de humor por aislamiento'),
+    Indicador('11', 'porcentaje_debilidad_aislamiento', 'porcentaje', 'debilidad', None,
+              'Proporción con debilidad social por aislamiento'),
+    Indicador('12', 'porcentaje_acceso_recursos', 'porcentaje', 'estres_acceso', 'estres',
+              'Proporción con estrés que tienen acceso a recursos'),
+    Indicador('13', 'cantidad_estres_acceso', 'cantidad', 'estres_acceso', None,
+              'Cantidad con estrés y acceso a recursos'),
+    Indicador('14', 'porcentaje_sintomas_no_reconocidos', 'porcentaje',
+              'sintomas_no_reconocidos_tratamiento', 'sintomas_no_reconocidos',
+              'Proporción con síntomas no reconocidos que buscan tratamiento'),
+    Indicador('15', 'porcentaje_recursos_sin_tratamiento', 'porcentaje',
+              'inferido_recursos_sin_tratamiento', 'inferido_recursos',
+              'Proporción con recursos disponibles que no buscan tratamiento'),
+    Indicador('16', 'porcentaje_postergacion', 'porcentaje',
+              'inferido_entrevista_sin_tratamiento', 'inferido_entrevista',
+              'Proporción que posterga tratamiento con recursos disponibles')
+]
+
+
+# ============================================
+# CONSULTAS SOBRE EL REGISTRO
+# ============================================
+
+def columnas_indicadores(tipo=None):
+    """Columnas de indicadores en orden, opcionalmente filtradas por tipo"""
+    return [ind.columna for ind in INDICADORES if tipo is None or ind.tipo == tipo]
+
+
+def predicados_usados():
+    """Predicados distintos que requieren los indicadores, en orden de aparición"""
+    usados = []
+    for ind in INDICADORES:
+        for nombre in (ind.numerador, ind.denominador):
+            if nombre is not None and nombre not in usados:
+                usados.append(nombre)
+    return usados
+
+
+def _literal(valor):
+    """Representar un valor como literal SQL"""
+    if isinstance(valor, str):
+        return "'" + valor.replace("'", "''") + "'"
+    return str(valor)
+
+
+def condicion_sql(expr, valores):
+    """Condición SQL de una expresión contra sus valores aceptados"""
+    if len(valores) == 1:
+        return f"{expr} = {_literal(valores[0])}"
+    return f"{expr} IN ({', '.join(_literal(v) for v in valores)})"
+
+
+def condicion_staging_sql(columna, valores, alias='s'):
+    """Condición sobre una columna de staging: sus valores se comparan como códigos"""
+    if columna in CODIGOS:
+        valores = codificar(columna, valores)
+    return condicion_sql(f"{alias}.{columna}", valores)
+
+
+def regla_estres_inferido_sql():
+    """indicador_inferido_estres calculado sobre la fila de staging (s), 1 o 0"""
+    disyuncion = ' OR '.join(
+        '(' + ' AND '.join(condicion_staging_sql(columna, valores) for columna, valores in conjuncion) + ')'
+        for conjuncion in REGLA_ESTRES_INFERIDO
+    )
+    return f"(CASE WHEN {disyuncion} THEN 1 ELSE 0 END)"
+
+
+def predicado_sql(nombre, derivadas=None):
+    """
+    Traducir un predicado a condición SQL sobre staging (s)
+    derivadas: columna -> expresión SQL de una columna que no está en staging;
+    indicador_inferido_estres se calcula con su regla (sin unir Dim_Sintomas)
+    """
+    derivadas = dict({'indicador_inferido_estres': regla_estres_inferido_sql()}, **(derivadas or {}))
+    condiciones = []
+    for columna, valores in PREDICADOS[nombre]:
+        if columna in derivadas:
+            condiciones.append(condicion_sql(derivadas[columna], valores))
+        else:
+            condiciones.append(condicion_staging_sql(columna, valores))
+    return ' AND '.join(condiciones)
+
+
+def _expresion_indicador(ind):
+    """Expresión del indicador sobre los conteos ya agregados (alias c)"""
+    numerador = f"c.n_{ind.numerador}"
+
+    if ind.tipo == 'cantidad':
+        return numerador
+
+    if ind.denominador is None:
+        return f"ROUND(({numerador} / c.n_total) * 100, 2)"
+
+    denominador = f"c.n_{ind.denominador}"
+    return (f"CASE WHEN {denominador} > 0 "
+            f"THEN ROUND(({numerador} / {denominador}) * 100, 2) ELSE NULL END")
+
+
+def generar_sql_hechos():
+    """
+    Generar el INSERT ... SELECT de la tabla de hechos
+
+    La subconsulta agrupa staging por las 8 claves, calculadas desde sus
+    columnas (COLUMNAS_CLAVE) sin unir las dimensiones, y evalúa cada
+    predicado distinto una sola vez (n_<predicado>); el SELECT externo
+    deriva los 16 indicadores a partir de esos conteos.
+    Lleva un parámetro (%s): el id_run de la ejecución que carga los hechos.
+    """
+    claves = [fk for fk, _ in CLAVES_DIMENSIONES]
+    claves_agrupadas = [f"{expresion_clave_sql(fk)} AS {fk}" for fk in claves]
+
+    conteos = ["COUNT(*) AS n_total"]
+    for nombre in predicados_usados():
+        conteos.append(f"SUM(CASE WHEN {predicado_sql(nombre)} THEN 1 ELSE 0 END) AS n_{nombre}")
+
+    indicadores = []
+    for ind in INDICADORES:
+        indicadores.append(f"-- Indicador {ind.numero}: {ind.descripcion}\n"
+                           f"        {_expresion_indicador(ind)} AS {ind.columna}")
+
+    separador = ",\n        "
+    separador_sub = ",\n            "
+    return f"""
+    INSERT INTO Hechos_Estres_SaludMental (
+        {', '.join(claves)},
+        {', '.join(columnas_indicadores())},
+        id_run
+    )
+    SELECT
+        {separador.join('c.' + fk for fk in claves)},
+
+        {separador.join(indicadores)},
+
+        %s AS id_run
+
+    FROM (
+        SELECT
+            {separador_sub.join(claves_agrupadas + conteos)}
+
+        FROM mental_health_staging s
+        GROUP BY
+            {', '.join(claves)}
+    ) c
+    """
+
+
+def condicion_fuera_de_rango(columna):
+    """Condición SQL que identifica valores inválidos de un indicador"""
+    tipo = next(ind.tipo for ind in INDICADORES if ind.columna == columna)
+
+    if tipo == 'porcentaje':
+        return f"{columna} IS NOT NULL AND ({columna} < 0 OR {columna} > 100)"
+    return f"{columna} IS NOT NULL AND {columna} < 0"
+
+
+def proyeccion_exportacion(alias='h'):
+    """Lista de columnas de indicadores para el SELECT de exportación"""
+    return ',\n        '.join(f"{alias}.{col}" for col in columnas_indicadores())
@@ -0,0 +1,321 @@
+"""
+Índice bitmap por encuestado sobre el CSV limpio
+Un bitset empaquetado (np.packbits, 1 bit por fila) por cada par
+(columna, valor) de las respuestas categóricas, más las columnas derivadas
+anio, periodo e indicador_inferido_estres (misma regla que Dim_Sintomas).
+
+Cualquier filtro booleano se resuelve con AND/OR/NOT sobre los bitsets y un
+popcount, sin volver a agregar staging:
+
+    indice = indice_vigente()
+    estres = indice['Growing_Stress'] == 'Yes'
+    europa = indice['Country'].isin(['Germany', 'France', 'Italy'])
+    indice.contar(estres & europa & ~(indice['treatment'] == 'Yes'))
+    indice.contar_por('Gender', estres)
+    indice.valor_indicador('porcentaje_acceso_recursos', filtro=europa)
+
+Los indicadores del registro (indicadores.py) se evalúan a nivel de
+encuestado: cantidad = popcount(numerador & filtro) y porcentaje =
+numerador / denominador del mismo filtro. No equivalen al promedio de
+porcentajes por celda de la tabla de hechos.
+
+El índice se guarda en un .npz (INDICE_BITMAP_PATH) con el tamaño y la
+fecha de modificación del CSV del que se construyó; indice_vigente() lo
+reconstruye cuando el CSV limpio cambia.
+
+Uso:
+    python python/indice_bitmap.py --filtro Country=Brazil,Chile --agrupar Gender
+    python python/indice_bitmap.py --construir
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import CSV_CLEAN_PATH, INDICE_BITMAP_PATH
+from bitacora import log_message
+from errores import ErrorETL
+from indicadores import INDICADORES, PREDICADOS, REGLA_ESTRES_INFERIDO
+
+
+# Texto con un valor casi único por fila: no se indexa
+COLUMNAS_EXCLUIDAS = {'Timestamp'}
+
+# Bits en 1 de cada byte (respaldo de np.bitwise_count, NumPy < 2.0)
+_BITS_POR_BYTE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount(bits):
+    """Cantidad de bits en 1 de un bitset empaquetado"""
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(bits).sum(dtype=np.int64))
+    return int(_BITS_POR_BYTE[bits].sum(dtype=np.int64))
+
+
+class Expresion:
+    """Filtro booleano sobre las filas del índice (bitset empaquetado)"""
+
+    def __init__(self, indice, bits):
+        self.indice = indice
+        self.bits = bits
+
+    def __and__(self, otra):
+        return Expresion(self.indice, np.bitwise_and(self.bits, otra.bits))
+
+    def __or__(self, otra):
+        return Expresion(self.indice, np.bitwise_or(self.bits, otra.bits))
+
+    def __invert__(self):
+        # El AND con el universo apaga el relleno del último byte
+        return Expresion(self.indice, np.bitwise_and(np.invert(self.bits), self.indice.universo))
+
+    def contar(self):
+        return popcount(self.bits)
+
+
+class Columna:
+    """Columna indexada: construye expresiones por igualdad o pertenencia"""
+
+    def __init__(self, indice, nombre):
+        self.indice = indice
+        self.nombre = nombre
+
+    def isin(self, valores):
+        bits = np.zeros(self.indice.bytes_por_bitset, dtype=np.uint8)
+        posiciones = self.indice.posiciones[self.nombre]
+        for valor in valores:
+            # Un valor que no aparece en los datos no aporta filas
+            if str(valor) in posiciones:
+                bits |= self.indice.bitsets[self.nombre][posiciones[str(valor)]]
+        return Expresion(self.indice, bits)
+
+    def __eq__(self, valor):
+        return self.isin([valor])
+
+    def __ne__(self, valor):
+        return ~self.isin([valor])
+
+    __hash__ = None
+
+
+class IndiceBitmap:
+    """Bitsets por (columna, valor) sobre las filas del CSV limpio"""
+
+    def __init__(self, filas, valores, bitsets, origen):
+        self.filas = filas
+        self.valores = valores      # columna -> arreglo de valores (texto)
+        self.bitsets = bitsets      # columna -> uint8 (valores, bytes_por_bitset)
+        self.origen = origen        # {'ruta', 'bytes', 'mtime'} del CSV indexado
+        self.bytes_por_bitset = (filas + 7) // 8
+        self.posiciones = {columna: {v: i for i, v in enumerate(vals)} for columna, vals in valores.items()}
+        self.universo = np.packbits(np.ones(filas, dtype=bool))
+
+    # ============================================
+    # CONSTRUCCIÓN Y PERSISTENCIA
+    # ============================================
+
+    @staticmethod
+    def firma_archivo(ruta):
+        estado = os.stat(ruta)
+        return {'ruta': ruta, 'bytes': estado.st_size, 'mtime': estado.st_mtime}
+
+    @classmethod
+    def desde_csv(cls, ruta=CSV_CLEAN_PATH):
+        """Leer el CSV limpio y construir un bitset por (columna, valor)"""
+        if not os.path.exists(ruta):
+            log_message(f"❌ ERROR: No se encontró {ruta}")
+            log_message("Ejecuta primero el script 01_limpiar_datos.py")
+            raise ErrorETL(f"No se encontró {ruta}")
+
+        # Todo como texto; las celdas vacías quedan '' (no NaN)
+        df = pd.read_csv(ruta, dtype=str, keep_default_na=False)
+
+        fecha = df['Timestamp'].str.split(' ', n=1).str[0].str.split('/')
+        df['anio'] = fecha.str[2]
+        df['periodo'] = fecha.str[2] + '-' + fecha.str[0].str.zfill(2)
+
+        valores = {}
+        bitsets = {}
+        for columna in df.columns:
+            if columna in COLUMNAS_EXCLUIDAS:
+                continue
+            codigos, distintos = pd.factorize(df[columna], sort=True)
+            valores[columna] = np.asarray(distintos, dtype=str)
+            bitsets[columna] = np.stack([np.packbits(codigos == k) for k in range(len(distintos))])
+
+        indice = cls(len(df), valores, bitsets, cls.firma_archivo(ruta))
+        indice._agregar_inferido()
+        return indice
+
+    def _agregar_inferido(self):
+        """indicador_inferido_estres por fila, con la regla de cargar_dim_sintomas"""
+        inferido = Expresion(self, np.zeros(self.bytes_por_bitset, dtype=np.uint8))
+        for conjuncion in REGLA_ESTRES_INFERIDO:
+            termino = self.todas()
+            for condicion in conjuncion:
+                termino = termino & self.condicion(condicion)
+            inferido = inferido | termino
+        self.valores['indicador_inferido_estres'] = np.array(['0', '1'])
+        self.bitsets['indicador_inferido_estres'] = np.stack([(~inferido).bits, inferido.bits])
+        self.posiciones['indicador_inferido_estres'] = {'0': 0, '1': 1}
+
+    def guardar(self, ruta=INDICE_BITMAP_PATH):
+        """Persistir el índice en un .npz sin comprimir"""
+        arreglos = {'meta': np.array(json.dumps({'filas': self.filas, 'origen': self.origen}))}
+        for columna in self.valores:
+            arreglos[f'valores__{columna}'] = self.valores[columna]
+            arreglos[f'bits__{columna}'] = self.bitsets[columna]
+
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        temporal = ruta + '.tmp.npz'
+        np.savez(temporal, **arreglos)
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta=INDICE_BITMAP_PATH):
+        """Reconstruir el índice desde un .npz guardado con guardar()"""
+        with np.load(ruta, allow_pickle=False) as archivo:
+            meta = json.loads(str(archivo['meta']))
+            valores = {n[len('valores__'):]: archivo[n] for n in archivo.files if n.startswith('valores__')}
+            bitsets = {columna: archivo[f'bits__{columna}'] for columna in valores}
+        return cls(meta['filas'], valores, bitsets, meta['origen'])
+
+    # ============================================
+    # CONSULTAS
+    # ============================================
+
+    def __getitem__(self, columna):
+        if columna not in self.valores:
+            log_message(f"❌ ERROR: Columna no indexada: {columna}")
+            log_message(f"Disponibles: {', '.join(sorted(self.valores))}")
+            raise ErrorETL(f"Columna no indexada: {columna}")
+        return Columna(self, columna)
+
+    def todas(self):
+        """Expresión que acepta todas las filas"""
+        return Expresion(self, self.universo)
+
+    def condicion(self, condicion):
+        """(columna, valores aceptados) del registro de indicadores -> expresión"""
+        columna, valores = condicion
+        return self[columna].isin(valores)
+
+    def predicado(self, nombre):
+        """Conjunción de condiciones de un predicado de PREDICADOS"""
+        expresion = self.todas()
+        for condicion in PREDICADOS[nombre]:
+            expresion = expresion & self.condicion(condicion)
+        return expresion
+
+    def contar(self, expresion):
+        return expresion.contar()
+
+    def contar_por(self, columna, expresion=None):
+        """{valor: filas que cumplen la expresión} para cada valor de la columna"""
+        self[columna]
+        bits = self.universo if expresion is None else expresion.bits
+        return {
+            str(valor): popcount(np.bitwise_and(self.bitsets[columna][i], bits))
+            for i, valor in enumerate(self.valores[columna])
+        }
+
+    def proporcion(self, numerador, denominador):
+        """Porcentaje (2 decimales) o None si el denominador no tiene filas"""
+        total = denominador.contar()
+        return round(numerador.contar() / total * 100, 2) if total else None
+
+    def valor_indicador(self, columna, filtro=None):
+        """Indicador del registro a nivel de encuestado dentro del filtro"""
+        indicador = next((ind for ind in INDICADORES if ind.columna == columna), None)
+        if indicador is None:
+            log_message(f"❌ ERROR: Indicador desconocido: {columna}")
+            raise ErrorETL(f"Indicador desconocido: {columna}")
+
+        filtro = filtro if filtro is not None else self.todas()
+        numerador = self.predicado(indicador.numerador) & filtro
+
+        if indicador.tipo == 'cantidad':
+            return numerador.contar()
+        if indicador.denominador is None:
+            return self.proporcion(numerador, filtro)
+        return self.proporcion(numerador, self.predicado(indicador.denominador) & filtro)
+
+
+def indice_vigente(ruta=INDICE_BITMAP_PATH, origen=CSV_CLEAN_PATH, reconstruir=False):
+    """
+    Índice del CSV limpio actual
+    Se recarga del .npz si el CSV no cambió (tamaño y fecha de
+    modificación); si no (o con reconstruir=True) se construye y se guarda.
+    """
+    if not reconstruir and os.path.exists(ruta) and os.path.exists(origen):
+        inicio = time.perf_counter()
+        indice = IndiceBitmap.cargar(ruta)
+        if indice.origen == IndiceBitmap.firma_archivo(origen):
+            log_message(f"♻️ Índice bitmap cargado de {ruta} ({indice.filas} filas, "
+                        f"{(time.perf_counter() - inicio) * 1000:.1f} ms)")
+            return indice
+        log_message(f"{origen} cambió desde que se construyó el índice: se reconstruye")
+
+    inicio = time.perf_counter()
+    indice = IndiceBitmap.desde_csv(origen)
+    indice.guardar(ruta)
+
+    cantidad = sum(len(v) for v in indice.valores.values())
+    log_message(f"✅ Índice bitmap construido: {indice.filas} filas, {cantidad} bitsets "
+                f"de {indice.bytes_por_bitset / 1024:.1f} KB ({time.perf_counter() - inicio:.2f} s) → {ruta}")
+    return indice
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description='Índice bitmap por encuestado del CSV limpio')
+    parser.add_argument('--filtro', action='append', default=[], metavar='COLUMNA=VALOR[,VALOR]',
+                        help='Condiciones combinadas con AND (valores de una misma columna con OR)')
+    parser.add_argument('--agrupar', help='Columna por cuyos valores se calculan los indicadores')
+    parser.add_argument('--indicadores', nargs='+', help='Indicadores a calcular (por defecto todos)')
+    parser.add_argument('--construir', action='store_true', help='Reconstruir el índice desde el CSV limpio')
+    parser.add_argument('--ruta', default=INDICE_BITMAP_PATH)
+    args = parser.parse_args()
+
+    indice = indice_vigente(args.ruta, reconstruir=args.construir)
+    if args.construir and not args.filtro and not args.agrupar:
+        return
+
+    inicio = time.perf_counter()
+    filtro = indice.todas()
+    for condicion in args.filtro:
+        columna, separador, valores = condicion.partition('=')
+        if not separador:
+            parser.error(f"Filtro inválido: {condicion} (se espera columna=valor)")
+        filtro = filtro & indice[columna].isin(valores.split(','))
+
+    columnas = args.indicadores or [ind.columna for ind in INDICADORES]
+    grupos = [(None, filtro)]
+    if args.agrupar:
+        grupos = [(valor, filtro & (indice[args.agrupar] == valor)) for valor in indice.valores[args.agrupar]]
+
+    filas = []
+    for valor, expresion in grupos:
+        fila = {args.agrupar: str(valor)} if args.agrupar else {}
+        fila['filas'] = expresion.contar()
+        if fila['filas']:
+            fila.update({columna: indice.valor_indicador(columna, expresion) for columna in columnas})
+            filas.append(fila)
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+
+    for fila in filas:
+        log_message(json.dumps(fila, ensure_ascii=False))
+    log_message(f"📈 {len(filas)} filas en {duracion_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ErrorETL:
+        sys.exit(1)
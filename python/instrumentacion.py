@@ -0,0 +1,270 @@
+"""
+Instrumentación de la ejecución SQL
+Envuelve la conexión MySQL para registrar, por cada sentencia, su huella
+(fingerprint), tiempo de ejecución, filas afectadas/devueltas y la función
+que la invocó. Opcionalmente captura EXPLAIN FORMAT=JSON de las sentencias
+lentas y al final escribe un resumen por sentencia en JSON.
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import SQL_METRICS_DIR, SQL_EXPLAIN_THRESHOLD_MS
+
+
+# Sentencias sobre las que MySQL acepta EXPLAIN
+SENTENCIAS_EXPLICABLES = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def normalizar_sql(sql):
+    """Reducir una sentencia a su forma canónica (sin literales ni espacios extra)"""
+    texto = re.sub(r'--[^\n]*', ' ', sql)
+    texto = re.sub(r'/\*.*?\*/', ' ', texto, flags=re.S)
+    texto = re.sub(r"'(?:[^'\\]|\\.|'')*'", '?', texto)
+    texto = re.sub(r'%s', '?', texto)
+    texto = re.sub(r'\b\d+(\.\d+)?\b', '?', texto)
+    texto = re.sub(r'\(\s*\?(\s*,\s*\?)*\s*\)', '(?+)', texto)
+    texto = re.sub(r'\s+', ' ', texto).strip()
+    return texto
+
+
+def huella_sql(sql):
+    """Huella corta y estable de una sentencia normalizada"""
+    return hashlib.sha1(normalizar_sql(sql).encode('utf-8')).hexdigest()[:12]
+
+
+def percentil(valores_ordenados, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not valores_ordenados:
+        return None
+    rango = max(1, math.ceil(p / 100 * len(valores_ordenados)))
+    return valores_ordenados[rango - 1]
+
+
+@contextmanager
+def sin_error_por_avisos(conn):
+    """
+    Desactivar raise_on_warnings (MYSQL_CONFIG) mientras dura el bloque
+    EXPLAIN siempre agrega la Note 1003 (consulta reescrita): con la opción
+    activa, leer el plan lanzaría esa nota como error.
+    """
+    # PooledMySQLConnection delega la lectura de atributos pero no su asignación
+    cnx = getattr(conn, '_cnx', conn)
+    if not hasattr(cnx, 'raise_on_warnings'):  # DuckDB
+        yield
+        return
+
+    previos = (cnx.raise_on_warnings, cnx.get_warnings)
+    cnx.raise_on_warnings = False
+    cnx.get_warnings = False
+    try:
+        yield
+    finally:
+        cnx.raise_on_warnings, cnx.get_warnings = previos
+
+
+def _funcion_invocadora():
+    """Nombre de la primera función fuera de este módulo en la pila"""
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_globals.get('__name__') == __name__:
+        frame = frame.f_back
+    return frame.f_code.co_name if frame is not None else '?'
+
+
+class RegistroSQL:
+    """Acumula las ejecuciones SQL de un script"""
+
+    def __init__(self, nombre_script, umbral_explain_ms=SQL_EXPLAIN_THRESHOLD_MS):
+        self.nombre_script = nombre_script
+        self.umbral_explain_ms = umbral_explain_ms
+        self.inicio = datetime.now()
+        self.ejecuciones = []
+        self.explains = {}
+
+    def registrar(self, sql, params, duracion_ms, filas, funcion, explicable):
+        """Registrar una ejecución y devolver su entrada (para sumar filas leídas)"""
+        entrada = {
+            'huella': huella_sql(sql),
+            'sql': sql,
+            'params': params if explicable else None,
+            'explicable': explicable and sql.lstrip().upper().startswith(SENTENCIAS_EXPLICABLES),
+            'funcion': funcion,
+            'duracion_ms': duracion_ms,
+            'filas': filas
+        }
+        self.ejecuciones.append(entrada)
+        return entrada
+
+    def capturar_explains(self, conn):
+        """
+        Ejecutar EXPLAIN FORMAT=JSON de la ejecución más lenta de cada huella
+        que supere el umbral. Se hace al final (antes de cerrar la conexión)
+        para no interferir con cursores que aún tengan resultados por leer
+        y para contar también el tiempo de lectura de los SELECT.
+        """
+        if self.umbral_explain_ms is None:
+            return
+
+        lentas = {}
+        for entrada in self.ejecuciones:
+            if not entrada['explicable'] or entrada['duracion_ms'] < self.umbral_explain_ms:
+                continue
+            actual = lentas.get(entrada['huella'])
+            if actual is None or actual['duracion_ms'] < entrada['duracion_ms']:
+                lentas[entrada['huella']] = entrada
+
+        with sin_error_por_avisos(conn):
+            for huella, entrada in lentas.items():
+                if huella in self.explains:
+                    continue
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("EXPLAIN FORMAT=JSON " + entrada['sql'], entrada['params'])
+                    plan = cursor.fetchone()[0]
+                    self.explains[huella] = json.loads(plan)
+                except Exception as e:
+                    self.explains[huella] = {'error': str(e)}
+                finally:
+                    cursor.close()
+
+    def resumen(self):
+        """Resumen por huella: cantidad, total, p50, p95, filas y funciones"""
+        grupos = {}
+        for entrada in self.ejecuciones:
+            grupos.setdefault(entrada['huella'], []).append(entrada)
+
+        filas_resumen = []
+        for huella, entradas in grupos.items():
+            duraciones = sorted(e['duracion_ms'] for e in entradas)
+            filas_resumen.append({
+                'huella': huella,
+                'sql': normalizar_sql(entradas[0]['sql'])[:300],
+                'funciones': sorted({e['funcion'] for e in entradas}),
+                'ejecuciones': len(entradas),
+                'total_ms': round(sum(duraciones), 3),
+                'p50_ms': round(percentil(duraciones, 50), 3),
+                'p95_ms': round(percentil(duraciones, 95), 3),
+                'max_ms': round(duraciones[-1], 3),
+                'filas': sum(e['filas'] for e in entradas if e['filas'] is not None),
+                'explain': self.explains.get(huella)
+            })
+
+        filas_resumen.sort(key=lambda fila: fila['total_ms'], reverse=True)
+        return filas_resumen
+
+    def escribir_resumen(self, ruta=None):
+        """Escribir el resumen en JSON y devolver la ruta"""
+        if ruta is None:
+            ruta = os.path.join(SQL_METRICS_DIR, f"{self.nombre_script}.json")
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+
+        documento = {
+            'script': self.nombre_script,
+            'inicio': self.inicio.strftime('%Y-%m-%d %H:%M:%S'),
+            'fin': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'umbral_explain_ms': self.umbral_explain_ms,
+            'sentencias': self.resumen()
+        }
+
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(documento, f, ensure_ascii=False, indent=2, default=str)
+
+        return ruta
+
+
+class CursorInstrumentado:
+    """Cursor que mide cada execute/executemany y cuenta las filas leídas"""
+
+    def __init__(self, cursor, registro):
+        self._cursor = cursor
+        self._registro = registro
+        self._ultima = None
+
+    def _medir(self, metodo, sql, params, explicable):
+        funcion = _funcion_invocadora()
+        inicio = time.perf_counter()
+        try:
+            resultado = metodo(sql, params)
+        finally:
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+            filas = self._cursor.rowcount if self._cursor.rowcount >= 0 else None
+            self._ultima = self._registro.registrar(
+                sql, params, duracion_ms, filas, funcion, explicable
+            )
+        return resultado
+
+    def execute(self, sql, params=None):
+        return self._medir(self._cursor.execute, sql, params, True)
+
+    def executemany(self, sql, seq_params):
+        return self._medir(self._cursor.executemany, sql, seq_params, False)
+
+    def _contar(self, filas, inicio):
+        """Acumular filas leídas y tiempo de lectura en la última sentencia"""
+        if self._ultima is not None:
+            self._ultima['duracion_ms'] += (time.perf_counter() - inicio) * 1000
+            if self._ultima['filas'] is None:
+                self._ultima['filas'] = 0
+            self._ultima['filas'] = max(self._ultima['filas'], self._cursor.rowcount)
+        return filas
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        return self._contar(self._cursor.fetchone(), inicio)
+
+    def fetchmany(self, size=1):
+        inicio = time.perf_counter()
+        return self._contar(self._cursor.fetchmany(size), inicio)
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        return self._contar(self._cursor.fetchall(), inicio)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+
+class ConexionInstrumentada:
+    """Conexión que entrega cursores instrumentados"""
+
+    def __init__(self, conn, registro):
+        self._conn = conn
+        self.registro = registro
+        self._abierta = True
+
+    def cursor(self, *args, **kwargs):
+        return CursorInstrumentado(self._conn.cursor(*args, **kwargs), self.registro)
+
+    def close(self):
+        """Capturar los EXPLAIN pendientes antes de cerrar la conexión"""
+        try:
+            if self._abierta:
+                self.registro.capturar_explains(self._conn)
+        finally:
+            self._abierta = False
+            self._conn.close()
+
+    def escribir_resumen(self, ruta=None):
+        """Escribir el resumen; con la conexión abierta incluye los EXPLAIN pendientes"""
+        if self._abierta:
+            self.registro.capturar_explains(self._conn)
+        return self.registro.escribir_resumen(ruta)
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+
+def instrumentar(conn, nombre_script):
+    """Envolver una conexión para registrar sus sentencias SQL"""
+    return ConexionInstrumentada(conn, RegistroSQL(nombre_script))
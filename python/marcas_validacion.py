@@ -0,0 +1,147 @@
+"""
+Validación incremental con marcas de agua
+Cada grupo de chequeos de una tabla guarda hasta qué clave (id / id_hecho)
+ya fue validado, la generación de carga vigente en ese momento y las fallas
+acumuladas; la ejecución siguiente solo recorre las filas con clave mayor
+que la marca y suma sus fallas a las ya registradas, de modo que el costo
+sigue al tamaño del delta.
+
+Se vuelve a recorrer la tabla completa cuando:
+- el cargador la vació (TRUNCATE reinicia las claves: reiniciar_marcas),
+- cambió la generación de carga del DW (tablas que la registran),
+- cambiaron los chequeos (firma de sus condiciones, que incluye las claves
+  de las dimensiones en el caso de los huérfanos),
+- la tabla tiene menos claves que la marca (filas borradas),
+- se acumularon VALIDACION_BARRIDO_CADA ejecuciones incrementales o se pidió
+  un barrido completo (05_validar_dw.py --completa), para detectar cambios
+  en filas ya validadas.
+
+Las marcas viven en un archivo JSON (las validaciones usan conexiones de
+solo lectura).
+"""
+
+from datetime import datetime
+import hashlib
+import json
+import os
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import VALIDACION_MARCAS_FILE, VALIDACION_BARRIDO_CADA
+from bitacora import log_message
+from base_datos import generacion_actual
+from chequeos import TABLA_HECHOS, compilar_chequeos
+
+
+# Clave creciente de cada tabla y si sus recargas incrementan la generación
+TABLAS_MARCA = {
+    'mental_health_staging': ('id', False),
+    TABLA_HECHOS: ('id_hecho', True)
+}
+
+_lock = threading.Lock()
+_barrido_completo = False
+
+
+def barrido_completo(activar=True):
+    """Ignorar las marcas en las validaciones siguientes de este proceso"""
+    global _barrido_completo
+    _barrido_completo = activar
+
+
+def firma_chequeos(chequeos):
+    """Identifica el conjunto de chequeos: si cambia, las fallas acumuladas no sirven"""
+    texto = '\n'.join(f"{chequeo.nombre}={' '.join(chequeo.condicion.split())}" for chequeo in chequeos)
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()[:16]
+
+
+def _leer(ruta):
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _escribir(ruta, marcas):
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(marcas, f, ensure_ascii=False, indent=2)
+
+
+def reiniciar_marcas(tabla, ruta=VALIDACION_MARCAS_FILE):
+    """Descartar las marcas de una tabla (el cargador la vació)"""
+    with _lock:
+        marcas = _leer(ruta)
+        restantes = {k: v for k, v in marcas.items() if v.get('tabla') != tabla}
+        if len(restantes) != len(marcas):
+            _escribir(ruta, restantes)
+
+
+def _motivo_barrido(marca, generacion, clave_max):
+    """Por qué no se puede usar la marca (None si se puede)"""
+    if marca is None:
+        return 'sin marca previa'
+    if _barrido_completo:
+        return 'barrido completo solicitado'
+    if marca['generacion'] != generacion:
+        return f"generación de carga {marca['generacion']} → {generacion}"
+    if clave_max is None or clave_max < marca['hasta']:
+        return 'la tabla tiene menos filas que la marca'
+    if marca['incrementales'] >= VALIDACION_BARRIDO_CADA:
+        return f"barrido periódico (cada {VALIDACION_BARRIDO_CADA} ejecuciones)"
+    return None
+
+
+def chequear_desde_marca(conn, tabla, chequeos, ruta=VALIDACION_MARCAS_FILE):
+    """
+    ejecutar_chequeos solo sobre las filas posteriores a la marca de agua
+    Devuelve (filas validadas en total, {nombre del chequeo: fallas en total}),
+    igual que ejecutar_chequeos sobre la tabla completa.
+    """
+    clave, con_generacion = TABLAS_MARCA[tabla]
+    id_marca = f"{tabla}:{firma_chequeos(chequeos)}"
+    generacion = generacion_actual(conn)[0] if con_generacion else None
+
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT MAX({clave}) FROM {tabla}")
+    clave_max = cursor.fetchone()[0]
+
+    with _lock:
+        marca = _leer(ruta).get(id_marca)
+
+    motivo = _motivo_barrido(marca, generacion, clave_max)
+    desde = 0 if motivo else marca['hasta']
+
+    cursor.execute(compilar_chequeos(tabla, chequeos, f"{clave} > %s", [f"MAX({clave})"]), (desde,))
+    hasta, delta, *fallas_delta = (int(valor or 0) for valor in cursor.fetchone())
+    cursor.close()
+
+    if motivo:
+        if marca is not None:
+            log_message(f"Validación completa de {tabla}: {motivo}")
+        filas, fallas, incrementales = 0, {}, 0
+    else:
+        log_message(f"♻️ {tabla}: {delta} filas nuevas validadas ({clave} > {desde}); "
+                    f"{marca['filas']} ya validadas")
+        filas, fallas, incrementales = marca['filas'], marca['fallas'], marca['incrementales'] + 1
+
+    filas += delta
+    fallas = {chequeo.nombre: fallas.get(chequeo.nombre, 0) + falla
+              for chequeo, falla in zip(chequeos, fallas_delta)}
+
+    with _lock:
+        marcas = _leer(ruta)
+        marcas[id_marca] = {
+            'tabla': tabla,
+            'hasta': max(hasta, desde),
+            'generacion': generacion,
+            'filas': filas,
+            'fallas': fallas,
+            'incrementales': incrementales,
+            'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        _escribir(ruta, marcas)
+
+    return filas, fallas
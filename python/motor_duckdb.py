@@ -0,0 +1,349 @@
+"""
+Motor DuckDB embebido para el Data Warehouse (DW_BACKEND = 'duckdb')
+Ejecuta la lógica de staging, dimensiones, hechos, validación y exportación
+dentro del proceso, sobre un archivo .duckdb y sin servidor.
+
+Las conexiones imitan la interfaz de mysql.connector que usan los scripts
+(cursor, execute con %s, fetchmany, column_names, commit/rollback) y
+traducen el dialecto MySQL del proyecto:
+- %s → ? (y %% → %) cuando hay parámetros
+- SUBSTRING_INDEX, CRC32, CURDATE, DATE_SUB como macros del esquema
+- STR_TO_DATE / DATE_FORMAT → strptime / strftime
+- CHECKSUM TABLE → bit_xor(hash(fila)) por tabla
+- information_schema.TABLES → vista con las columnas de MySQL
+- SET SESSION / FOREIGN_KEY_CHECKS se omiten (no aplican)
+Las claves AUTO_INCREMENT son secuencias seq_<tabla>: a diferencia de MySQL,
+TRUNCATE no las reinicia (sí al recrear el esquema).
+
+Crear el esquema:
+    python python/motor_duckdb.py --crear-esquema
+"""
+
+from collections import deque
+from functools import lru_cache
+import argparse
+import os
+import re
+import sys
+import threading
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import MYSQL_CONFIG, DUCKDB_PATH, DUCKDB_THREADS
+from bitacora import log_message
+from errores import ErrorETL
+
+
+# Mismo nombre que la base MySQL: las consultas a information_schema no cambian
+ESQUEMA = MYSQL_CONFIG['database']
+
+# Errores de las sentencias (equivalente a mysql.connector.Error)
+ERRORES_DUCKDB = (duckdb.Error,) if duckdb is not None else ()
+
+DDL_DUCKDB = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql', '02_crear_tablas_duckdb.sql'
+)
+
+# Funciones de MySQL usadas por los scripts, definidas una vez en el esquema
+MACROS = f"""
+CREATE SCHEMA IF NOT EXISTS {ESQUEMA};
+
+CREATE OR REPLACE MACRO {ESQUEMA}.substring_index(s, d, n) AS
+    CASE WHEN n >= 0 THEN array_to_string(string_split(s, d)[1:n], d)
+         ELSE array_to_string(string_split(s, d)[n:], d) END;
+
+CREATE OR REPLACE MACRO {ESQUEMA}.crc32(s) AS hash(s) % 4294967296;
+
+CREATE OR REPLACE MACRO {ESQUEMA}.curdate() AS current_date;
+
+CREATE OR REPLACE MACRO {ESQUEMA}.date_sub(d, i) AS d - i;
+
+CREATE OR REPLACE VIEW {ESQUEMA}.tablas_mysql AS
+SELECT
+    schema_name AS TABLE_SCHEMA,
+    table_name AS TABLE_NAME,
+    'BASE TABLE' AS TABLE_TYPE,
+    'DuckDB' AS ENGINE,
+    estimated_size AS TABLE_ROWS,
+    0 AS DATA_LENGTH,
+    0 AS INDEX_LENGTH
+FROM duckdb_tables();
+"""
+
+# Sentencias de sesión de MySQL sin equivalente (perfiles, FK checks)
+SENTENCIAS_OMITIDAS = re.compile(r'^\s*SET\s+(SESSION\b|GLOBAL\b|FOREIGN_KEY_CHECKS\b|UNIQUE_CHECKS\b)', re.I)
+
+SENTENCIAS_DML = re.compile(r'^\s*(INSERT|UPDATE|DELETE|TRUNCATE)\b', re.I)
+
+INSERT_EN = re.compile(r'^\s*INSERT\s+(?:OR\s+IGNORE\s+)?INTO\s+(\w+)', re.I)
+
+CHECKSUM_TABLE = re.compile(r'^\s*CHECKSUM\s+TABLE\s+(.+?)\s*;?\s*$', re.I | re.S)
+
+FUNCIONES_FECHA = re.compile(r"\b(STR_TO_DATE|DATE_FORMAT)\(([^,()]+),\s*'([^']*)'\)", re.I)
+
+REEMPLAZOS = [
+    (re.compile(r'\binformation_schema\.TABLES\b', re.I), 'tablas_mysql'),
+    (re.compile(r'\bINSERT\s+IGNORE\b', re.I), 'INSERT OR IGNORE'),
+    (re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', re.I), 'ON CONFLICT DO UPDATE SET'),
+    (re.compile(r'\bNOW\(\d*\)', re.I), 'CAST(now() AS TIMESTAMP)'),
+    (re.compile(r'\bAS\s+UNSIGNED\)', re.I), 'AS UBIGINT)'),
+    (re.compile(r'\bAS\s+SIGNED\)', re.I), 'AS BIGINT)'),
+    (re.compile(r'\bINTERVAL\s+\?\s+', re.I), 'INTERVAL (?) '),
+    (re.compile(r'`'), '"')
+]
+
+_base = None
+_lock_base = threading.Lock()
+
+
+def _fecha(coincidencia):
+    funcion, expresion, formato = coincidencia.groups()
+    # %i (minutos) de MySQL es %M en strftime/strptime
+    formato = formato.replace('%i', '%M')
+    if funcion.upper() == 'STR_TO_DATE':
+        return f"try_strptime({expresion}, '{formato}')"
+    return f"strftime({expresion}, '{formato}')"
+
+
+def _checksum_table(tablas):
+    """CHECKSUM TABLE a, b → filas (tabla, checksum) como en MySQL"""
+    return '\nUNION ALL\n'.join(
+        f"SELECT '{ESQUEMA}.{tabla}' AS \"Table\", "
+        f"(SELECT COALESCE(bit_xor(hash(t)), 0) FROM {tabla} t) AS \"Checksum\""
+        for tabla in (t.strip() for t in tablas.split(','))
+    )
+
+
+@lru_cache(maxsize=512)
+def traducir_sql(sql, con_parametros):
+    """Sentencia MySQL → DuckDB (None si no tiene equivalente y se omite)"""
+    if SENTENCIAS_OMITIDAS.match(sql):
+        return None
+
+    checksum = CHECKSUM_TABLE.match(sql)
+    if checksum:
+        return _checksum_table(checksum.group(1))
+
+    if con_parametros:
+        sql = re.sub(r'%%|%s', lambda m: '%' if m.group(0) == '%%' else '?', sql)
+
+    sql = FUNCIONES_FECHA.sub(_fecha, sql)
+    for patron, reemplazo in REEMPLAZOS:
+        sql = patron.sub(reemplazo, sql)
+    return sql
+
+
+class CursorDuckDB:
+    """
+    Cursor con la interfaz de mysql.connector sobre la conexión DuckDB
+    DuckDB tiene un solo resultado pendiente por conexión: si otro cursor
+    ejecuta mientras este tiene filas por leer, se materializan antes.
+    """
+
+    def __init__(self, conexion):
+        self._conexion = conexion
+        self._pendientes = None
+        self._tabla_insert = None
+        self.rowcount = -1
+        self.description = None
+
+    @property
+    def column_names(self):
+        return tuple(columna[0] for columna in self.description or ())
+
+    @property
+    def lastrowid(self):
+        """Último valor de la secuencia seq_<tabla> del último INSERT"""
+        if self._tabla_insert is None:
+            return None
+        try:
+            return self._conexion._preparar(self).execute(
+                f"SELECT currval('seq_{self._tabla_insert.lower()}')"
+            ).fetchone()[0]
+        except duckdb.Error:
+            return None
+
+    def execute(self, sql, params=None):
+        traducida = traducir_sql(sql, params is not None)
+        self._tabla_insert = None
+        self._pendientes = None
+        self.description = None
+
+        if traducida is None:
+            self.rowcount = 0
+            return
+
+        duck = self._conexion._preparar(self)
+        duck.execute(traducida, list(params) if params is not None else None)
+
+        if SENTENCIAS_DML.match(traducida):
+            fila = duck.fetchone()
+            self.rowcount = fila[0] if fila else 0
+            insert = INSERT_EN.match(traducida)
+            self._tabla_insert = insert.group(1) if insert else None
+            self._conexion._activo = None
+        else:
+            self.description = duck.description
+            self.rowcount = 0
+
+    def executemany(self, sql, seq_params):
+        filas = [list(params) for params in seq_params]
+        duck = self._conexion._preparar(self)
+        duck.executemany(traducir_sql(sql, True), filas)
+        self._conexion._activo = None
+        self._tabla_insert = None
+        self.description = None
+        self.rowcount = len(filas)
+
+    def _materializar(self):
+        """Guardar en memoria las filas pendientes (otro cursor va a ejecutar)"""
+        self._pendientes = deque(self._conexion._duck.fetchall())
+
+    def _leer(self, cantidad=None):
+        if self.description is None:
+            return []
+        if self._pendientes is not None:
+            n = len(self._pendientes) if cantidad is None else min(cantidad, len(self._pendientes))
+            filas = [self._pendientes.popleft() for _ in range(n)]
+        elif cantidad is None:
+            filas = self._conexion._duck.fetchall()
+        else:
+            filas = self._conexion._duck.fetchmany(cantidad)
+        self.rowcount += len(filas)
+        return filas
+
+    def fetchone(self):
+        filas = self._leer(1)
+        return filas[0] if filas else None
+
+    def fetchmany(self, size=1):
+        return self._leer(size)
+
+    def fetchall(self):
+        return self._leer()
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        if self._conexion._activo is self:
+            self._conexion._activo = None
+        self._pendientes = None
+
+
+class ConexionDuckDB:
+    """
+    Conexión con la interfaz de mysql.connector
+    Como en MySQL (autocommit desactivado), la primera sentencia abre una
+    transacción que termina con commit() o rollback(); close() descarta lo
+    no confirmado.
+    """
+
+    motor = 'duckdb'
+
+    def __init__(self, duck):
+        self._duck = duck
+        self._activo = None
+        self._en_transaccion = False
+
+    def _preparar(self, cursor):
+        if self._activo is not None and self._activo is not cursor:
+            self._activo._materializar()
+        self._activo = cursor
+        if not self._en_transaccion:
+            self._duck.execute("BEGIN TRANSACTION")
+            self._en_transaccion = True
+        return self._duck
+
+    def cursor(self, *args, **kwargs):
+        # buffered/dictionary de mysql.connector no aplican
+        return CursorDuckDB(self)
+
+    def commit(self):
+        if self._en_transaccion:
+            self._duck.commit()
+            self._en_transaccion = False
+
+    def rollback(self):
+        if self._en_transaccion:
+            self._duck.rollback()
+            self._en_transaccion = False
+
+    def interrupt(self):
+        """Interrumpir la sentencia en curso (se puede llamar desde otro hilo)"""
+        self._duck.interrupt()
+
+    def close(self):
+        try:
+            self.rollback()
+        finally:
+            self._duck.close()
+
+
+def _abrir_base():
+    """Abrir (una sola vez) la base DuckDB y definir las macros del esquema"""
+    global _base
+
+    with _lock_base:
+        if _base is None:
+            if duckdb is None:
+                raise ErrorETL("DW_BACKEND = 'duckdb' requiere el paquete duckdb (pip install duckdb)")
+
+            # El catálogo toma el nombre del archivo; si coincide con el esquema,
+            # toda referencia a "dw_salud_mental" es ambigua
+            catalogo = os.path.splitext(os.path.basename(DUCKDB_PATH))[0]
+            if catalogo.lower() == ESQUEMA.lower():
+                log_message(f"❌ ERROR: el archivo DuckDB {DUCKDB_PATH} no puede llamarse como el esquema "
+                            f"{ESQUEMA} (DuckDB nombra el catálogo según el archivo)")
+                raise ErrorETL(f"Nombre de archivo DuckDB inválido: {DUCKDB_PATH}")
+
+            os.makedirs(os.path.dirname(DUCKDB_PATH) or '.', exist_ok=True)
+            configuracion = {'threads': DUCKDB_THREADS} if DUCKDB_THREADS else {}
+            _base = duckdb.connect(DUCKDB_PATH, config=configuracion)
+            _base.execute(MACROS)
+    return _base
+
+
+def conectar():
+    """Conexión nueva sobre la base compartida del proceso"""
+    duck = _abrir_base().cursor()
+    duck.execute(f"SET search_path = '{ESQUEMA}'")
+    return ConexionDuckDB(duck)
+
+
+def crear_esquema(ruta=DDL_DUCKDB):
+    """Ejecutar el DDL de DuckDB (equivalente a sql/02_crear_tablas.sql)"""
+    log_message(f"Creando esquema DuckDB en {DUCKDB_PATH} desde {ruta}...")
+    with open(ruta, encoding='utf-8') as f:
+        ddl = f.read()
+
+    duck = _abrir_base().cursor()
+    try:
+        duck.execute(ddl)
+    finally:
+        duck.close()
+    log_message("✅ Esquema DuckDB creado")
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description='Motor DuckDB embebido del Data Warehouse')
+    parser.add_argument('--crear-esquema', action='store_true',
+                        help='Crear (o recrear) las tablas del DW en el archivo DuckDB')
+    args = parser.parse_args()
+
+    if args.crear_esquema:
+        crear_esquema()
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ErrorETL:
+        sys.exit(1)
@@ -0,0 +1,316 @@
+"""
+Consultas aproximadas sobre una muestra estratificada de staging
+Durante la carga (02_cargar_staging.py) se mantiene un reservorio de
+MUESTREO_FILAS_ESTRATO filas por estrato (periodo, país): cada fila recibe
+una clave aleatoria y cada estrato conserva las de menor clave, lo que da
+una muestra uniforme sin reemplazo procesando el archivo por bloques.
+
+Los indicadores del registro (indicadores.py) se estiman a nivel de
+encuestado con el peso N_h / n_h de cada estrato y un intervalo de Wilson
+sobre el tamaño efectivo de la muestra (Kish). Si algún grupo no alcanza
+la precisión pedida (error_max, en puntos porcentuales) la consulta se
+resuelve con el cálculo exacto sobre mental_health_staging. Los grupos
+formados solo por estratos completos (N_h <= tamaño del reservorio) son
+exactos.
+
+Uso:
+    python python/muestreo.py --indicador porcentaje_estres --agrupar Country
+    python python/muestreo.py --indicador cantidad_tratamiento --agrupar anio Gender --error-max 1
+    python python/muestreo.py --construir
+"""
+
+from statistics import NormalDist
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import (
+    CSV_CLEAN_PATH, MUESTRA_STAGING_PATH, MUESTREO_FILAS_ESTRATO,
+    MUESTREO_CONFIANZA, MUESTREO_ERROR_MAX
+)
+from base_datos import obtener_conexion
+from bitacora import log_message
+from errores import ErrorETL
+from codigos import decodificar
+from indicadores import (
+    INDICADORES, PREDICADOS, REGLA_ESTRES_INFERIDO, predicado_sql
+)
+
+
+ESTRATO = ['periodo', 'Country']
+
+# Filas del CSV limpio leídas por bloque al construir la muestra sin DataFrame
+FILAS_POR_BLOQUE = 100000
+
+# Columnas derivadas del Timestamp (M/D/YYYY H:MM) y su expresión sobre staging
+# (que guarda anio y mes ya separados)
+DERIVADAS_SQL = {
+    'anio': "CAST(s.anio AS CHAR)",
+    'periodo': "CONCAT(CAST(s.anio AS CHAR), '-', LPAD(CAST(s.mes AS CHAR), 2, '0'))"
+}
+
+
+def columnas_derivadas(df):
+    """Agregar anio y periodo (YYYY-MM) a partir del Timestamp"""
+    fecha = df['Timestamp'].str.split(' ', n=1).str[0].str.split('/')
+    df['anio'] = fecha.str[2]
+    df['periodo'] = fecha.str[2] + '-' + fecha.str[0].str.zfill(2)
+    return df
+
+
+class MuestraEstratificada:
+    """Reservorio por estrato (bottom-k sobre claves aleatorias)"""
+
+    def __init__(self, tamano=MUESTREO_FILAS_ESTRATO, semilla=None):
+        self.tamano = tamano
+        self.rng = np.random.default_rng(semilla)
+        self.muestra = None
+        self.poblacion = None
+
+    def agregar(self, bloque):
+        """Procesar un bloque de filas de staging (las columnas del CSV limpio)"""
+        bloque = columnas_derivadas(bloque.fillna('').astype(str))
+        bloque['_clave'] = self.rng.random(len(bloque))
+
+        conteo = bloque.groupby(ESTRATO).size()
+        if self.poblacion is None:
+            self.poblacion = conteo
+        else:
+            self.poblacion = self.poblacion.add(conteo, fill_value=0).astype('int64')
+
+        candidatas = bloque if self.muestra is None else pd.concat([self.muestra, bloque], ignore_index=True)
+        self.muestra = (candidatas.sort_values('_clave')
+                        .groupby(ESTRATO, sort=False).head(self.tamano)
+                        .reset_index(drop=True))
+
+    def dataframe(self):
+        """Filas muestreadas con la población de su estrato (_poblacion)"""
+        muestra = self.muestra.drop(columns='_clave')
+        poblacion = self.poblacion.rename('_poblacion').reset_index()
+        return muestra.merge(poblacion, on=ESTRATO, how='left')
+
+
+def construir_muestra(df=None, ruta=MUESTRA_STAGING_PATH, origen=CSV_CLEAN_PATH):
+    """
+    Renovar la muestra de staging y guardarla en `ruta`
+    Usa el DataFrame ya cargado si lo hay; si no, lee `origen` por bloques.
+    Devuelve las filas muestreadas.
+    """
+    muestra = MuestraEstratificada()
+    if df is not None:
+        muestra.agregar(df)
+    else:
+        for bloque in pd.read_csv(origen, dtype=str, keep_default_na=False, chunksize=FILAS_POR_BLOQUE):
+            muestra.agregar(bloque)
+
+    resultado = muestra.dataframe()
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    resultado.to_csv(ruta, index=False, encoding='utf-8')
+
+    log_message(f"✅ Muestra estratificada: {len(resultado)} de {int(muestra.poblacion.sum())} filas, "
+                f"{len(muestra.poblacion)} estratos (periodo, país) → {ruta}")
+    return len(resultado)
+
+
+def cargar_muestra(ruta=MUESTRA_STAGING_PATH):
+    """Muestra guardada con pesos por fila e indicador_inferido_estres (1/0)"""
+    if not os.path.exists(ruta):
+        log_message(f"❌ ERROR: No se encontró la muestra {ruta}")
+        log_message("Ejecuta 02_cargar_staging.py o python python/muestreo.py --construir")
+        raise ErrorETL(f"No se encontró la muestra {ruta}")
+
+    df = pd.read_csv(ruta, dtype=str, keep_default_na=False)
+    df['_poblacion'] = df['_poblacion'].astype('int64')
+    df['_muestra'] = df.groupby(ESTRATO)['_poblacion'].transform('size')
+    df['_peso'] = df['_poblacion'] / df['_muestra']
+
+    inferido = np.zeros(len(df), dtype=bool)
+    for conjuncion in REGLA_ESTRES_INFERIDO:
+        inferido |= np.logical_and.reduce([df[c].isin(v).to_numpy() for c, v in conjuncion])
+    df['indicador_inferido_estres'] = np.where(inferido, '1', '0')
+    return df
+
+
+def wilson(p, n, z):
+    """Intervalo de Wilson para una proporción p observada sobre n casos"""
+    if n <= 0:
+        return 0.0, 1.0
+    denominador = 1 + z * z / n
+    centro = (p + z * z / (2 * n)) / denominador
+    margen = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominador
+    return max(0.0, centro - margen), min(1.0, centro + margen)
+
+
+def _indicador(columna):
+    indicador = next((ind for ind in INDICADORES if ind.columna == columna), None)
+    if indicador is None:
+        log_message(f"❌ ERROR: Indicador desconocido: {columna}")
+        raise ErrorETL(f"Indicador desconocido: {columna}")
+    return indicador
+
+
+def _validar_agrupacion(agrupar, columnas):
+    desconocidas = [c for c in agrupar if c not in columnas]
+    if desconocidas:
+        log_message(f"❌ ERROR: No se puede agrupar por {', '.join(desconocidas)}")
+        raise ErrorETL(f"Columnas de agrupación desconocidas: {', '.join(desconocidas)}")
+
+
+def _mascara(df, nombre):
+    """Filas de la muestra que cumplen un predicado (None = todas)"""
+    if nombre is None:
+        return np.ones(len(df), dtype=bool)
+    return np.logical_and.reduce(
+        [df[columna].isin([str(v) for v in valores]).to_numpy() for columna, valores in PREDICADOS[nombre]]
+    )
+
+
+def estimar_indicador(muestra, columna, agrupar=(), confianza=MUESTREO_CONFIANZA):
+    """
+    Estimación por grupo con intervalo de Wilson
+    Cada fila: columnas de agrupar, valor, ic_inferior, ic_superior,
+    margen (puntos porcentuales sobre la proporción), filas_muestra y exacto.
+    """
+    indicador = _indicador(columna)
+    agrupar = list(agrupar)
+    _validar_agrupacion(agrupar, muestra.columns)
+    z = NormalDist().inv_cdf(0.5 + confianza / 2)
+
+    df = pd.DataFrame({
+        'peso': muestra['_peso'],
+        'completo': muestra['_muestra'] == muestra['_poblacion'],
+        'denominador': _mascara(muestra, indicador.denominador)
+    })
+    df['numerador'] = _mascara(muestra, indicador.numerador) & df['denominador']
+    for c in agrupar:
+        df[c] = muestra[c]
+
+    filas = []
+    grupos = df.groupby(agrupar, sort=True) if agrupar else [((), df)]
+    for clave, grupo in grupos:
+        clave = clave if isinstance(clave, tuple) else (clave,)
+        total = grupo['peso'].sum()
+        base = grupo[grupo['denominador']]
+        pesos = base['peso'].to_numpy()
+        estimado_base = pesos.sum()
+        estimado_num = base.loc[base['numerador'], 'peso'].sum()
+
+        p = estimado_num / estimado_base if estimado_base else None
+        exacto = bool(grupo['completo'].all())
+        if p is None:
+            inferior = superior = None
+        elif exacto:
+            inferior = superior = p
+        else:
+            # Tamaño efectivo de Kish: los pesos distintos entre estratos lo reducen
+            inferior, superior = wilson(p, estimado_base ** 2 / (pesos ** 2).sum(), z)
+
+        fila = dict(zip(agrupar, clave))
+        if indicador.tipo == 'cantidad':
+            escala = total
+            fila['valor'] = int(round(estimado_num))
+        else:
+            escala = 100
+            fila['valor'] = round(p * 100, 2) if p is not None else None
+
+        fila.update({
+            'ic_inferior': round(inferior * escala, 2) if inferior is not None else None,
+            'ic_superior': round(superior * escala, 2) if superior is not None else None,
+            'margen': round((superior - inferior) / 2 * 100, 2) if p is not None else None,
+            'filas_muestra': len(grupo),
+            'exacto': exacto
+        })
+        filas.append(fila)
+    return filas
+
+
+def calcular_exacto(conn, columna, agrupar=()):
+    """El mismo indicador por grupo con una agregación completa de staging"""
+    indicador = _indicador(columna)
+    agrupar = list(agrupar)
+
+    expresiones = [DERIVADAS_SQL.get(c, f"s.{c}") for c in agrupar]
+
+    def conteo(*nombres):
+        condicion = ' AND '.join(predicado_sql(n) for n in nombres if n is not None) or '1 = 1'
+        return f"SUM(CASE WHEN {condicion} THEN 1 ELSE 0 END)"
+
+    seleccion = [f"{e} AS {c}" for e, c in zip(expresiones, agrupar)]
+    seleccion += [f"{conteo(indicador.denominador)} AS base",
+                  f"{conteo(indicador.numerador, indicador.denominador)} AS numerador"]
+    agrupacion = f"GROUP BY {', '.join(expresiones)} ORDER BY {', '.join(expresiones)}" if agrupar else ''
+
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {', '.join(seleccion)} FROM mental_health_staging s {agrupacion}")
+    resultado = cursor.fetchall()
+    cursor.close()
+
+    filas = []
+    for fila in resultado:
+        base, numerador = int(fila[-2] or 0), int(fila[-1] or 0)
+        # Staging guarda códigos: se devuelven los valores, como en la muestra
+        valor = {c: decodificar(c, v) for c, v in zip(agrupar, fila[:-2])}
+        if indicador.tipo == 'cantidad':
+            valor['valor'] = numerador
+        else:
+            valor['valor'] = round(numerador / base * 100, 2) if base else None
+        valor['exacto'] = True
+        filas.append(valor)
+    return filas
+
+
+def consultar_indicador(columna, agrupar=(), error_max=MUESTREO_ERROR_MAX,
+                        confianza=MUESTREO_CONFIANZA, muestra=None, conn=None):
+    """
+    Indicador por grupo desde la muestra, o exacto si algún grupo supera error_max
+    Devuelve (filas, origen) con origen 'muestra' o 'exacto'.
+    """
+    muestra = cargar_muestra() if muestra is None else muestra
+    filas = estimar_indicador(muestra, columna, agrupar, confianza)
+
+    peor = max((f['margen'] for f in filas if f['margen'] is not None), default=0)
+    if error_max is None or peor <= error_max:
+        return filas, 'muestra'
+
+    log_message(f"⚠️ {columna}: margen de ±{peor} puntos supera el máximo de ±{error_max}; cálculo exacto")
+    if conn is not None:
+        return calcular_exacto(conn, columna, agrupar), 'exacto'
+    with obtener_conexion('muestreo', 'lectura', resumen=False) as conn:
+        return calcular_exacto(conn, columna, agrupar), 'exacto'
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description='Consultas aproximadas sobre la muestra estratificada de staging')
+    parser.add_argument('--indicador', default='porcentaje_estres')
+    parser.add_argument('--agrupar', nargs='*', default=[], help='Columnas de staging, anio o periodo')
+    parser.add_argument('--error-max', dest='error_max', type=float, default=MUESTREO_ERROR_MAX,
+                        help='Semiamplitud máxima del intervalo en puntos porcentuales')
+    parser.add_argument('--confianza', type=float, default=MUESTREO_CONFIANZA)
+    parser.add_argument('--construir', action='store_true', help='Renovar la muestra desde el CSV limpio')
+    args = parser.parse_args()
+
+    if args.construir:
+        construir_muestra()
+        return
+
+    inicio = time.perf_counter()
+    filas, origen = consultar_indicador(args.indicador, args.agrupar, args.error_max, args.confianza)
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+
+    for fila in filas:
+        log_message(json.dumps(fila, ensure_ascii=False, default=str))
+    log_message(f"📈 {len(filas)} grupos desde {origen} en {duracion_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ErrorETL:
+        sys.exit(1)
@@ -0,0 +1,320 @@
+"""
+Orquestador del pipeline ETL
+Declara las etapas y sus dependencias:
+    limpieza → staging → dimensiones → hechos → validacion → exportacion
+Las tareas independientes (las 8 cargas de dimensiones y las validaciones
+de solo lectura) se ejecutan en paralelo, cada una con su conexión del pool;
+las validaciones además con límites de tiempo (ejecutar_validaciones de
+05_validar_dw.py).
+
+Uso:
+    python python/pipeline.py                          # pipeline completo
+    python python/pipeline.py --from hechos            # desde hechos en adelante
+    python python/pipeline.py --only validacion        # solo las etapas indicadas
+"""
+
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import (
+    MYSQL_CONFIG, DW_BACKEND, CSV_EXPORT_PATH, EXPORT_FORMAT, EXPORT_MODE, EXPORT_INCREMENTAL,
+    EXPORT_WORKERS, PIPELINE_WORKERS
+)
+from bitacora import log_message, medir_etapa, agrupar_mensajes, emitir_mensajes
+from base_datos import obtener_conexion, incrementar_generacion
+from auditoria import ejecucion_etl, auditar_etapa, metricas_etapa
+from errores import ErrorETL
+from indicadores import CLAVES_DIMENSIONES
+
+
+RESUMEN_PIPELINE = 'logs/pipeline_ultima_ejecucion.json'
+
+TABLAS_ESQUEMA = (
+    ['mental_health_staging', 'codigos_staging']
+    + [dim for _, dim in CLAVES_DIMENSIONES]
+    + ['Hechos_Estres_SaludMental', 'etl_generacion', 'etl_runs', 'etl_stage_runs']
+)
+
+Etapa = namedtuple('Etapa', 'nombre dependencias ejecutar usa_mysql')
+
+
+def _script(nombre):
+    """Importar un script numerado (p. ej. '03_cargar_dimensiones') como módulo"""
+    return importlib.import_module(nombre)
+
+
+def ejecutar_en_paralelo(etapa, tareas, perfil='default'):
+    """
+    Ejecutar tareas independientes (nombre, funcion(conn)) en paralelo
+    Cada tarea toma su propia conexión del pool; sus mensajes se emiten
+    agrupados y en el orden de declaración al terminar todas.
+    Devuelve lo que devolvió cada tarea, en el mismo orden.
+    """
+    def correr(nombre, funcion):
+        with agrupar_mensajes(emitir=False) as mensajes:
+            try:
+                with obtener_conexion(f"pipeline_{etapa}_{nombre}", perfil) as conn:
+                    with medir_etapa(etapa, nombre) as medicion:
+                        medicion['filas'] = funcion(conn)
+            except Exception as e:
+                log_message(f"❌ ERROR en {etapa}/{nombre}: {e}")
+                return mensajes, e, None
+        return mensajes, None, medicion['filas']
+
+    with ThreadPoolExecutor(max_workers=PIPELINE_WORKERS) as executor:
+        futuros = [executor.submit(correr, nombre, funcion) for nombre, funcion in tareas]
+        resultados = [futuro.result() for futuro in futuros]
+
+    fallidas = []
+    for (nombre, _), (mensajes, error, _) in zip(tareas, resultados):
+        emitir_mensajes(mensajes)
+        if error is not None:
+            fallidas.append(nombre)
+
+    if fallidas:
+        raise ErrorETL(f"Fallaron tareas de {etapa}: {', '.join(fallidas)}")
+
+    return [filas for _, _, filas in resultados]
+
+
+def verificar_esquema():
+    """Verificar una sola vez que existan todas las tablas del DW"""
+    log_message("Verificando esquema del Data Warehouse...")
+
+    with obtener_conexion('pipeline_verificar_esquema', 'lectura') as conn:
+        cursor = conn.cursor()
+        marcadores = ', '.join(['%s'] * len(TABLAS_ESQUEMA))
+        cursor.execute(f"""
+            SELECT TABLE_NAME
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME IN ({marcadores})
+        """, [MYSQL_CONFIG['database']] + TABLAS_ESQUEMA)
+        existentes = {row[0].lower() for row in cursor.fetchall()}
+        cursor.close()
+
+    faltantes = [t for t in TABLAS_ESQUEMA if t.lower() not in existentes]
+    if faltantes:
+        log_message(f"❌ ERROR: faltan tablas: {', '.join(faltantes)}")
+        if DW_BACKEND == 'duckdb':
+            log_message("Ejecuta primero: python python/motor_duckdb.py --crear-esquema")
+        else:
+            log_message("Ejecuta primero el script 02_crear_tablas.sql")
+        raise ErrorETL(f"Faltan tablas: {', '.join(faltantes)}")
+
+    log_message("✅ Esquema verificado")
+
+
+# ============================================
+# ETAPAS
+# Cada etapa recibe el conjunto de etapas ya completadas en esta ejecución
+# y devuelve sus métricas para la auditoría: filas de salida (int), un dict
+# con auditoria.METRICAS_ETAPA o None
+# ============================================
+
+def etapa_limpieza(completadas):
+    return _script('01_limpiar_datos').main()
+
+
+def etapa_staging(completadas):
+    staging = _script('02_cargar_staging')
+    with obtener_conexion('pipeline_staging', 'carga_masiva') as conn:
+        return staging.cargar_staging(conn, verificar=False)
+
+
+def etapa_dimensiones(completadas):
+    dimensiones = _script('03_cargar_dimensiones')
+
+    tareas = [
+        (cargar.__name__, lambda conn, cargar=cargar: dimensiones.cargar_dimension_sin_fk(conn, cargar))
+        for cargar in dimensiones.CARGAS_DIMENSIONES
+    ]
+    filas = ejecutar_en_paralelo('dimensiones', tareas, perfil='carga_masiva')
+
+    with obtener_conexion('pipeline_dimensiones', 'lectura') as conn:
+        dimensiones.validar_dimensiones(conn)
+
+    with obtener_conexion('pipeline_dimensiones_generacion') as conn:
+        incrementar_generacion(conn)
+
+    return sum(filas)
+
+
+def etapa_hechos(completadas):
+    hechos = _script('04_cargar_hechos')
+    with obtener_conexion('pipeline_hechos', 'agregacion') as conn:
+        # Si las dimensiones se cargaron y validaron en esta ejecución no se re-verifican
+        return hechos.cargar_tabla_hechos(conn, verificar='dimensiones' not in completadas)
+
+
+def etapa_validacion(completadas):
+    validacion = _script('05_validar_dw')
+    cache = validacion.CacheValidaciones()
+    try:
+        validacion.ejecutar_validaciones(validacion.validaciones(), cache)
+    finally:
+        cache.guardar()
+
+
+def etapa_exportacion(completadas):
+    exportacion = _script('06_exportar_powerbi')
+    os.makedirs(os.path.dirname(CSV_EXPORT_PATH) or '.', exist_ok=True)
+    with obtener_conexion('pipeline_exportacion', 'lectura') as conn:
+        return exportacion.exportar_para_powerbi(
+            conn, CSV_EXPORT_PATH, formato=EXPORT_FORMAT, modo=EXPORT_MODE,
+            incremental=EXPORT_INCREMENTAL, trabajadores=EXPORT_WORKERS
+        )
+
+
+ETAPAS = [
+    Etapa('limpieza', [], etapa_limpieza, False),
+    Etapa('staging', ['limpieza'], etapa_staging, True),
+    Etapa('dimensiones', ['staging'], etapa_dimensiones, True),
+    Etapa('hechos', ['dimensiones'], etapa_hechos, True),
+    Etapa('validacion', ['hechos'], etapa_validacion, True),
+    Etapa('exportacion', ['validacion'], etapa_exportacion, True)
+]
+
+
+# ============================================
+# PLANIFICACIÓN
+# ============================================
+
+def seleccionar_etapas(desde=None, solo=None):
+    """Etapas a ejecutar: todas, las indicadas (--only) o una y sus dependientes (--from)"""
+    nombres = [etapa.nombre for etapa in ETAPAS]
+
+    for nombre in (solo or []) + ([desde] if desde else []):
+        if nombre not in nombres:
+            raise ErrorETL(f"Etapa desconocida: {nombre} (válidas: {', '.join(nombres)})")
+
+    if solo:
+        return [n for n in nombres if n in solo]
+
+    if desde:
+        seleccion = {desde}
+        for etapa in ETAPAS:
+            if any(dep in seleccion for dep in etapa.dependencias):
+                seleccion.add(etapa.nombre)
+        return [n for n in nombres if n in seleccion]
+
+    return nombres
+
+
+def _correr_etapa(etapa, completadas):
+    """Ejecutar una etapa y devolver su estado y duración"""
+    log_message("\n" + "=" * 70)
+    log_message(f"ETAPA: {etapa.nombre.upper()}")
+    log_message("=" * 70)
+
+    inicio = time.perf_counter()
+    try:
+        with auditar_etapa(etapa.nombre) as registro, medir_etapa('pipeline', etapa.nombre) as medicion:
+            registro.update(metricas_etapa(etapa.ejecutar(completadas)))
+            medicion['filas'] = registro['filas_salida']
+        estado = 'ok'
+    except Exception as e:
+        log_message(f"❌ ERROR en etapa {etapa.nombre}: {e}")
+        estado = 'error'
+
+    return {'estado': estado, 'duracion_s': round(time.perf_counter() - inicio, 2)}
+
+
+def ejecutar_pipeline(seleccion):
+    """
+    Ejecutar las etapas seleccionadas respetando sus dependencias
+    Las etapas cuyas dependencias (dentro de la selección) ya terminaron se
+    lanzan en paralelo; si una falla, sus dependientes se omiten.
+    """
+    pendientes = {etapa.nombre: etapa for etapa in ETAPAS if etapa.nombre in seleccion}
+    resultados = {}
+    completadas = set()
+    en_curso = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, len(pendientes))) as executor:
+        while pendientes or en_curso:
+            for nombre, etapa in list(pendientes.items()):
+                dependencias = [d for d in etapa.dependencias if d in seleccion]
+
+                if any(resultados.get(d, {}).get('estado') in ('error', 'omitida') for d in dependencias):
+                    log_message(f"⏭️ Etapa {nombre} omitida (falló una dependencia)")
+                    resultados[nombre] = {'estado': 'omitida', 'duracion_s': 0}
+                    del pendientes[nombre]
+                elif all(d in completadas for d in dependencias):
+                    en_curso[executor.submit(_correr_etapa, etapa, set(completadas))] = nombre
+                    del pendientes[nombre]
+
+            if not en_curso:
+                break
+
+            terminados, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                nombre = en_curso.pop(futuro)
+                resultados[nombre] = futuro.result()
+                if resultados[nombre]['estado'] == 'ok':
+                    completadas.add(nombre)
+
+    return resultados
+
+
+def reporte_pipeline(seleccion, resultados, duracion_total):
+    """Mostrar y guardar el resumen de la ejecución"""
+    log_message("\n" + "=" * 70)
+    log_message("RESUMEN DEL PIPELINE")
+    log_message("=" * 70)
+    log_message(f"{'Etapa':<15} {'Estado':<10} {'Duración (s)'}")
+    log_message("-" * 40)
+
+    for nombre in seleccion:
+        resultado = resultados[nombre]
+        log_message(f"{nombre:<15} {resultado['estado']:<10} {resultado['duracion_s']}")
+
+    log_message("-" * 40)
+    log_message(f"{'TOTAL':<26} {duracion_total:.2f}")
+
+    os.makedirs(os.path.dirname(RESUMEN_PIPELINE), exist_ok=True)
+    with open(RESUMEN_PIPELINE, 'w', encoding='utf-8') as f:
+        json.dump({
+            'etapas': {nombre: resultados[nombre] for nombre in seleccion},
+            'duracion_total_s': round(duracion_total, 2)
+        }, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description='Pipeline ETL del Data Warehouse de salud mental')
+    parser.add_argument('--from', dest='desde', help='Ejecutar desde esta etapa (incluye sus dependientes)')
+    parser.add_argument('--only', dest='solo', nargs='+', help='Ejecutar solo estas etapas')
+    args = parser.parse_args()
+
+    seleccion = seleccionar_etapas(args.desde, args.solo)
+
+    log_message("=" * 70)
+    log_message("PIPELINE ETL - DATA WAREHOUSE SALUD MENTAL")
+    log_message(f"Etapas: {' → '.join(seleccion)}")
+    log_message("=" * 70)
+
+    inicio = time.perf_counter()
+
+    if any(etapa.usa_mysql for etapa in ETAPAS if etapa.nombre in seleccion):
+        verificar_esquema()
+
+    with ejecucion_etl('pipeline'):
+        resultados = ejecutar_pipeline(seleccion)
+        reporte_pipeline(seleccion, resultados, time.perf_counter() - inicio)
+
+        if any(r['estado'] != 'ok' for r in resultados.values()):
+            raise ErrorETL("El pipeline terminó con errores")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ErrorETL:
+        sys.exit(1)
@@ -8,32 +8,51 @@ USE dw_salud_mental;
 
 -- ============================================
 -- TABLA STAGING (temporal para ETL)
+-- Respuestas categóricas codificadas: cada columna guarda el código
+-- (TINYINT) de su valor según config/codigos.json; codigos_staging
+-- permite decodificarlas en SQL
 -- ============================================
 
+DROP TABLE IF EXISTS codigos_staging;
+
+CREATE TABLE codigos_staging (
+    columna VARCHAR(30) NOT NULL,
+    codigo TINYINT UNSIGNED NOT NULL,
+    valor VARCHAR(50) NOT NULL,
+    version SMALLINT UNSIGNED NOT NULL,
+
+    PRIMARY KEY (columna, codigo)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 DROP TABLE IF EXISTS mental_health_staging;
 
 CREATE TABLE mental_health_staging (
     id INT AUTO_INCREMENT PRIMARY KEY,
-    Timestamp VARCHAR(50) NOT NULL,
-    Gender VARCHAR(10) NOT NULL,
-    Country VARCHAR(50) NOT NULL,
-    Occupation VARCHAR(20) NOT NULL,
-    self_employed VARCHAR(10),
-    family_history VARCHAR(5) NOT NULL,
-    treatment VARCHAR(5) NOT NULL,
-    Days_Indoors VARCHAR(30) NOT NULL,
-    Growing_Stress VARCHAR(10) NOT NULL,
-    Changes_Habits VARCHAR(10),
-    Mental_Health_History VARCHAR(10),
-    Mood_Swings VARCHAR(10) NOT NULL,
-    Coping_Struggles VARCHAR(5) NOT NULL,
-    Work_Interest VARCHAR(10),
-    Social_Weakness VARCHAR(10) NOT NULL,
-    mental_health_interview VARCHAR(10) NOT NULL,
-    care_options VARCHAR(15) NOT NULL,
+    fecha DATETIME NOT NULL,
+    anio SMALLINT UNSIGNED NOT NULL,
+    mes TINYINT UNSIGNED NOT NULL,
+    Gender TINYINT UNSIGNED NOT NULL,
+    Country TINYINT UNSIGNED NOT NULL,
+    Occupation TINYINT UNSIGNED NOT NULL,
+    self_employed TINYINT UNSIGNED,
+    family_history TINYINT UNSIGNED NOT NULL,
+    treatment TINYINT UNSIGNED NOT NULL,
+    Days_Indoors TINYINT UNSIGNED NOT NULL,
+    Growing_Stress TINYINT UNSIGNED NOT NULL,
+    Changes_Habits TINYINT UNSIGNED,
+    Mental_Health_History TINYINT UNSIGNED,
+    Mood_Swings TINYINT UNSIGNED NOT NULL,
+    Coping_Struggles TINYINT UNSIGNED NOT NULL,
+    Work_Interest TINYINT UNSIGNED,
+    Social_Weakness TINYINT UNSIGNED NOT NULL,
+    mental_health_interview TINYINT UNSIGNED NOT NULL,
+    care_options TINYINT UNSIGNED NOT NULL,
+
+    -- Ejecución del ETL que cargó la fila (etl_runs)
+    id_run BIGINT UNSIGNED NULL,
 
     -- Índices para optimizar ETL
-    INDEX idx_timestamp (Timestamp),
+    INDEX idx_anio_mes (anio, mes),
     INDEX idx_gender (Gender),
     INDEX idx_country (Country),
     INDEX idx_occupation (Occupation),
@@ -43,6 +62,12 @@ CREATE TABLE mental_health_staging (
 
 -- ============================================
 -- DIMENSIONES DEL DATA WAREHOUSE
+-- Claves deterministas, asignadas por 03_cargar_dimensiones.py (iguales en
+-- cada recarga; la carga de hechos las calcula desde staging sin JOIN):
+-- - Dim_Tiempo: período YYYYMM
+-- - dimensiones de valores fijos: código del valor en config/codigos.json
+-- - Dim_Acceso: códigos de sus atributos empaquetados (3 bits cada uno)
+-- - Dim_Sintomas: ídem, seguido del bit de indicador_inferido_estres
 -- ============================================
 
 -- -------------------------------------------
@@ -52,13 +77,13 @@ CREATE TABLE mental_health_staging (
 DROP TABLE IF EXISTS Dim_Tiempo;
 
 CREATE TABLE Dim_Tiempo (
-    id_tiempo INT AUTO_INCREMENT PRIMARY KEY,
-    anio INT NOT NULL,
-    mes INT NOT NULL,
+    id_tiempo MEDIUMINT UNSIGNED PRIMARY KEY,  -- YYYYMM
+    anio SMALLINT UNSIGNED NOT NULL,
+    mes TINYINT UNSIGNED NOT NULL,
     nombre_mes VARCHAR(15) NOT NULL,
     periodo VARCHAR(7) NOT NULL UNIQUE,  -- Formato "YYYY-MM"
-    trimestre INT NOT NULL,
-    semestre INT NOT NULL,
+    trimestre TINYINT UNSIGNED NOT NULL,
+    semestre TINYINT UNSIGNED NOT NULL,
 
     INDEX idx_periodo (periodo),
     INDEX idx_anio_mes (anio, mes)
@@ -71,7 +96,7 @@ CREATE TABLE Dim_Tiempo (
 DROP TABLE IF EXISTS Dim_Genero;
 
 CREATE TABLE Dim_Genero (
-    id_genero INT AUTO_INCREMENT PRIMARY KEY,
+    id_genero TINYINT UNSIGNED PRIMARY KEY,
     genero VARCHAR(10) NOT NULL UNIQUE,
     descripcion VARCHAR(50) NULL,
 
@@ -85,7 +110,7 @@ CREATE TABLE Dim_Genero (
 DROP TABLE IF EXISTS Dim_Historial;
 
 CREATE TABLE Dim_Historial (
-    id_historial INT AUTO_INCREMENT PRIMARY KEY,
+    id_historial TINYINT UNSIGNED PRIMARY KEY,
     family_history VARCHAR(3) NOT NULL UNIQUE,
     descripcion VARCHAR(100) NULL,
 
@@ -99,7 +124,7 @@ CREATE TABLE Dim_Historial (
 DROP TABLE IF EXISTS Dim_Ocupacion;
 
 CREATE TABLE Dim_Ocupacion (
-    id_ocupacion INT AUTO_INCREMENT PRIMARY KEY,
+    id_ocupacion TINYINT UNSIGNED PRIMARY KEY,
     occupation VARCHAR(20) NOT NULL UNIQUE,
     descripcion VARCHAR(100) NULL,
 
@@ -113,7 +138,7 @@ CREATE TABLE Dim_Ocupacion (
 DROP TABLE IF EXISTS Dim_Pais;
 
 CREATE TABLE Dim_Pais (
-    id_pais INT AUTO_INCREMENT PRIMARY KEY,
+    id_pais TINYINT UNSIGNED PRIMARY KEY,
     country VARCHAR(50) NOT NULL UNIQUE,
     region VARCHAR(30) NOT NULL,
     codigo_iso VARCHAR(3) NULL,
@@ -129,9 +154,9 @@ CREATE TABLE Dim_Pais (
 DROP TABLE IF EXISTS Dim_Aislamiento;
 
 CREATE TABLE Dim_Aislamiento (
-    id_aislamiento INT AUTO_INCREMENT PRIMARY KEY,
+    id_aislamiento TINYINT UNSIGNED PRIMARY KEY,
     days_indoors VARCHAR(25) NOT NULL UNIQUE,
-    orden INT NOT NULL,
+    orden TINYINT UNSIGNED NOT NULL,
     categoria VARCHAR(20) NOT NULL,
 
     INDEX idx_days_indoors (days_indoors),
@@ -145,7 +170,7 @@ CREATE TABLE Dim_Aislamiento (
 DROP TABLE IF EXISTS Dim_Sintomas;
 
 CREATE TABLE Dim_Sintomas (
-    id_sintomas INT AUTO_INCREMENT PRIMARY KEY,
+    id_sintomas SMALLINT UNSIGNED PRIMARY KEY,
     growing_stress VARCHAR(5) NOT NULL,
     mood_swings VARCHAR(10) NOT NULL,
     coping_struggles VARCHAR(3) NOT NULL,
@@ -164,7 +189,7 @@ CREATE TABLE Dim_Sintomas (
 DROP TABLE IF EXISTS Dim_Acceso;
 
 CREATE TABLE Dim_Acceso (
-    id_acceso INT AUTO_INCREMENT PRIMARY KEY,
+    id_acceso TINYINT UNSIGNED PRIMARY KEY,
     care_options VARCHAR(10) NOT NULL,
     mental_health_interview VARCHAR(5) NOT NULL,
 
@@ -175,6 +200,10 @@ CREATE TABLE Dim_Acceso (
 -- ============================================
 -- TABLA DE HECHOS CENTRAL
 -- Esquema Estrella - Núcleo del Data Warehouse
+-- Claves y conteos con el tipo entero más angosto que admite su dimensión
+-- (mismo tipo que la clave primaria de la dimensión). El formato de fila
+-- (COMPRESSED o compresión de páginas) es opcional: HECHOS_FORMATO_FILA en
+-- config/config.py, aplicado por 04_cargar_hechos.py
 -- ============================================
 
 DROP TABLE IF EXISTS Hechos_Estres_SaludMental;
@@ -185,33 +214,33 @@ CREATE TABLE Hechos_Estres_SaludMental (
     -- ========================================
     -- CLAVES FORÁNEAS HACIA DIMENSIONES (8)
     -- ========================================
-    id_tiempo INT NOT NULL,
-    id_genero INT NOT NULL,
-    id_historial INT NOT NULL,
-    id_ocupacion INT NOT NULL,
-    id_pais INT NOT NULL,
-    id_aislamiento INT NOT NULL,
-    id_sintomas INT NOT NULL,
-    id_acceso INT NOT NULL,
+    id_tiempo MEDIUMINT UNSIGNED NOT NULL,
+    id_genero TINYINT UNSIGNED NOT NULL,
+    id_historial TINYINT UNSIGNED NOT NULL,
+    id_ocupacion TINYINT UNSIGNED NOT NULL,
+    id_pais TINYINT UNSIGNED NOT NULL,
+    id_aislamiento TINYINT UNSIGNED NOT NULL,
+    id_sintomas SMALLINT UNSIGNED NOT NULL,
+    id_acceso TINYINT UNSIGNED NOT NULL,
 
     -- ========================================
     -- INDICADORES (MÉTRICAS) - Total: 16
     -- ========================================
 
     -- Indicador 1: Cantidad con estrés creciente
-    cantidad_estres INT NULL,
+    cantidad_estres MEDIUMINT UNSIGNED NULL,
 
     -- Indicador 2: Proporción con estrés creciente
     porcentaje_estres DECIMAL(5,2) NULL,
 
     -- Indicador 3: Cantidad con historial familiar y estrés
-    cantidad_historial_estres INT NULL,
+    cantidad_historial_estres MEDIUMINT UNSIGNED NULL,
 
     -- Indicador 4: Proporción con historial familiar que desarrollan estrés
     porcentaje_historial_estres DECIMAL(5,2) NULL,
 
     -- Indicador 5: Cantidad con estrés y dificultades de afrontamiento
-    cantidad_estres_afrontamiento INT NULL,
+    cantidad_estres_afrontamiento MEDIUMINT UNSIGNED NULL,
 
     -- Indicador 6: Proporción con estrés y dificultades por ocupación/país
     porcentaje_estres_afrontamiento_ocupacion DECIMAL(5,2) NULL,
@@ -223,7 +252,7 @@ CREATE TABLE Hechos_Estres_SaludMental (
     porcentaje_no_tratamiento DECIMAL(5,2) NULL,
 
     -- Indicador 8: Cantidad en tratamiento
-    cantidad_tratamiento INT NULL,
+    cantidad_tratamiento MEDIUMINT UNSIGNED NULL,
 
     -- Indicador 9: Proporción con deterioro emocional por aislamiento
     porcentaje_deterioro_aislamiento DECIMAL(5,2) NULL,
@@ -238,7 +267,7 @@ CREATE TABLE Hechos_Estres_SaludMental (
     porcentaje_acceso_recursos DECIMAL(5,2) NULL,
 
     -- Indicador 13: Cantidad con estrés y acceso a recursos
-    cantidad_estres_acceso INT NULL,
+    cantidad_estres_acceso MEDIUMINT UNSIGNED NULL,
 
     -- Indicador 14: Proporción con síntomas no reconocidos que buscan tratamiento
     porcentaje_sintomas_no_reconocidos DECIMAL(5,2) NULL,
@@ -249,12 +278,14 @@ CREATE TABLE Hechos_Estres_SaludMental (
     -- Indicador 16: Proporción que posterga tratamiento con recursos disponibles
     porcentaje_postergacion DECIMAL(5,2) NULL,
 
+    -- Ejecución del ETL que cargó la fila (etl_runs)
+    id_run BIGINT UNSIGNED NULL,
+
     -- ========================================
     -- ÍNDICES PARA OPTIMIZAR CONSULTAS
     -- ========================================
-    INDEX idx_tiempo (id_tiempo),
+    -- id_tiempo e id_pais se cubren con el prefijo de los índices compuestos
     INDEX idx_genero (id_genero),
-    INDEX idx_pais (id_pais),
     INDEX idx_sintomas (id_sintomas),
     INDEX idx_acceso (id_acceso),
 
@@ -291,6 +322,101 @@ CREATE TABLE Hechos_Estres_SaludMental (
 
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- ============================================
+-- GENERACIÓN DE CARGA
+-- Los cargadores la incrementan al terminar cada recarga (dimensiones o
+-- hechos); la API de lectura la usa en la clave de su caché. No se borra
+-- al recrear las tablas para que la generación nunca retroceda.
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS etl_generacion (
+    id TINYINT PRIMARY KEY,
+    generacion BIGINT UNSIGNED NOT NULL,
+    actualizado DATETIME(6) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT IGNORE INTO etl_generacion (id, generacion, actualizado) VALUES (1, 0, NOW(6));
+
+-- ============================================
+-- AUDITORÍA DE EJECUCIONES
+-- Una fila por ejecución del ETL (pipeline o script independiente) y una
+-- por etapa con sus métricas; staging y hechos guardan el id_run que las
+-- cargó. Se conservan al recrear las tablas para mantener el histórico.
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS etl_runs (
+    id_run BIGINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    origen VARCHAR(40) NOT NULL,
+    inicio DATETIME(6) NOT NULL,
+    fin DATETIME(6) NULL,
+    estado VARCHAR(10) NOT NULL,
+    rss_pico_mb DECIMAL(10,1) NULL,
+
+    INDEX idx_inicio (inicio)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS etl_stage_runs (
+    id BIGINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    id_run BIGINT UNSIGNED NOT NULL,
+    etapa VARCHAR(30) NOT NULL,
+    inicio DATETIME(6) NOT NULL,
+    fin DATETIME(6) NOT NULL,
+    duracion_ms BIGINT UNSIGNED NOT NULL,
+    filas_entrada BIGINT UNSIGNED NULL,
+    filas_salida BIGINT UNSIGNED NULL,
+    filas_rechazadas BIGINT UNSIGNED NULL,
+    bytes_leidos BIGINT UNSIGNED NULL,
+    rss_pico_mb DECIMAL(10,1) NULL,
+    estado VARCHAR(10) NOT NULL,
+
+    INDEX idx_run (id_run),
+    INDEX idx_etapa_inicio (etapa, inicio),
+
+    FOREIGN KEY (id_run) REFERENCES etl_runs(id_run)
+        ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ============================================
+-- HISTORIAL DE TABLAS E ÍNDICES
+-- Una foto por ejecución del ETL (python/asesor_indices.py): tamaños de
+-- information_schema y contadores acumulados de performance_schema; para
+-- la tabla de hechos, además, su formato de fila y el tiempo de un recorrido
+-- completo (comparación de formatos). Se conservan al recrear las tablas.
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS etl_tablas_historial (
+    id BIGINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    id_run BIGINT UNSIGNED NULL,
+    capturado DATETIME(6) NOT NULL,
+    tabla VARCHAR(64) NOT NULL,
+    filas_estimadas BIGINT UNSIGNED NULL,
+    datos_bytes BIGINT UNSIGNED NULL,
+    indices_bytes BIGINT UNSIGNED NULL,
+    filas_escaneo_completo BIGINT UNSIGNED NULL,
+    filas_escritas BIGINT UNSIGNED NULL,
+    formato_fila VARCHAR(100) NULL,
+    archivo_bytes BIGINT UNSIGNED NULL,
+    recorrido_ms DECIMAL(12,1) NULL,
+
+    INDEX idx_capturado (capturado),
+    INDEX idx_tabla_capturado (tabla, capturado)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS etl_indices_historial (
+    id BIGINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    id_run BIGINT UNSIGNED NULL,
+    capturado DATETIME(6) NOT NULL,
+    tabla VARCHAR(64) NOT NULL,
+    indice VARCHAR(64) NOT NULL,
+    columnas VARCHAR(255) NOT NULL,
+    unico TINYINT NOT NULL,
+    tamano_bytes BIGINT UNSIGNED NULL,
+    lecturas BIGINT UNSIGNED NULL,
+
+    INDEX idx_capturado (capturado),
+    INDEX idx_tabla_indice_capturado (tabla, indice, capturado)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- ============================================
 -- VERIFICACIÓN Y REPORTE
 -- ============================================
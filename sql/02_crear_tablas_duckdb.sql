@@ -0,0 +1,240 @@
+-- ============================================
+-- SCRIPT 2 (DuckDB): CREAR TODAS LAS TABLAS DEL DW
+-- Data Warehouse: Análisis de Estrés y Salud Mental
+-- Mismo modelo que 02_crear_tablas.sql para el motor embebido
+-- (DW_BACKEND = 'duckdb'). Diferencias con MySQL:
+-- - AUTO_INCREMENT → secuencia seq_<tabla> (TRUNCATE no la reinicia)
+-- - Sin índices secundarios: DuckDB es columnar y recorre con zonemaps
+-- - Sin FOREIGN KEY: DuckDB no permite desactivarlas para recargar las
+--   dimensiones; la integridad la verifica 05_validar_dw.py
+-- - Claves y conteos INTEGER: DuckDB ya comprime cada columna entera con
+--   bit-packing según su rango de valores; el formato de fila
+--   (HECHOS_FORMATO_FILA) tampoco aplica
+-- - Sin historial de tablas e índices: asesor_indices.py usa
+--   performance_schema y sys, que solo existen en MySQL
+--
+-- Ejecutar: python python/motor_duckdb.py --crear-esquema
+-- ============================================
+
+CREATE SCHEMA IF NOT EXISTS dw_salud_mental;
+SET search_path = 'dw_salud_mental';
+
+-- ============================================
+-- TABLA STAGING (temporal para ETL)
+-- ============================================
+
+-- Respuestas categóricas codificadas (config/codigos.json)
+DROP TABLE IF EXISTS codigos_staging;
+
+CREATE TABLE codigos_staging (
+    columna VARCHAR(30) NOT NULL,
+    codigo UTINYINT NOT NULL,
+    valor VARCHAR(50) NOT NULL,
+    version USMALLINT NOT NULL,
+    PRIMARY KEY (columna, codigo)
+);
+
+DROP TABLE IF EXISTS mental_health_staging;
+DROP SEQUENCE IF EXISTS seq_mental_health_staging;
+CREATE SEQUENCE seq_mental_health_staging;
+
+CREATE TABLE mental_health_staging (
+    id INTEGER DEFAULT nextval('seq_mental_health_staging') PRIMARY KEY,
+    fecha TIMESTAMP NOT NULL,
+    anio USMALLINT NOT NULL,
+    mes UTINYINT NOT NULL,
+    Gender UTINYINT NOT NULL,
+    Country UTINYINT NOT NULL,
+    Occupation UTINYINT NOT NULL,
+    self_employed UTINYINT,
+    family_history UTINYINT NOT NULL,
+    treatment UTINYINT NOT NULL,
+    Days_Indoors UTINYINT NOT NULL,
+    Growing_Stress UTINYINT NOT NULL,
+    Changes_Habits UTINYINT,
+    Mental_Health_History UTINYINT,
+    Mood_Swings UTINYINT NOT NULL,
+    Coping_Struggles UTINYINT NOT NULL,
+    Work_Interest UTINYINT,
+    Social_Weakness UTINYINT NOT NULL,
+    mental_health_interview UTINYINT NOT NULL,
+    care_options UTINYINT NOT NULL,
+
+    -- Ejecución del ETL que cargó la fila (etl_runs)
+    id_run UBIGINT NULL
+);
+
+-- ============================================
+-- DIMENSIONES DEL DATA WAREHOUSE
+-- Claves deterministas asignadas por 03_cargar_dimensiones.py (ver
+-- 02_crear_tablas.sql)
+-- ============================================
+
+DROP TABLE IF EXISTS Dim_Tiempo;
+DROP SEQUENCE IF EXISTS seq_dim_tiempo;
+
+CREATE TABLE Dim_Tiempo (
+    id_tiempo INTEGER PRIMARY KEY,  -- YYYYMM
+    anio INTEGER NOT NULL,
+    mes INTEGER NOT NULL,
+    nombre_mes VARCHAR(15) NOT NULL,
+    periodo VARCHAR(7) NOT NULL UNIQUE,  -- Formato "YYYY-MM"
+    trimestre INTEGER NOT NULL,
+    semestre INTEGER NOT NULL
+);
+
+DROP TABLE IF EXISTS Dim_Genero;
+DROP SEQUENCE IF EXISTS seq_dim_genero;
+
+CREATE TABLE Dim_Genero (
+    id_genero INTEGER PRIMARY KEY,
+    genero VARCHAR(10) NOT NULL UNIQUE,
+    descripcion VARCHAR(50) NULL
+);
+
+DROP TABLE IF EXISTS Dim_Historial;
+DROP SEQUENCE IF EXISTS seq_dim_historial;
+
+CREATE TABLE Dim_Historial (
+    id_historial INTEGER PRIMARY KEY,
+    family_history VARCHAR(3) NOT NULL UNIQUE,
+    descripcion VARCHAR(100) NULL
+);
+
+DROP TABLE IF EXISTS Dim_Ocupacion;
+DROP SEQUENCE IF EXISTS seq_dim_ocupacion;
+
+CREATE TABLE Dim_Ocupacion (
+    id_ocupacion INTEGER PRIMARY KEY,
+    occupation VARCHAR(20) NOT NULL UNIQUE,
+    descripcion VARCHAR(100) NULL
+);
+
+DROP TABLE IF EXISTS Dim_Pais;
+DROP SEQUENCE IF EXISTS seq_dim_pais;
+
+CREATE TABLE Dim_Pais (
+    id_pais INTEGER PRIMARY KEY,
+    country VARCHAR(50) NOT NULL UNIQUE,
+    region VARCHAR(30) NOT NULL,
+    codigo_iso VARCHAR(3) NULL
+);
+
+DROP TABLE IF EXISTS Dim_Aislamiento;
+DROP SEQUENCE IF EXISTS seq_dim_aislamiento;
+
+CREATE TABLE Dim_Aislamiento (
+    id_aislamiento INTEGER PRIMARY KEY,
+    days_indoors VARCHAR(25) NOT NULL UNIQUE,
+    orden INTEGER NOT NULL,
+    categoria VARCHAR(20) NOT NULL
+);
+
+DROP TABLE IF EXISTS Dim_Sintomas;
+DROP SEQUENCE IF EXISTS seq_dim_sintomas;
+
+CREATE TABLE Dim_Sintomas (
+    id_sintomas INTEGER PRIMARY KEY,
+    growing_stress VARCHAR(5) NOT NULL,
+    mood_swings VARCHAR(10) NOT NULL,
+    coping_struggles VARCHAR(3) NOT NULL,
+    social_weakness VARCHAR(5) NOT NULL,
+    indicador_inferido_estres BOOLEAN NOT NULL
+);
+
+DROP TABLE IF EXISTS Dim_Acceso;
+DROP SEQUENCE IF EXISTS seq_dim_acceso;
+
+CREATE TABLE Dim_Acceso (
+    id_acceso INTEGER PRIMARY KEY,
+    care_options VARCHAR(10) NOT NULL,
+    mental_health_interview VARCHAR(5) NOT NULL
+);
+
+-- ============================================
+-- TABLA DE HECHOS CENTRAL
+-- ============================================
+
+DROP TABLE IF EXISTS Hechos_Estres_SaludMental;
+DROP SEQUENCE IF EXISTS seq_hechos_estres_saludmental;
+CREATE SEQUENCE seq_hechos_estres_saludmental;
+
+CREATE TABLE Hechos_Estres_SaludMental (
+    id_hecho INTEGER DEFAULT nextval('seq_hechos_estres_saludmental') PRIMARY KEY,
+
+    -- Claves hacia las dimensiones (8)
+    id_tiempo INTEGER NOT NULL,
+    id_genero INTEGER NOT NULL,
+    id_historial INTEGER NOT NULL,
+    id_ocupacion INTEGER NOT NULL,
+    id_pais INTEGER NOT NULL,
+    id_aislamiento INTEGER NOT NULL,
+    id_sintomas INTEGER NOT NULL,
+    id_acceso INTEGER NOT NULL,
+
+    -- Indicadores (16); ver 02_crear_tablas.sql
+    cantidad_estres INTEGER NULL,
+    porcentaje_estres DECIMAL(5,2) NULL,
+    cantidad_historial_estres INTEGER NULL,
+    porcentaje_historial_estres DECIMAL(5,2) NULL,
+    cantidad_estres_afrontamiento INTEGER NULL,
+    porcentaje_estres_afrontamiento_ocupacion DECIMAL(5,2) NULL,
+    porcentaje_tratamiento DECIMAL(5,2) NULL,
+    porcentaje_no_tratamiento DECIMAL(5,2) NULL,
+    cantidad_tratamiento INTEGER NULL,
+    porcentaje_deterioro_aislamiento DECIMAL(5,2) NULL,
+    porcentaje_humor_aislamiento DECIMAL(5,2) NULL,
+    porcentaje_debilidad_aislamiento DECIMAL(5,2) NULL,
+    porcentaje_acceso_recursos DECIMAL(5,2) NULL,
+    cantidad_estres_acceso INTEGER NULL,
+    porcentaje_sintomas_no_reconocidos DECIMAL(5,2) NULL,
+    porcentaje_recursos_sin_tratamiento DECIMAL(5,2) NULL,
+    porcentaje_postergacion DECIMAL(5,2) NULL,
+
+    -- Ejecución del ETL que cargó la fila (etl_runs)
+    id_run UBIGINT NULL
+);
+
+-- ============================================
+-- GENERACIÓN DE CARGA (se conserva al recrear las tablas)
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS etl_generacion (
+    id TINYINT PRIMARY KEY,
+    generacion UBIGINT NOT NULL,
+    actualizado TIMESTAMP NOT NULL
+);
+
+INSERT OR IGNORE INTO etl_generacion (id, generacion, actualizado) VALUES (1, 0, CAST(now() AS TIMESTAMP));
+
+-- ============================================
+-- AUDITORÍA DE EJECUCIONES (se conserva al recrear las tablas)
+-- ============================================
+
+CREATE SEQUENCE IF NOT EXISTS seq_etl_runs;
+
+CREATE TABLE IF NOT EXISTS etl_runs (
+    id_run UBIGINT DEFAULT nextval('seq_etl_runs') PRIMARY KEY,
+    origen VARCHAR(40) NOT NULL,
+    inicio TIMESTAMP NOT NULL,
+    fin TIMESTAMP NULL,
+    estado VARCHAR(10) NOT NULL,
+    rss_pico_mb DECIMAL(10,1) NULL
+);
+
+CREATE SEQUENCE IF NOT EXISTS seq_etl_stage_runs;
+
+CREATE TABLE IF NOT EXISTS etl_stage_runs (
+    id UBIGINT DEFAULT nextval('seq_etl_stage_runs') PRIMARY KEY,
+    id_run UBIGINT NOT NULL,
+    etapa VARCHAR(30) NOT NULL,
+    inicio TIMESTAMP NOT NULL,
+    fin TIMESTAMP NOT NULL,
+    duracion_ms UBIGINT NOT NULL,
+    filas_entrada UBIGINT NULL,
+    filas_salida UBIGINT NULL,
+    filas_rechazadas UBIGINT NULL,
+    bytes_leidos UBIGINT NULL,
+    rss_pico_mb DECIMAL(10,1) NULL,
+    estado VARCHAR(10) NOT NULL
+);
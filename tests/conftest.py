@@ -0,0 +1,59 @@
+"""
+Configuración común de las pruebas
+Los módulos de python/ se importan como en los scripts (por nombre, con la
+carpeta en sys.path). Las pruebas que necesitan SQL usan una base DuckDB en
+memoria con el esquema de sql/02_crear_tablas_duckdb.sql, a través de la
+misma conexión que usa el ETL (traduce el dialecto MySQL).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'python'))
+
+import base_datos
+import motor_duckdb
+
+
+@pytest.fixture(scope='session', autouse=True)
+def directorio_trabajo(tmp_path_factory):
+    """Ejecutar desde un directorio temporal: la bitácora escribe en logs/ relativo"""
+    anterior = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('etl'))
+    yield
+    os.chdir(anterior)
+
+
+@pytest.fixture
+def conn():
+    """Conexión a una base DuckDB en memoria con el esquema del DW"""
+    duckdb = pytest.importorskip('duckdb')
+    duck = duckdb.connect()
+    duck.execute(motor_duckdb.MACROS)
+    with open(motor_duckdb.DDL_DUCKDB, encoding='utf-8') as f:
+        duck.execute(f.read())
+
+    conexion = motor_duckdb.ConexionDuckDB(duck)
+    yield conexion
+    conexion.close()
+
+
+@pytest.fixture
+def base_en_archivo(tmp_path, monkeypatch):
+    """
+    Dirigir _abrir_base a un archivo nuevo (usar('dw.duckdb')) y cerrarlo al
+    terminar; las conexiones del pool (obtener_conexion) también lo usan
+    """
+    pytest.importorskip('duckdb')
+
+    def usar(nombre):
+        monkeypatch.setattr(motor_duckdb, 'DUCKDB_PATH', str(tmp_path / 'data' / nombre))
+        return motor_duckdb.DUCKDB_PATH
+
+    monkeypatch.setattr(motor_duckdb, '_base', None)
+    monkeypatch.setattr(base_datos, 'DW_BACKEND', 'duckdb')
+    yield usar
+    if motor_duckdb._base is not None:
+        motor_duckdb._base.close()
@@ -0,0 +1,80 @@
+"""
+Pruebas de la foto de estadísticas del asesor de índices. Sin servidor MySQL:
+la conexión de prueba devuelve metadatos fijos y anota las sentencias, para
+comprobar que la foto de cada ejecución no recorre la tabla de hechos.
+"""
+
+from contextlib import nullcontext
+
+import asesor_indices
+from chequeos import TABLA_HECHOS
+
+TABLAS = [(TABLA_HECHOS, 1000, 65536, 16384, 5, 1000, 'Dynamic', 98304),
+          ('Dim_Pais', 36, 16384, 0, 2, 36, 'Dynamic', 98304)]
+
+
+class CursorAnotado:
+    def __init__(self, sentencias):
+        self._sentencias = sentencias
+        self._filas = []
+
+    def execute(self, sql, params=None):
+        self._sentencias.append(sql)
+        if 'information_schema.TABLES' in sql:
+            self._filas = list(TABLAS)
+        elif 'information_schema.COLUMNS' in sql:
+            self._filas = [('id_hecho', 'int'), ('growing_stress', 'tinyint')]
+        else:
+            self._filas = [(1000, 123)]
+
+    def executemany(self, sql, filas):
+        self._sentencias.append(sql)
+        if 'etl_tablas_historial' in sql:
+            self.filas = filas
+
+    def fetchall(self):
+        return self._filas
+
+    def close(self):
+        pass
+
+
+class ConexionAnotada:
+    def __init__(self):
+        self.sentencias = []
+        self.ultimo_cursor = None
+
+    def cursor(self):
+        self.ultimo_cursor = CursorAnotado(self.sentencias)
+        return self.ultimo_cursor
+
+    def commit(self):
+        pass
+
+
+def recorridos(conn):
+    return [sql for sql in conn.sentencias if 'FORCE INDEX (PRIMARY)' in sql]
+
+
+def test_foto_por_ejecucion_no_recorre_la_tabla_de_hechos(monkeypatch):
+    conn = ConexionAnotada()
+    monkeypatch.setattr(asesor_indices, 'DW_BACKEND', 'mysql')
+    monkeypatch.setattr(asesor_indices, 'ESTADISTICAS_POR_EJECUCION', True)
+    monkeypatch.setattr(asesor_indices, 'obtener_conexion', lambda *args, **kwargs: nullcontext(conn))
+
+    asesor_indices.registrar_estadisticas(7)
+
+    assert recorridos(conn) == []
+    hechos = next(fila for fila in conn.ultimo_cursor.filas if fila[2] == TABLA_HECHOS)
+    # La foto conserva los metadatos baratos (ancho de fila) y deja NULL el recorrido
+    assert hechos[8] == 'Dynamic fila=5B' and hechos[-1] is None
+
+
+def test_captura_manual_cronometra_el_recorrido():
+    conn = ConexionAnotada()
+    asesor_indices.capturar_estadisticas(conn, medir=True)
+
+    assert len(recorridos(conn)) == 1
+    hechos = next(fila for fila in conn.ultimo_cursor.filas if fila[2] == TABLA_HECHOS)
+    assert hechos[-1] is not None
+
@@ -0,0 +1,76 @@
+"""
+Pruebas de la captura de EXPLAIN con la configuración de MYSQL_CONFIG
+(raise_on_warnings=True). Sin servidor MySQL: la conexión de prueba
+reproduce la Note 1003 que MySQL 8 agrega a todo EXPLAIN.
+"""
+
+import json
+
+import mysql.connector
+
+from config.config import MYSQL_CONFIG
+from instrumentacion import instrumentar
+
+PLAN = {'query_block': {'select_id': 1, 'table': {'table_name': 'Dim_Pais'}}}
+
+
+class CursorConNota:
+    def __init__(self, cnx):
+        self._cnx = cnx
+        self._fila = None
+        self._nota = False
+
+    def execute(self, sql, params=None):
+        self._fila = (json.dumps(PLAN),) if sql.startswith('EXPLAIN') else (1,)
+        self._nota = sql.startswith('EXPLAIN')
+        self.rowcount = 1
+
+    def fetchone(self):
+        # mysql-connector lee los avisos al llegar al EOF y los lanza si raise_on_warnings
+        if self._nota and self._cnx.raise_on_warnings:
+            raise mysql.connector.errors.DatabaseError(msg="/* select#1 */ select ...", errno=1003)
+        return self._fila
+
+    def close(self):
+        pass
+
+
+class ConexionConNota:
+    """Conexión con las opciones de aviso de mysql-connector"""
+
+    def __init__(self):
+        self.raise_on_warnings = MYSQL_CONFIG['raise_on_warnings']
+        self.get_warnings = self.raise_on_warnings
+
+    def cursor(self, *args, **kwargs):
+        return CursorConNota(self)
+
+    def close(self):
+        pass
+
+
+class ConexionDelPool:
+    """Como PooledMySQLConnection: delega la lectura de atributos a _cnx"""
+
+    def __init__(self, cnx):
+        self._cnx = cnx
+
+    def __getattr__(self, nombre):
+        return getattr(self._cnx, nombre)
+
+
+def test_explain_capturado_con_raise_on_warnings():
+    cnx = ConexionConNota()
+    conn = instrumentar(ConexionDelPool(cnx), 'prueba')
+    conn.registro.umbral_explain_ms = 0
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM Dim_Pais WHERE region = %s", ('Europa',))
+    cursor.fetchone()
+    cursor.close()
+    conn.close()
+
+    (sentencia,) = conn.registro.resumen()
+    assert sentencia['explain'] == PLAN
+    # La opción vuelve a su valor al terminar la captura
+    assert cnx.raise_on_warnings is True and cnx.get_warnings is True
@@ -0,0 +1,317 @@
+"""
+Pruebas de la lógica que tiene una versión en Python y otra en SQL (claves
+empaquetadas de las dimensiones), del compilador de chequeos, de las marcas
+de validación incremental y de la exportación (rangos y esquema).
+"""
+
+from datetime import date
+from importlib import import_module
+import itertools
+
+import pytest
+
+from codigos import CODIGOS, VALORES, empaquetar, expresion_empaquetar_sql
+from indicadores import COLUMNAS_CLAVE, clave_tiempo, expresion_clave_sql
+from chequeos import (
+    MIN_TRAMO, Chequeo, compilar_chequeos, condicion_fuera_de_claves, ejecutar_chequeos
+)
+import marcas_validacion
+from config.config import VALIDACION_BARRIDO_CADA
+
+dimensiones = import_module('03_cargar_dimensiones')
+exportacion = import_module('06_exportar_powerbi')
+
+
+# ============================================
+# CLAVES EMPAQUETADAS: PYTHON VS SQL
+# ============================================
+
+# Columnas de staging variadas en todas sus combinaciones; el resto toma su primer código
+COLUMNAS_COMBINADAS = (
+    COLUMNAS_CLAVE['id_sintomas'] + ('Days_Indoors',) + COLUMNAS_CLAVE['id_acceso']
+)
+COLUMNAS_FIJAS = ('Gender', 'Country', 'Occupation', 'family_history', 'treatment')
+
+
+def todas_las_combinaciones(columnas):
+    return list(itertools.product(*(range(1, len(VALORES[columna]) + 1) for columna in columnas)))
+
+
+def cargar_staging(conn, meses=((2014, 8),), combinar=True, dias=None):
+    """
+    Staging con una fila por combinación de códigos de COLUMNAS_COMBINADAS y mes
+    (combinar=False: una sola fila por mes; dias: solo ese código de Days_Indoors)
+    """
+    columnas = ('fecha', 'anio', 'mes') + COLUMNAS_FIJAS + COLUMNAS_COMBINADAS
+    combinaciones = todas_las_combinaciones(COLUMNAS_COMBINADAS) if combinar else [(1,) * len(COLUMNAS_COMBINADAS)]
+    posicion_dias = COLUMNAS_COMBINADAS.index('Days_Indoors')
+    filas = [
+        (f"{anio}-{mes:02d}-01 00:00:00", anio, mes) + (1,) * len(COLUMNAS_FIJAS) + codigos
+        for anio, mes in meses
+        for codigos in combinaciones
+        if dias is None or codigos[posicion_dias] == dias
+    ]
+    cursor = conn.cursor()
+    cursor.executemany(
+        f"INSERT INTO mental_health_staging ({', '.join(columnas)}) "
+        f"VALUES ({', '.join(['%s'] * len(columnas))})",
+        filas
+    )
+    conn.commit()
+    cursor.close()
+    return len(filas)
+
+
+@pytest.mark.parametrize('fk', ['id_sintomas', 'id_acceso'])
+def test_empaquetar_coincide_con_sql(conn, fk):
+    columnas = COLUMNAS_CLAVE[fk]
+    combinaciones = todas_las_combinaciones(columnas)
+
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE TABLE t ({', '.join(f'{c} UTINYINT' for c in columnas)})")
+    cursor.executemany(f"INSERT INTO t VALUES ({', '.join(['%s'] * len(columnas))})", combinaciones)
+    cursor.execute(f"SELECT {', '.join(columnas)}, {expresion_empaquetar_sql(columnas, 't')} FROM t")
+    resultado = {tuple(fila[:-1]): fila[-1] for fila in cursor.fetchall()}
+    cursor.close()
+
+    assert resultado == {codigos: empaquetar(columnas, codigos) for codigos in combinaciones}
+    assert len(set(resultado.values())) == len(combinaciones)
+
+
+def test_clave_tiempo_coincide_con_sql(conn):
+    meses = [(2014, mes) for mes in range(1, 13)] + [(2099, 12)]
+    cargar_staging(conn, meses, combinar=False)
+
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT DISTINCT anio, mes, {expresion_clave_sql('id_tiempo')} FROM mental_health_staging s")
+    claves = {(anio, mes): clave for anio, mes, clave in cursor.fetchall()}
+    cursor.close()
+
+    assert claves == {(anio, mes): clave_tiempo(anio, mes) for anio, mes in meses}
+
+
+# Dim_Sintomas se prueba con un solo Days_Indoors por vez: interviene en el
+# indicador inferido y, con todos juntos, otro valor podría dar la misma clave
+@pytest.mark.parametrize('fk, cargar, tabla, dias', [
+    ('id_sintomas', 'cargar_dim_sintomas', 'Dim_Sintomas', dias)
+    for dias in range(1, len(VALORES['Days_Indoors']) + 1)
+] + [
+    ('id_acceso', 'cargar_dim_acceso', 'Dim_Acceso', None)
+])
+def test_claves_de_hechos_existen_en_su_dimension(conn, fk, cargar, tabla, dias):
+    """La clave que calcula la carga de hechos (SQL) es la de la fila que insertó 03 (Python)"""
+    cargar_staging(conn, dias=dias)
+    filas = getattr(dimensiones, cargar)(conn)
+
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT DISTINCT {expresion_clave_sql(fk)} FROM mental_health_staging s")
+    claves_hechos = {fila[0] for fila in cursor.fetchall()}
+    cursor.execute(f"SELECT {fk} FROM {tabla}")
+    claves_dimension = {fila[0] for fila in cursor.fetchall()}
+    cursor.close()
+
+    assert claves_hechos == claves_dimension
+    assert len(claves_dimension) == filas
+
+
+def test_indicador_inferido_de_dim_sintomas_coincide_con_la_regla(conn):
+    cargar_staging(conn)
+    dimensiones.cargar_dim_sintomas(conn)
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT id_sintomas, indicador_inferido_estres FROM Dim_Sintomas")
+    filas = cursor.fetchall()
+    cursor.close()
+
+    assert filas
+    assert all(clave % 2 == int(indicador) for clave, indicador in filas)
+
+
+# ============================================
+# COMPILADOR DE CHEQUEOS
+# ============================================
+
+CHEQUEOS_STAGING = [
+    Chequeo('historial', f"family_history = {CODIGOS['family_history']['Yes']}"),
+    Chequeo('estres', f"Growing_Stress = {CODIGOS['Growing_Stress']['Yes']}"),
+    Chequeo('ninguno', "Gender = 0")
+]
+
+
+def contar_en_python(conn, where=''):
+    """Fallas de CHEQUEOS_STAGING contadas fila por fila"""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT id, family_history, Growing_Stress FROM mental_health_staging {where}")
+    filas = cursor.fetchall()
+    cursor.close()
+    return len(filas), {
+        'historial': sum(historial == CODIGOS['family_history']['Yes'] for _, historial, _ in filas),
+        'estres': sum(estres == CODIGOS['Growing_Stress']['Yes'] for _, _, estres in filas),
+        'ninguno': 0
+    }
+
+
+def test_ejecutar_chequeos_en_un_recorrido(conn):
+    cargar_staging(conn)
+    assert ejecutar_chequeos(conn, 'mental_health_staging', CHEQUEOS_STAGING) == contar_en_python(conn)
+    assert ejecutar_chequeos(
+        conn, 'mental_health_staging', CHEQUEOS_STAGING, 'id > %s', (100,)
+    ) == contar_en_python(conn, 'WHERE id > 100')
+
+
+def test_ejecutar_chequeos_tabla_vacia(conn):
+    assert ejecutar_chequeos(conn, 'mental_health_staging', CHEQUEOS_STAGING) == (
+        0, {'historial': 0, 'estres': 0, 'ninguno': 0}
+    )
+
+
+def test_compilar_chequeos_extra_antes_del_conteo():
+    sql = compilar_chequeos('t', [Chequeo('a', 'x IS NULL')], 'id > %s', ['MAX(id)'])
+    assert sql.index('MAX(id)') < sql.index('COUNT(*)') < sql.index('x IS NULL')
+    assert 'WHERE id > %s' in sql
+
+
+@pytest.mark.parametrize('claves', [
+    [],
+    [5],
+    [1, 2],
+    [1, 2, 3],
+    [3, 1, 2, 2, 10, 11, 12, 13, 20, 22],
+    [201401, 201402, 201403, 201405, 201412]
+])
+def test_condicion_fuera_de_claves(conn, claves):
+    condicion = condicion_fuera_de_claves('v', claves)
+    valores = sorted(set(range(-1, 25)) | set(claves) | {c + 1 for c in claves})
+
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE t (v INTEGER)")
+    cursor.executemany("INSERT INTO t VALUES (%s)", [(v,) for v in valores] + [(None,)])
+    cursor.execute(f"SELECT v FROM t WHERE {condicion}")
+    fuera = {fila[0] for fila in cursor.fetchall()}
+    cursor.close()
+
+    assert fuera == {v for v in valores if v not in claves} | {None}
+
+
+def test_condicion_fuera_de_claves_usa_between_en_tramos():
+    tramo = list(range(1, MIN_TRAMO + 1))
+    assert 'BETWEEN' in condicion_fuera_de_claves('v', tramo)
+    assert 'BETWEEN' not in condicion_fuera_de_claves('v', tramo[:-1])
+
+
+# ============================================
+# MARCAS DE VALIDACIÓN INCREMENTAL
+# ============================================
+
+def marca(**cambios):
+    return dict({'hasta': 100, 'generacion': 3, 'filas': 100, 'fallas': {}, 'incrementales': 0}, **cambios)
+
+
+@pytest.mark.parametrize('previa, generacion, clave_max, motivo', [
+    (None, 3, 150, 'sin marca previa'),
+    (marca(), 4, 150, 'generación de carga 3 → 4'),
+    (marca(), 3, None, 'la tabla tiene menos filas que la marca'),
+    (marca(), 3, 99, 'la tabla tiene menos filas que la marca'),
+    (marca(incrementales=VALIDACION_BARRIDO_CADA), 3, 150, 'barrido periódico'),
+    (marca(incrementales=VALIDACION_BARRIDO_CADA - 1), 3, 150, None),
+    (marca(), 3, 100, None)
+])
+def test_motivo_barrido(previa, generacion, clave_max, motivo):
+    resultado = marcas_validacion._motivo_barrido(previa, generacion, clave_max)
+    if motivo is None:
+        assert resultado is None
+    else:
+        assert resultado.startswith(motivo)
+
+
+def test_motivo_barrido_completo_solicitado():
+    marcas_validacion.barrido_completo()
+    try:
+        assert marcas_validacion._motivo_barrido(marca(), 3, 150) == 'barrido completo solicitado'
+    finally:
+        marcas_validacion.barrido_completo(False)
+
+
+def test_chequear_desde_marca_acumula_el_delta(conn, tmp_path):
+    ruta = str(tmp_path / 'marcas.json')
+    tabla = 'mental_health_staging'
+
+    cargar_staging(conn)
+    assert marcas_validacion.chequear_desde_marca(conn, tabla, CHEQUEOS_STAGING, ruta) == contar_en_python(conn)
+
+    # Solo se recorren las filas nuevas; el resultado es el de la tabla completa
+    cargar_staging(conn, ((2014, 9),))
+    assert marcas_validacion.chequear_desde_marca(conn, tabla, CHEQUEOS_STAGING, ruta) == contar_en_python(conn)
+
+    # Tabla vaciada y recargada con menos filas: barrido completo
+    marcas_validacion.reiniciar_marcas(tabla, ruta)
+    cursor = conn.cursor()
+    cursor.execute(f"DELETE FROM {tabla} WHERE id > 100")
+    conn.commit()
+    cursor.close()
+    assert marcas_validacion.chequear_desde_marca(conn, tabla, CHEQUEOS_STAGING, ruta) == contar_en_python(conn)
+
+
+# ============================================
+# RANGOS DE LA EXPORTACIÓN PARALELA
+# ============================================
+
+def periodos_de(filas):
+    return [((i + 1,), filas_periodo) for i, filas_periodo in enumerate(filas)]
+
+
+@pytest.mark.parametrize('filas, partes', [
+    ([10] * 12, 4),
+    ([10] * 12, 1),
+    ([10] * 3, 8),
+    ([1, 1, 100, 1, 1, 1], 3),
+    ([0, 0, 0], 2),
+    ([], 4)
+])
+def test_dividir_rangos_conserva_el_orden(filas, partes):
+    periodos = [periodo for periodo, _ in periodos_de(filas)]
+    filas_por_periodo = {periodo[0]: n for periodo, n in periodos_de(filas)}
+
+    rangos = exportacion.dividir_rangos(periodos, filas_por_periodo, partes)
+
+    assert [periodo for rango in rangos for periodo in rango] == periodos
+    assert all(rangos)
+    assert len(rangos) <= max(1, partes)
+
+
+def test_dividir_rangos_equilibra_filas():
+    periodos = [periodo for periodo, _ in periodos_de([10] * 12)]
+    rangos = exportacion.dividir_rangos(periodos, {i: 10 for i in range(1, 13)}, 4)
+    assert [len(rango) for rango in rangos] == [3, 3, 3, 3]
+
+
+def test_dividir_rangos_aisla_el_periodo_grande():
+    filas = [1, 1, 100, 1, 1, 1]
+    periodos = [periodo for periodo, _ in periodos_de(filas)]
+    rangos = exportacion.dividir_rangos(periodos, {i: n for i, n in enumerate(filas, 1)}, 3)
+    assert [(3,)] in rangos
+
+
+# ============================================
+# ESQUEMA DE LA EXPORTACIÓN
+# ============================================
+
+def test_csv_plano_sin_fecha_periodo():
+    assert 'fecha_periodo' not in exportacion.query_exportacion()
+    assert 'fecha_periodo' in exportacion.query_exportacion(particionada=True)
+
+
+def test_particiones_parquet_legibles_como_dataset_hive(tmp_path):
+    dataset = pytest.importorskip('pyarrow.dataset')
+    columnas = ['anio', 'mes', 'fecha_periodo', 'genero', 'cantidad_estres']
+
+    for anio, mes in ((2014, 8), (2014, 9)):
+        ruta = tmp_path / f"anio={anio}" / f"mes={mes}" / 'part-0.parquet'
+        ruta.parent.mkdir(parents=True)
+        exportacion.escribir_tabla_parquet(
+            str(ruta), columnas, [[(anio, mes, date(anio, mes, 1), 'Male', 3)]], exportacion.COLUMNAS_PARTICION
+        )
+
+    tabla = dataset.dataset(str(tmp_path), format='parquet', partitioning='hive').to_table()
+    assert tabla.num_rows == 2
+    assert sorted(tabla.column('mes').to_pylist()) == [8, 9]
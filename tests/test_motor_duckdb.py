@@ -0,0 +1,51 @@
+"""
+Pruebas del motor DuckDB: apertura sobre un archivo (como lo abre el ETL, no
+en memoria: el catálogo toma el nombre del archivo y puede chocar con el del
+esquema) y manejo de sus errores en los cargadores.
+"""
+
+from importlib import import_module
+import os
+
+import pytest
+
+import motor_duckdb
+from base_datos import ERRORES_BD
+from config.config import DUCKDB_PATH
+from errores import ErrorETL
+
+
+def test_archivo_predeterminado_no_se_llama_como_el_esquema():
+    assert os.path.splitext(os.path.basename(DUCKDB_PATH))[0].lower() != motor_duckdb.ESQUEMA.lower()
+
+
+def test_crear_esquema_y_consultar_en_archivo(base_en_archivo):
+    ruta = base_en_archivo('dw.duckdb')
+    motor_duckdb.crear_esquema()
+
+    conn = motor_duckdb.conectar()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM Hechos_Estres_SaludMental")
+    assert cursor.fetchone() == (0,)
+    cursor.execute("SELECT substring_index(%s, '-', 1)", ('2014-08',))
+    assert cursor.fetchone() == ('2014',)
+    cursor.close()
+    conn.close()
+
+    assert os.path.exists(ruta)
+
+
+def test_archivo_con_el_nombre_del_esquema_falla_con_error_etl(base_en_archivo):
+    base_en_archivo(f"{motor_duckdb.ESQUEMA}.duckdb")
+    with pytest.raises(ErrorETL):
+        motor_duckdb.conectar()
+
+
+def test_error_de_carga_en_duckdb_hace_rollback(conn, monkeypatch):
+    """Los manejadores de 02/04 capturan los errores de ambos motores (ERRORES_BD)"""
+    hechos = import_module('04_cargar_hechos')
+    monkeypatch.setattr(hechos, 'generar_sql_hechos', lambda: "INSERT INTO tabla_inexistente VALUES (%s)")
+
+    with pytest.raises(ERRORES_BD):
+        hechos.cargar_hechos(conn)
+    assert not conn._en_transaccion
@@ -0,0 +1,84 @@
+"""
+Pruebas de los límites de tiempo de la validación concurrente sobre DuckDB:
+el límite rige por sección (no por sentencia) y al agotarse el presupuesto
+las secciones en curso se detienen de verdad.
+"""
+
+from importlib import import_module
+import json
+import time
+
+import pytest
+
+from errores import ErrorETL
+
+validacion = import_module('05_validar_dw')
+
+# Consulta que tarda mucho más que cualquier límite de las pruebas
+CONSULTA_LENTA = "SELECT COUNT(*) FROM range(10000000000) r WHERE hash(r.range) % 7 = 3"
+
+
+@pytest.fixture
+def ejecutar(base_en_archivo, tmp_path, monkeypatch):
+    """ejecutar_validaciones sobre un archivo DuckDB; devuelve (reporte, segundos)"""
+    base_en_archivo('dw.duckdb')
+    monkeypatch.setattr(validacion, 'DW_BACKEND', 'duckdb')
+    ruta_reporte = tmp_path / 'reporte.json'
+
+    def correr(secciones, **limites):
+        cache = validacion.CacheValidaciones(ruta=str(tmp_path / 'cache.json'), forzar=True)
+        inicio = time.perf_counter()
+        try:
+            validacion.ejecutar_validaciones(secciones, cache, ruta_reporte=str(ruta_reporte), **limites)
+        except ErrorETL:
+            pass
+        segundos = time.perf_counter() - inicio
+        with open(ruta_reporte, encoding='utf-8') as f:
+            reporte = json.load(f)
+        return {chequeo['nombre']: chequeo for chequeo in reporte['chequeos']}, segundos
+
+    return correr
+
+
+def lenta(conn):
+    cursor = conn.cursor()
+    cursor.execute(CONSULTA_LENTA)
+    cursor.fetchall()
+
+
+def otra_lenta(conn):
+    lenta(conn)
+
+
+def rapida(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1")
+    cursor.fetchall()
+
+
+def varias_consultas(conn):
+    """Cada consulta es corta, pero la sección en total supera el límite"""
+    for _ in range(4):
+        rapida(conn)
+        time.sleep(0.4)
+
+
+def test_seccion_lenta_se_interrumpe_al_vencer_su_limite(ejecutar):
+    chequeos, segundos = ejecutar([lenta, rapida], limite_chequeo_s=0.5, presupuesto_s=30)
+    assert chequeos['lenta']['estado'] == 'timeout'
+    assert chequeos['rapida']['estado'] == 'ok'
+    assert segundos < 5
+
+
+def test_limite_rige_por_seccion_y_no_por_sentencia(ejecutar):
+    chequeos, _ = ejecutar([varias_consultas], limite_chequeo_s=1, presupuesto_s=30)
+    assert chequeos['varias_consultas']['estado'] == 'timeout'
+    assert chequeos['varias_consultas']['duracion_ms'] < 1500
+
+
+def test_presupuesto_agotado_detiene_las_secciones_en_curso(ejecutar):
+    chequeos, segundos = ejecutar([lenta, otra_lenta],
+                                  trabajadores=1, limite_chequeo_s=60, presupuesto_s=0.5)
+    assert chequeos['lenta']['estado'] == 'timeout'
+    assert chequeos['otra_lenta']['estado'] == 'omitida'
+    assert segundos < 5